@@ -0,0 +1,95 @@
+# benchmarks/bench_envolver.py
+# Compara el wrapping original del PDF de sesión contra texto_pdf.envolver.
+#
+#   python -m benchmarks.bench_envolver [--kb 100] [--repeticiones 5]
+import argparse
+import random
+import time
+
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.units import mm
+from reportlab.pdfbase.pdfmetrics import stringWidth
+
+from texto_pdf import ancho, envolver
+
+PALABRAS = (
+    "la el de que y en un una los las sesión crónica director jugadores "
+    "vampiro antigua ciudad noche sangre clan príncipe secreto investigador "
+    "biblioteca manuscrito ritual sombra niebla puerto contrabandistas"
+).split()
+
+
+def draw_wrapped_original(text, max_width):
+    """Copia del helper que vivía en dashboard.get_dashboard_pdf."""
+    lines = []
+    for linea in text.split("\n"):
+        palabras = linea.split()
+        linea_actual = ""
+
+        for palabra in palabras:
+            test = linea_actual + " " + palabra if linea_actual else palabra
+            if stringWidth(test, "Helvetica", 11) < max_width:
+                linea_actual = test
+            else:
+                lines.append(linea_actual)
+                linea_actual = palabra
+
+        if linea_actual:
+            lines.append(linea_actual)
+
+    return lines
+
+
+def generar_resumen(kb, semilla=1):
+    rnd = random.Random(semilla)
+    partes, total = [], 0
+    while total < kb * 1024:
+        parrafo = " ".join(rnd.choice(PALABRAS) for _ in range(rnd.randint(40, 400)))
+        partes.append(parrafo)
+        total += len(parrafo) + 1
+    return "\n".join(partes)
+
+
+def medir(funcion, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    return min(tiempos), sum(tiempos) / len(tiempos)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark del word-wrap de PDFs")
+    parser.add_argument("--kb", type=int, default=100, help="tamaño del resumen en KB")
+    parser.add_argument("--repeticiones", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    texto = generar_resumen(args.kb)
+    max_width = A4[0] - 2 * (20 * mm)
+
+    original = draw_wrapped_original(texto, max_width)
+    nuevo = envolver(texto, max_width, "Helvetica", 11)
+    iguales = sum(a == b for a, b in zip(original, nuevo))
+    print(f"resumen: {len(texto) / 1024:.0f} KB, {len(original)} líneas "
+          f"({iguales}/{len(original)} idénticas)")
+
+    resultados = {
+        "original": medir(lambda: draw_wrapped_original(texto, max_width), args.repeticiones),
+        "envolver (caché fría)": medir(
+            lambda: (ancho.cache_clear(), envolver(texto, max_width, "Helvetica", 11)),
+            args.repeticiones
+        ),
+        "envolver (caché caliente)": medir(
+            lambda: envolver(texto, max_width, "Helvetica", 11), args.repeticiones
+        ),
+    }
+
+    base = resultados["original"][0]
+    for nombre, (minimo, promedio) in resultados.items():
+        print(f"{nombre:<28} min {minimo * 1000:8.2f} ms  prom {promedio * 1000:8.2f} ms"
+              f"  x{base / minimo:5.1f}")
+
+
+if __name__ == "__main__":
+    main()
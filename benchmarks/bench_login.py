@@ -0,0 +1,128 @@
+# benchmarks/bench_login.py
+# Throughput de POST /login con hash real bajo carga concurrente, y latencia de
+# /health medida al mismo tiempo (¿el hashing frena al resto del worker?).
+#
+#   # servidor propio (werkzeug con hilos, SQLite temporal)
+#   python -m benchmarks.bench_login --concurrencia 16 --duracion 10
+#
+#   # contra gunicorn ya levantado (los usuarios bench_* deben existir o se crean por /users);
+#   # levantarlo con RATE_LIMIT_ENABLED=0 o se mide el limitador y no el hash
+#   python -m benchmarks.bench_login --base http://localhost:5050
+#
+# Comparar costos: PASSWORD_SCRYPT_N=16384 / 32768 / 65536, PASSWORD_WORKERS, etc.
+import argparse
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+
+from benchmarks.carga_http import _conexion, resumen
+
+PASSWORD = "bench-password"
+
+
+def levantar_servidor():
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench.db")
+    # Se mide el hashing, no el rate limiting de login y altas
+    os.environ["RATE_LIMIT_ENABLED"] = "0"
+
+    from werkzeug.serving import make_server
+
+    from app import create_app
+    from extensions import db
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+    servidor = make_server("127.0.0.1", 0, app, threaded=True)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{servidor.server_port}"
+
+
+def crear_usuarios(base, cantidad):
+    conn = _conexion(base)
+    for i in range(cantidad):
+        conn.request("POST", "/users/", headers={"Content-Type": "application/json"}, body=json.dumps({
+            "nombre": "Bench", "apellido": str(i), "username": f"bench_{i}", "password": PASSWORD
+        }))
+        respuesta = conn.getresponse()
+        respuesta.read()
+        if respuesta.status not in (201, 409):
+            raise SystemExit(f"No se pudo crear bench_{i}: {respuesta.status}")
+    conn.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Throughput de login con hashing de contraseñas")
+    parser.add_argument("--base", help="servidor ya levantado (por defecto uno propio)")
+    parser.add_argument("--concurrencia", type=int, default=16)
+    parser.add_argument("--duracion", type=float, default=10)
+    parser.add_argument("--usuarios", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    base = args.base or levantar_servidor()
+    crear_usuarios(base, args.usuarios)
+
+    latencias = {"login": [], "health": []}
+    errores = {"login": 0, "health": 0}
+    saturados = [0]
+    lock = threading.Lock()
+    fin = time.monotonic() + args.duracion
+
+    def logins(n):
+        conn = _conexion(base)
+        locales, fallas, rechazos, i = [], 0, 0, n
+        while time.monotonic() < fin:
+            cuerpo = json.dumps({"username": f"bench_{i % args.usuarios}", "password": PASSWORD})
+            i += 1
+            inicio = time.perf_counter()
+            conn.request("POST", "/login/", body=cuerpo, headers={"Content-Type": "application/json"})
+            respuesta = conn.getresponse()
+            respuesta.read()
+            if respuesta.status == 200:
+                locales.append(time.perf_counter() - inicio)
+            elif respuesta.status == 503:
+                rechazos += 1
+            else:
+                fallas += 1
+        conn.close()
+        with lock:
+            latencias["login"].extend(locales)
+            errores["login"] += fallas
+            saturados[0] += rechazos
+
+    def health():
+        conn = _conexion(base)
+        locales = []
+        while time.monotonic() < fin:
+            inicio = time.perf_counter()
+            conn.request("GET", "/health")
+            conn.getresponse().read()
+            locales.append(time.perf_counter() - inicio)
+            time.sleep(0.05)
+        conn.close()
+        with lock:
+            latencias["health"].extend(locales)
+
+    hilos = [threading.Thread(target=logins, args=(n,)) for n in range(args.concurrencia)]
+    hilos.append(threading.Thread(target=health))
+    inicio = time.monotonic()
+    for h in hilos:
+        h.start()
+    for h in hilos:
+        h.join()
+    transcurrido = time.monotonic() - inicio
+
+    for nombre in ("login", "health"):
+        r = resumen(latencias[nombre], errores[nombre], transcurrido)
+        print(f"{nombre:<8} {r['rps']:>8} req/s  p50 {r['p50_ms']} ms  p95 {r['p95_ms']} ms"
+              f"  p99 {r['p99_ms']} ms  errores {r['errores']}")
+    print(f"503 por pool saturado: {saturados[0]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+# benchmarks/bench_serializacion.py
+# Serialización de los listados con 10k filas:
+#   dict a mano       lo que hacían serializar_sesion / serializar_personaje
+#   compilado         serializadores.compilar (un literal de dict generado)
+#   consulta          ORM + dict a mano  vs  serializar_filas (Rows de columnas)
+#   stdlib / orjson   proveedor JSON de app.json al armar la respuesta
+#   endpoint          GET /dashboard/ y /personajes/ completos, sin caché
+#
+#   python -m benchmarks.bench_serializacion [--filas 10000] [--rondas 5]
+import argparse
+import gc
+import logging
+import os
+import tempfile
+import time
+
+
+def sesion_a_mano(s):
+    return {
+        "idsesion": s.idsesion,
+        "cronica": s.cronica,
+        "juego": s.juego,
+        "director": s.director,
+        "jugadores": s.jugadores or [],
+        "numero_de_sesion": s.numero_de_sesion,
+        "fecha": s.fecha.strftime("%Y-%m-%d"),
+        "resumen": s.resumen,
+    }
+
+
+def personaje_a_mano(p):
+    return {
+        "idpersonaje": p.idpersonaje,
+        "cronica": p.cronica,
+        "juego": p.juego,
+        "nombre": p.nombre,
+        "apellido": p.apellido,
+        "genero": p.genero,
+        "edad": p.edad,
+        "ocupacion": p.ocupacion,
+        "etnia": p.etnia,
+        "descripcion": p.descripcion,
+        "historia": p.historia,
+        "inventario": p.inventario if isinstance(p.inventario, list) else [],
+        "version_inventario": p.version_inventario,
+        "notas": p.notas,
+    }
+
+
+def mejor(rondas, funcion):
+    tiempos = []
+    for _ in range(rondas):
+        gc.collect()
+        gc.disable()   # sin pausas del GC a mitad de una ronda: con 10k dicts pesan
+        try:
+            inicio = time.perf_counter()
+            funcion()
+            tiempos.append(time.perf_counter() - inicio)
+        finally:
+            gc.enable()
+    return min(tiempos) * 1000
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serialización de listados: dict a mano vs compilado, stdlib vs orjson")
+    parser.add_argument("--filas", type=int, default=10_000)
+    parser.add_argument("--rondas", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/serializacion.db"
+    os.environ["RESPONSE_CACHE_ENABLED"] = "0"
+    os.environ["RATE_LIMIT_ENABLED"] = "0"
+    os.environ.setdefault("PASSWORD_SCRYPT_N", "1024")
+    logging.getLogger("nucleobitacora.lento").setLevel(logging.ERROR)   # 10k filas siempre es "lento"
+
+    from flask.json.provider import DefaultJSONProvider
+    from flask_jwt_extended import create_access_token
+
+    from app import create_app
+    from benchmarks.suite import sembrar
+    from dashboard import serializar_sesion
+    from extensions import db
+    from models import Dashboard, Personaje, User
+    from personajes import serializar_personaje
+    from serializadores import ProveedorOrjson, serializar_filas
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        sembrar(db, 1, args.filas, args.filas)
+        db.session.commit()
+        iduser = User.query.filter_by(username="bench_u0").one().iduser
+        token = create_access_token(identity=str(iduser))
+
+    proveedores = {"stdlib": DefaultJSONProvider(app)}
+    try:
+        proveedores["orjson"] = ProveedorOrjson(app)
+    except ImportError:
+        print("orjson no está instalado: solo stdlib\n")
+
+    casos = [
+        ("sesiones", Dashboard, sesion_a_mano, serializar_sesion, "/dashboard/"),
+        ("personajes", Personaje, personaje_a_mano, serializar_personaje, "/personajes/"),
+    ]
+    cliente = app.test_client()
+    headers = {"Authorization": f"Bearer {token}"}
+
+    print(f"{args.filas} filas, mejor de {args.rondas} rondas (ms)\n")
+    for nombre, modelo, a_mano, compilado, ruta in casos:
+        with app.app_context():
+            filas = modelo.query.filter_by(iduser=iduser).all()
+            assert [a_mano(f) for f in filas[:50]] == [compilado(f) for f in filas[:50]]
+
+            datos = [compilado(f) for f in filas]
+            print(f"{nombre}")
+            print(f"  dict a mano            {mejor(args.rondas, lambda: [a_mano(f) for f in filas]):8.1f}")
+            print(f"  compilado              {mejor(args.rondas, lambda: [compilado(f) for f in filas]):8.1f}")
+
+            query = modelo.query.filter_by(iduser=iduser)
+            t = mejor(args.rondas, lambda: [a_mano(f) for f in query.all()])
+            print(f"  consulta ORM + a mano  {t:8.1f}")
+            t = mejor(args.rondas, lambda: serializar_filas(query, compilado))
+            print(f"  serializar_filas       {t:8.1f}")
+
+            with app.test_request_context():
+                for clave, proveedor in proveedores.items():
+                    t = mejor(args.rondas, lambda: proveedor.response(datos).get_data())
+                    print(f"  respuesta {clave:<12} {t:8.1f}")
+
+        for clave, proveedor in proveedores.items():
+            app.json = proveedor
+            t = mejor(args.rondas, lambda: cliente.get(ruta, headers=headers).get_data())
+            print(f"  endpoint {clave:<13} {t:8.1f}")
+        print()
+
+
+if __name__ == "__main__":
+    main()
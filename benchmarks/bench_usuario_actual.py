@@ -0,0 +1,101 @@
+# benchmarks/bench_usuario_actual.py
+# Costo por request de resolver el usuario del JWT:
+#   int(get_jwt_identity())        lo que hacía cada ruta (sin contexto de usuario)
+#   current_user sin caché         user_lookup_loader con una consulta a `users`
+#   current_user con caché         user_lookup_loader + CacheUsuarios (TTL)
+#
+#   python -m benchmarks.bench_usuario_actual [--requests 5000] [--db sqlite:////tmp/bench.db]
+#
+# Con --db apuntando a Postgres la diferencia de la consulta es mayor (ida y
+# vuelta de red); con SQLite se ve solo el costo de SQLAlchemy.
+import argparse
+import os
+import tempfile
+import time
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Overhead por request del usuario actual")
+    parser.add_argument("--requests", type=int, default=2000, help="requests por ronda")
+    parser.add_argument("--rondas", type=int, default=5)
+    parser.add_argument("--db", help="DATABASE_URL (por defecto un SQLite temporal)")
+    args = parser.parse_args(argv)
+
+    os.environ["DATABASE_URL"] = args.db or f"sqlite:///{tempfile.mkdtemp()}/bench.db"
+
+    from flask_jwt_extended import create_access_token, current_user, get_jwt_identity, jwt_required
+
+    from app import create_app
+    from extensions import db, jwt
+    from models import User
+    from usuario_actual import cache_usuarios
+
+    app = create_app()
+
+    @app.route("/_bench/identity")
+    @jwt_required()
+    def bench_identity():
+        return {"iduser": int(get_jwt_identity())}
+
+    @app.route("/_bench/current_user")
+    @jwt_required()
+    def bench_current_user():
+        return {"iduser": current_user.iduser}
+
+    with app.app_context():
+        db.create_all()
+        usuario = User.query.filter_by(username="bench").first()
+        if usuario is None:
+            usuario = User(nombre="Bench", apellido="Mark", username="bench", password="bench")
+            db.session.add(usuario)
+            db.session.commit()
+        iduser = usuario.iduser
+        token = create_access_token(identity=str(iduser))
+
+    cliente = app.test_client()
+    headers = {"Authorization": f"Bearer {token}"}
+    loader = jwt._user_lookup_callback
+
+    def medir(ruta):
+        inicio = time.perf_counter()
+        for _ in range(args.requests):
+            assert cliente.get(ruta, headers=headers).status_code == 200
+        return (time.perf_counter() - inicio) / args.requests
+
+    ttl = cache_usuarios.ttl
+
+    def sin_loader():
+        jwt._user_lookup_callback = None
+        try:
+            return medir("/_bench/identity")
+        finally:
+            jwt._user_lookup_callback = loader
+
+    def sin_cache():
+        cache_usuarios.ttl = 0   # toda entrada nace vencida: una consulta por request
+        cache_usuarios.invalidar(iduser)
+        try:
+            return medir("/_bench/current_user")
+        finally:
+            cache_usuarios.ttl = ttl
+
+    modos = {
+        "int(get_jwt_identity())": sin_loader,
+        "current_user sin caché": sin_cache,
+        "current_user con caché": lambda: medir("/_bench/current_user"),
+    }
+
+    # Rondas intercaladas, mejor tiempo de cada modo: menos ruido de orden
+    resultados = {nombre: float("inf") for nombre in modos}
+    for _ in range(args.rondas):
+        for nombre, correr in modos.items():
+            resultados[nombre] = min(resultados[nombre], correr())
+
+    base = resultados["int(get_jwt_identity())"]
+    for nombre, segundos in resultados.items():
+        print(f"{nombre:<26} {segundos * 1e6:8.1f} µs/request  ({(segundos - base) * 1e6:+7.1f} µs)")
+    print(f"caché: {cache_usuarios.estadisticas()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+# benchmarks/carga_http.py
+# Generador de carga HTTP concurrente (solo stdlib) para comparar modos de servir.
+#
+#   # servidor de desarrollo
+#   python app.py
+#   python -m benchmarks.carga_http --base http://localhost:5050 --usuario u --password p
+#
+#   # gunicorn
+#   gunicorn --config gunicorn.conf.py
+#   python -m benchmarks.carga_http --base http://localhost:5050 --usuario u --password p
+#
+# Cada hilo mantiene su propia conexión keep-alive y pega a las rutas en ronda.
+import argparse
+import http.client
+import json
+import threading
+import time
+from urllib.parse import urlsplit
+
+
+def percentil(valores, p):
+    if not valores:
+        return None
+    ordenados = sorted(valores)
+    k = min(len(ordenados) - 1, max(0, round(p / 100 * (len(ordenados) - 1))))
+    return ordenados[k]
+
+
+def resumen(latencias, errores, duracion):
+    return {
+        "requests": len(latencias),
+        "errores": errores,
+        "rps": round(len(latencias) / duracion, 1) if duracion else None,
+        "p50_ms": _ms(percentil(latencias, 50)),
+        "p95_ms": _ms(percentil(latencias, 95)),
+        "p99_ms": _ms(percentil(latencias, 99)),
+    }
+
+
+def _ms(segundos):
+    return None if segundos is None else round(segundos * 1000, 2)
+
+
+def _conexion(base):
+    partes = urlsplit(base)
+    clase = http.client.HTTPSConnection if partes.scheme == "https" else http.client.HTTPConnection
+    return clase(partes.hostname, partes.port, timeout=30)
+
+
+def login(base, usuario, password):
+    conn = _conexion(base)
+    conn.request("POST", "/login/", body=json.dumps({"username": usuario, "password": password}),
+                 headers={"Content-Type": "application/json"})
+    respuesta = conn.getresponse()
+    datos = json.loads(respuesta.read())
+    conn.close()
+    if respuesta.status != 200:
+        raise SystemExit(f"Login falló ({respuesta.status}): {datos}")
+    return datos["access_token"]
+
+
+def correr(base, rutas, concurrencia, duracion, token=None):
+    """Devuelve {ruta: resumen} tras `duracion` segundos con `concurrencia` hilos."""
+    headers = {"Authorization": f"Bearer {token}"} if token else {}
+    latencias = {ruta: [] for ruta in rutas}
+    errores = {ruta: 0 for ruta in rutas}
+    lock = threading.Lock()
+    fin = time.monotonic() + duracion
+
+    def trabajador(desfase):
+        conn = _conexion(base)
+        locales = {ruta: [] for ruta in rutas}
+        fallas = {ruta: 0 for ruta in rutas}
+        i = desfase
+
+        while time.monotonic() < fin:
+            ruta = rutas[i % len(rutas)]
+            i += 1
+            inicio = time.perf_counter()
+            try:
+                conn.request("GET", ruta, headers=headers)
+                respuesta = conn.getresponse()
+                respuesta.read()
+                if respuesta.status >= 400:
+                    fallas[ruta] += 1
+                else:
+                    locales[ruta].append(time.perf_counter() - inicio)
+            except (OSError, http.client.HTTPException):
+                fallas[ruta] += 1
+                conn.close()
+                conn = _conexion(base)
+
+        conn.close()
+        with lock:
+            for ruta in rutas:
+                latencias[ruta].extend(locales[ruta])
+                errores[ruta] += fallas[ruta]
+
+    hilos = [threading.Thread(target=trabajador, args=(n,)) for n in range(concurrencia)]
+    inicio = time.monotonic()
+    for h in hilos:
+        h.start()
+    for h in hilos:
+        h.join()
+    transcurrido = time.monotonic() - inicio
+
+    return {ruta: resumen(latencias[ruta], errores[ruta], transcurrido) for ruta in rutas}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Carga HTTP concurrente contra el backend")
+    parser.add_argument("--base", default="http://localhost:5050")
+    parser.add_argument("--ruta", action="append", dest="rutas",
+                        help="ruta a medir (repetible); por defecto /health y /dashboard/")
+    parser.add_argument("--concurrencia", type=int, default=32)
+    parser.add_argument("--duracion", type=float, default=15)
+    parser.add_argument("--usuario")
+    parser.add_argument("--password")
+    parser.add_argument("--token", help="JWT ya emitido (en vez de usuario/password)")
+    parser.add_argument("--salida", help="guardar los resultados como JSON")
+    args = parser.parse_args(argv)
+
+    rutas = args.rutas or ["/health", "/dashboard/"]
+    token = args.token
+    if not token and args.usuario:
+        token = login(args.base, args.usuario, args.password)
+
+    resultados = correr(args.base, rutas, args.concurrencia, args.duracion, token)
+
+    for ruta, r in resultados.items():
+        print(f"{ruta:<20} {r['rps']:>8} req/s  p50 {r['p50_ms']} ms  p95 {r['p95_ms']} ms"
+              f"  p99 {r['p99_ms']} ms  errores {r['errores']}")
+
+    if args.salida:
+        with open(args.salida, "w") as f:
+            json.dump({"base": args.base, "concurrencia": args.concurrencia,
+                       "duracion": args.duracion, "rutas": resultados}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
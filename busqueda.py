@@ -0,0 +1,166 @@
+# busqueda.py
+# GET /search: búsqueda full-text sobre resúmenes de sesión e historias de
+# personajes, con ranking, fragmentos resaltados y paginación por cursor.
+#
+#   /search?q=conde+drácula&tipo=todo|sesiones|personajes&limit=20&cursor=...
+#
+# Usa las columnas tsvector `busqueda` (configuración 'spanish') que mantienen
+# los triggers de la migración c2f6a9d14b37, con sus índices GIN.
+import html
+from decimal import Decimal, InvalidOperation
+
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import current_user, jwt_required
+from sqlalchemy import Numeric, and_, cast, func, literal, literal_column, or_, select, tuple_, union_all
+
+from extensions import db
+from models import Dashboard, Personaje
+from paginacion import ParametroInvalido, codificar_cursor, decodificar_cursor, leer_limite
+
+busqueda_bp = Blueprint("busqueda_bp", __name__)
+
+CONFIG = literal_column("'spanish'::regconfig")
+TIPOS = {"todo": ("sesion", "personaje"), "sesiones": ("sesion",), "personajes": ("personaje",)}
+
+# Marcadores de control para el resaltado: el texto se escapa y recién después
+# se reemplazan por <mark>, así el contenido del usuario nunca llega como HTML
+_INICIO, _FIN = "\x02", "\x03"
+OPCIONES_HEADLINE = f"StartSel={_INICIO}, StopSel={_FIN}, MaxFragments=2, MaxWords=30, MinWords=12"
+
+
+def _rank(columna, consulta):
+    # numeric redondeado: se compara exacto al volver en el cursor
+    return func.round(cast(func.ts_rank_cd(columna, consulta), Numeric), 6)
+
+
+def _candidatos(tipo, iduser, consulta):
+    if tipo == "sesion":
+        return select(
+            literal("sesion").label("tipo"),
+            Dashboard.idsesion.label("id"),
+            _rank(Dashboard.busqueda, consulta).label("rank"),
+        ).where(Dashboard.iduser == iduser, Dashboard.busqueda.bool_op("@@")(consulta))
+
+    return select(
+        literal("personaje").label("tipo"),
+        Personaje.idpersonaje.label("id"),
+        _rank(Personaje.busqueda, consulta).label("rank"),
+    ).where(Personaje.iduser == iduser, Personaje.busqueda.bool_op("@@")(consulta))
+
+
+def _fragmento(texto):
+    if not texto:
+        return ""
+    return html.escape(texto).replace(_INICIO, "<mark>").replace(_FIN, "</mark>")
+
+
+def _detalle_sesiones(iduser, ids, consulta):
+    if not ids:
+        return {}
+
+    filas = db.session.execute(
+        select(
+            Dashboard.idsesion, Dashboard.cronica, Dashboard.numero_de_sesion, Dashboard.fecha,
+            func.ts_headline(CONFIG, func.coalesce(Dashboard.resumen, ""), consulta, OPCIONES_HEADLINE),
+        ).where(Dashboard.iduser == iduser, Dashboard.idsesion.in_(ids))
+    )
+    return {
+        f.idsesion: {
+            "titulo": f"Sesión {f.numero_de_sesion}" if f.numero_de_sesion is not None else f"Sesión #{f.idsesion}",
+            "cronica": f.cronica,
+            "fecha": f.fecha.strftime("%Y-%m-%d"),
+            "fragmento": _fragmento(f[4]),
+        }
+        for f in filas
+    }
+
+
+def _detalle_personajes(iduser, ids, consulta):
+    if not ids:
+        return {}
+
+    texto = func.concat_ws(" … ", Personaje.descripcion, Personaje.historia, Personaje.notas)
+    filas = db.session.execute(
+        select(
+            Personaje.idpersonaje, Personaje.nombre, Personaje.apellido, Personaje.cronica,
+            func.ts_headline(CONFIG, texto, consulta, OPCIONES_HEADLINE),
+        ).where(Personaje.iduser == iduser, Personaje.idpersonaje.in_(ids))
+    )
+    return {
+        f.idpersonaje: {
+            "titulo": f"{f.nombre} {f.apellido}",
+            "cronica": f.cronica,
+            "fragmento": _fragmento(f[4]),
+        }
+        for f in filas
+    }
+
+
+# GET /search
+@busqueda_bp.route("/", methods=["GET"])
+@jwt_required()
+def search():
+    iduser = current_user.iduser
+
+    texto = (request.args.get("q") or "").strip()
+    if not texto:
+        return jsonify({"msg": "Falta el parámetro q"}), 400
+
+    tipo = request.args.get("tipo", "todo")
+    if tipo not in TIPOS:
+        return jsonify({"msg": "tipo debe ser 'todo', 'sesiones' o 'personajes'"}), 400
+
+    if db.engine.dialect.name != "postgresql":
+        return jsonify({"msg": "La búsqueda full-text requiere PostgreSQL"}), 501
+
+    try:
+        limite = leer_limite(request.args, defecto=20, maximo=50)
+
+        consulta = func.websearch_to_tsquery(CONFIG, texto)
+        partes = [_candidatos(t, iduser, consulta) for t in TIPOS[tipo]]
+        resultados = (union_all(*partes) if len(partes) > 1 else partes[0]).subquery()
+
+        query = select(resultados.c.tipo, resultados.c.id, resultados.c.rank)
+
+        cursor = request.args.get("cursor")
+        if cursor:
+            valores = decodificar_cursor(cursor)
+            try:
+                rank, tipo_cursor, ident = Decimal(valores[0]), str(valores[1]), int(valores[2])
+            except (IndexError, TypeError, ValueError, InvalidOperation):
+                raise ParametroInvalido("Cursor inválido")
+            query = query.where(or_(
+                resultados.c.rank < rank,
+                and_(resultados.c.rank == rank,
+                     tuple_(resultados.c.tipo, resultados.c.id) < (tipo_cursor, ident)),
+            ))
+
+        filas = db.session.execute(
+            query.order_by(resultados.c.rank.desc(), resultados.c.tipo.desc(), resultados.c.id.desc())
+            .limit(limite + 1)
+        ).all()
+
+        siguiente = None
+        if len(filas) > limite:
+            filas = filas[:limite]
+            ultima = filas[-1]
+            siguiente = codificar_cursor(str(ultima.rank), ultima.tipo, ultima.id)
+
+        # ts_headline es caro: solo para las filas de esta página
+        detalles = {
+            "sesion": _detalle_sesiones(iduser, [f.id for f in filas if f.tipo == "sesion"], consulta),
+            "personaje": _detalle_personajes(iduser, [f.id for f in filas if f.tipo == "personaje"], consulta),
+        }
+
+        items = [
+            {"tipo": f.tipo, "id": f.id, "rank": float(f.rank), **detalles[f.tipo].get(f.id, {})}
+            for f in filas
+        ]
+
+        return jsonify({"items": items, "next_cursor": siguiente}), 200
+
+    except ParametroInvalido as e:
+        return jsonify({"msg": "Parámetros inválidos", "error": str(e)}), 400
+
+    except Exception as e:
+        return jsonify({"msg": "Error en la búsqueda", "error": str(e)}), 500
@@ -0,0 +1,191 @@
+# cache.py
+# Caché de respuestas por usuario para los listados (GET /dashboard, /personajes).
+#
+# Las entradas se guardan por (recurso, iduser, variante). La variante es el
+# ETag de condicional.py, así que una entrada nunca sirve datos de otra versión
+# aunque otro worker haya escrito; las escrituras además invalidan el recurso
+# del usuario para liberar memoria enseguida.
+#
+# Backend en memoria (LRU + TTL + tope de bytes) por defecto; con
+# RESPONSE_CACHE_URL=redis://... se comparte entre workers.
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app, make_response
+
+TTL = int(os.getenv("RESPONSE_CACHE_TTL", "300"))
+MAX_BYTES = int(float(os.getenv("RESPONSE_CACHE_MAX_MB", "32")) * 1024 * 1024)
+HABILITADA = os.getenv("RESPONSE_CACHE_ENABLED", "1") not in ("0", "false", "False")
+
+
+class CacheMemoria:
+    """LRU en proceso con TTL y tope de memoria (bytes de los cuerpos)."""
+
+    def __init__(self, ttl=TTL, max_bytes=MAX_BYTES):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._entradas = OrderedDict()   # (recurso, iduser, variante) -> (vence, valor)
+        self._por_usuario = {}           # (recurso, iduser) -> {claves}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = self.expirations = 0
+
+    def obtener(self, recurso, iduser, variante):
+        clave = (recurso, iduser, variante)
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is None:
+                self.misses += 1
+                return None
+
+            vence, valor = entrada
+            if vence < time.monotonic():
+                self._quitar(clave)
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entradas.move_to_end(clave)
+            self.hits += 1
+            return valor
+
+    def guardar(self, recurso, iduser, variante, valor):
+        if len(valor) > self.max_bytes:
+            return
+
+        clave = (recurso, iduser, variante)
+        with self._lock:
+            if clave in self._entradas:
+                self._quitar(clave)
+
+            self._entradas[clave] = (time.monotonic() + self.ttl, valor)
+            self._por_usuario.setdefault((recurso, iduser), set()).add(clave)
+            self._bytes += len(valor)
+
+            while self._bytes > self.max_bytes:
+                self._quitar(next(iter(self._entradas)))
+                self.evictions += 1
+
+    def invalidar(self, recurso, iduser):
+        with self._lock:
+            for clave in list(self._por_usuario.get((recurso, iduser), ())):
+                self._quitar(clave)
+
+    def _quitar(self, clave):
+        _, valor = self._entradas.pop(clave)
+        self._bytes -= len(valor)
+        grupo = self._por_usuario.get(clave[:2])
+        if grupo is not None:
+            grupo.discard(clave)
+            if not grupo:
+                del self._por_usuario[clave[:2]]
+
+    def estadisticas(self):
+        with self._lock:
+            return {
+                "backend": "memoria",
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "entradas": len(self._entradas),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "ttl": self.ttl,
+            }
+
+
+class CacheRedis:
+    """Un hash por (recurso, iduser): invalidar es un solo DEL."""
+
+    def __init__(self, url, ttl=TTL):
+        import redis
+
+        self.ttl = ttl
+        self._redis = redis.Redis.from_url(url)
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.errores = 0
+
+    @staticmethod
+    def _clave(recurso, iduser):
+        return f"respuestas:{recurso}:{iduser}"
+
+    def _contar(self, campo):
+        with self._lock:
+            setattr(self, campo, getattr(self, campo) + 1)
+
+    def obtener(self, recurso, iduser, variante):
+        try:
+            valor = self._redis.hget(self._clave(recurso, iduser), variante)
+        except Exception:
+            # Si Redis no responde se sigue sin caché
+            self._contar("errores")
+            valor = None
+
+        self._contar("hits" if valor is not None else "misses")
+        return valor
+
+    def guardar(self, recurso, iduser, variante, valor):
+        clave = self._clave(recurso, iduser)
+        try:
+            with self._redis.pipeline() as pipe:
+                pipe.hset(clave, variante, valor)
+                pipe.expire(clave, self.ttl)
+                pipe.execute()
+        except Exception:
+            self._contar("errores")
+
+    def invalidar(self, recurso, iduser):
+        try:
+            self._redis.delete(self._clave(recurso, iduser))
+        except Exception:
+            self._contar("errores")
+
+    def estadisticas(self):
+        datos = {
+            "backend": "redis",
+            "hits": self.hits,
+            "misses": self.misses,
+            "errores": self.errores,
+            "ttl": self.ttl,
+        }
+        try:
+            info = self._redis.info("stats")
+            datos["evictions"] = info.get("evicted_keys", 0)
+            datos["expirations"] = info.get("expired_keys", 0)
+        except Exception:
+            pass
+        return datos
+
+
+def crear_cache():
+    url = os.getenv("RESPONSE_CACHE_URL")
+    if url:
+        return CacheRedis(url)
+    return CacheMemoria()
+
+
+cache_respuestas = crear_cache()
+
+
+def respuesta_cacheada(recurso, iduser, variante, construir):
+    """Devuelve el cuerpo cacheado o llama a `construir()` y guarda el resultado.
+
+    Solo se guardan respuestas 200 JSON.
+    """
+    if HABILITADA:
+        cuerpo = cache_respuestas.obtener(recurso, iduser, variante)
+        if cuerpo is not None:
+            return current_app.response_class(cuerpo, mimetype="application/json")
+
+    respuesta = make_response(construir())
+    if HABILITADA and respuesta.status_code == 200:
+        cache_respuestas.guardar(recurso, iduser, variante, respuesta.get_data())
+    return respuesta
+
+
+def invalidar(recurso, iduser):
+    if HABILITADA:
+        cache_respuestas.invalidar(recurso, iduser)
@@ -0,0 +1,190 @@
+# compresion.py
+# Compresión de respuestas (gzip / brotli) negociada por Accept-Encoding.
+#
+#   COMPRESSION_ENABLED=1
+#   COMPRESSION_MIN_BYTES=1024      por debajo no vale la pena (cabe en un paquete)
+#   COMPRESSION_LEVEL=6             nivel de gzip (1-9)
+#   COMPRESSION_BROTLI_QUALITY=4    calidad de brotli (0-11); 4-5 rinde mejor que
+#                                   gzip -6 a un costo parecido
+#   COMPRESSION_STREAM_BYTES=16384  en respuestas streaming, cada cuánto se envía
+#                                   lo comprimido (Z_SYNC_FLUSH)
+#
+# brotli viene en requirements.txt; si el paquete no está instalado se negocia
+# solo gzip.
+# Los PDFs no pasan por acá: ya salen con los streams comprimidos por ReportLab.
+import os
+import zlib
+
+from flask import request
+
+import metricas
+
+HABILITADA = os.getenv("COMPRESSION_ENABLED", "1") not in ("0", "false", "False")
+MIN_BYTES = int(os.getenv("COMPRESSION_MIN_BYTES", "1024"))
+NIVEL_GZIP = int(os.getenv("COMPRESSION_LEVEL", "6"))
+CALIDAD_BROTLI = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
+BYTES_POR_FLUSH = int(os.getenv("COMPRESSION_STREAM_BYTES", "16384"))
+
+TIPOS = (
+    "application/json",
+    "application/x-ndjson",
+    "text/csv",
+    "text/plain",
+    "text/html",
+)
+
+_brotli = None
+
+
+def _modulo_brotli():
+    global _brotli
+    if _brotli is None:
+        try:
+            import brotli
+        except ImportError:
+            brotli = False
+        _brotli = brotli
+    return _brotli
+
+
+# ============================================================
+# Negociación
+# ============================================================
+
+def elegir_codificacion(accept_encoding):
+    """"br", "gzip" o None según Accept-Encoding (respeta q=0)."""
+    aceptadas = {}
+    for parte in accept_encoding.split(","):
+        nombre, _, parametros = parte.strip().partition(";")
+        q = 1.0
+        parametros = parametros.strip()
+        if parametros.startswith("q="):
+            try:
+                q = float(parametros[2:])
+            except ValueError:
+                q = 0.0
+        aceptadas[nombre.strip().lower()] = q
+
+    comodin = aceptadas.get("*", 0.0)
+    candidatas = ["br", "gzip"] if _modulo_brotli() else ["gzip"]
+    mejor = max(candidatas, key=lambda c: aceptadas.get(c, comodin))
+    return mejor if aceptadas.get(mejor, comodin) > 0 else None
+
+
+# ============================================================
+# Compresores
+# ============================================================
+
+class _Gzip:
+    def __init__(self):
+        self._z = zlib.compressobj(NIVEL_GZIP, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def comprimir(self, datos):
+        return self._z.compress(datos)
+
+    def vaciar(self):
+        return self._z.flush(zlib.Z_SYNC_FLUSH)
+
+    def terminar(self):
+        return self._z.flush()
+
+
+class _Brotli:
+    def __init__(self):
+        self._c = _modulo_brotli().Compressor(quality=CALIDAD_BROTLI)
+
+    def comprimir(self, datos):
+        return self._c.process(datos)
+
+    def vaciar(self):
+        return self._c.flush()
+
+    def terminar(self):
+        return self._c.finish()
+
+
+COMPRESORES = {"gzip": _Gzip, "br": _Brotli}
+
+
+def _en_streaming(iterable, compresor, codificacion):
+    """Comprime un generador a medida: vacía cada BYTES_POR_FLUSH de entrada
+    para que el cliente reciba datos sin esperar al final (exportaciones)."""
+    pendiente = entrada = salida = 0
+    try:
+        for parte in iterable:
+            if isinstance(parte, str):
+                parte = parte.encode()
+            entrada += len(parte)
+            pendiente += len(parte)
+            bloque = compresor.comprimir(parte)
+            if pendiente >= BYTES_POR_FLUSH:
+                bloque += compresor.vaciar()
+                pendiente = 0
+            if bloque:
+                salida += len(bloque)
+                yield bloque
+        bloque = compresor.terminar()
+        salida += len(bloque)
+        yield bloque
+    finally:
+        if hasattr(iterable, "close"):
+            iterable.close()
+        _contar(codificacion, entrada, salida)
+
+
+def _contar(codificacion, entrada, salida):
+    metricas.registro.sumar("http_response_bytes_total", (("encoding", "identity"),), entrada,
+                            ayuda="Bytes de respuesta antes de comprimir")
+    metricas.registro.sumar("http_response_compressed_bytes_total", (("encoding", codificacion),), salida,
+                            ayuda="Bytes enviados después de comprimir")
+
+
+# ============================================================
+# Hook
+# ============================================================
+
+def comprimir_respuesta(respuesta):
+    if (
+        not HABILITADA
+        or respuesta.status_code < 200
+        or respuesta.status_code in (204, 206, 304)
+        or respuesta.direct_passthrough          # send_file: PDFs y archivos
+        or "Content-Encoding" in respuesta.headers
+        or respuesta.mimetype not in TIPOS
+    ):
+        return respuesta
+
+    # La representación depende de Accept-Encoding aunque esta vez no se comprima
+    respuesta.vary.add("Accept-Encoding")
+
+    codificacion = elegir_codificacion(request.headers.get("Accept-Encoding", ""))
+    if codificacion is None:
+        return respuesta
+
+    if respuesta.is_streamed:
+        compresor = COMPRESORES[codificacion]()
+        respuesta.response = _en_streaming(respuesta.response, compresor, codificacion)
+        respuesta.headers.pop("Content-Length", None)
+    else:
+        datos = respuesta.get_data()
+        if len(datos) < MIN_BYTES:
+            return respuesta
+        compresor = COMPRESORES[codificacion]()
+        comprimido = compresor.comprimir(datos) + compresor.terminar()
+        respuesta.set_data(comprimido)
+        _contar(codificacion, len(datos), len(comprimido))
+
+    respuesta.headers["Content-Encoding"] = codificacion
+
+    # Un ETag fuerte identifica bytes exactos; el cuerpo comprimido es otro
+    etag, debil = respuesta.get_etag()
+    if etag and not debil:
+        respuesta.set_etag(etag, weak=True)
+
+    return respuesta
+
+
+def instalar(app):
+    # Registrar después de metricas.instalar: los after_request corren en orden
+    # inverso, así el tiempo de comprimir entra en la latencia medida
+    app.after_request(comprimir_respuesta)
@@ -0,0 +1,72 @@
+# condicional.py
+# Requests condicionales (ETag / Last-Modified) para las rutas de lectura.
+#
+# La versión se calcula con una consulta chica sobre (iduser, updated_at) antes
+# de la consulta completa; si el cliente ya tiene esa versión se responde 304
+# sin cargar ni serializar nada. Last-Modified / If-Modified-Since solo se usan
+# para filas sueltas (ver version_coleccion).
+import hashlib
+from datetime import timezone
+
+from flask import make_response, request
+from sqlalchemy import func
+
+from extensions import db
+
+
+def calcular_etag(*partes):
+    return hashlib.sha1("|".join(str(p) for p in partes).encode()).hexdigest()
+
+
+def version_coleccion(modelo, iduser, *variante):
+    """ETag de todas las filas del usuario en `modelo`.
+
+    Incluye la cantidad de filas para que un DELETE también cambie la versión.
+    Las colecciones no llevan Last-Modified: borrar una fila que no es la más
+    nueva no cambia max(updated_at), y un If-Modified-Since solo contra esa
+    fecha devolvería un 304 viejo. Se validan únicamente por If-None-Match.
+    """
+    cantidad, ultima = db.session.query(
+        func.count(), func.max(modelo.updated_at)
+    ).filter(modelo.iduser == iduser).one()
+
+    return calcular_etag(modelo.__tablename__, iduser, cantidad, ultima, *variante)
+
+
+def version_entidad(modelo, iduser, ident, *variante):
+    """(etag, ultima_modificacion) de una fila, o None si no existe o no es del usuario."""
+    pk = modelo.__mapper__.primary_key[0]
+    ultima = db.session.query(modelo.updated_at).filter(
+        pk == ident, modelo.iduser == iduser
+    ).scalar()
+
+    if ultima is None:
+        return None
+    return calcular_etag(modelo.__tablename__, ident, ultima, *variante), ultima
+
+
+def no_modificado(etag, ultima):
+    """Respuesta 304 si el cliente ya tiene esta versión, si no None."""
+    if request.if_none_match:
+        if not request.if_none_match.contains_weak(etag):
+            return None
+    elif request.if_modified_since and ultima is not None:
+        if ultima.replace(microsecond=0, tzinfo=timezone.utc) > request.if_modified_since:
+            return None
+    else:
+        return None
+
+    return con_validadores(make_response("", 304), etag, ultima)
+
+
+def con_validadores(respuesta, etag, ultima):
+    """Agrega ETag/Last-Modified a una respuesta (o tupla de Flask)."""
+    respuesta = make_response(respuesta)
+    respuesta.set_etag(etag, weak=True)
+    if ultima is not None:
+        respuesta.last_modified = ultima.replace(tzinfo=timezone.utc)
+
+    # Depende del token: que ningún cache compartido la reutilice entre usuarios
+    respuesta.headers["Cache-Control"] = "private, no-cache"
+    respuesta.vary.add("Authorization")
+    return respuesta
@@ -0,0 +1,150 @@
+# contrasenas.py
+# Hash de contraseñas (scrypt de la stdlib; argon2id si está argon2-cffi) en un
+# pool acotado de hilos. Ambos liberan el GIL mientras calculan, así que un
+# login no frena a los otros hilos del worker; y como el pool y la cola tienen
+# tope, un pico de logins se corta con 503 en vez de apilar requests.
+#
+#   PASSWORD_HASH=scrypt         scrypt | argon2
+#   PASSWORD_SCRYPT_N=32768      costo (potencia de 2); memoria = 128 * N * r
+#   PASSWORD_SCRYPT_R=8
+#   PASSWORD_SCRYPT_P=1
+#   PASSWORD_ARGON2_TIME=3       iteraciones
+#   PASSWORD_ARGON2_MEMORY=65536 KiB
+#   PASSWORD_ARGON2_PARALLELISM=1
+#   PASSWORD_WORKERS=<cpus>      hashes simultáneos por proceso
+#   PASSWORD_MAX_PENDIENTES=32   en curso + en cola; más allá -> Saturado
+#   PASSWORD_ESPERA_MAX=2        segundos esperando lugar en la cola
+#
+# Formato scrypt guardado: scrypt$<n>$<r>$<p>$<sal b64>$<hash b64>
+# Las filas viejas tienen la contraseña en texto plano: se aceptan una vez y se
+# rehashean en ese mismo login (ver login.py).
+import base64
+import hashlib
+import hmac
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+ALGORITMO = os.getenv("PASSWORD_HASH", "scrypt")
+SCRYPT_N = int(os.getenv("PASSWORD_SCRYPT_N", "32768"))
+SCRYPT_R = int(os.getenv("PASSWORD_SCRYPT_R", "8"))
+SCRYPT_P = int(os.getenv("PASSWORD_SCRYPT_P", "1"))
+ARGON2_TIME = int(os.getenv("PASSWORD_ARGON2_TIME", "3"))
+ARGON2_MEMORY = int(os.getenv("PASSWORD_ARGON2_MEMORY", "65536"))
+ARGON2_PARALLELISM = int(os.getenv("PASSWORD_ARGON2_PARALLELISM", "1"))
+WORKERS = int(os.getenv("PASSWORD_WORKERS", str(os.cpu_count() or 1)))
+MAX_PENDIENTES = int(os.getenv("PASSWORD_MAX_PENDIENTES", "32"))
+ESPERA_MAX = float(os.getenv("PASSWORD_ESPERA_MAX", "2"))
+
+PREFIJO_SCRYPT = "scrypt$"
+PREFIJO_ARGON2 = "$argon2"
+
+
+class Saturado(Exception):
+    """No hay lugar en el pool de hashing: responder 503 con Retry-After."""
+
+
+def _b64(datos):
+    return base64.b64encode(datos).decode().rstrip("=")
+
+
+def _desde_b64(texto):
+    return base64.b64decode(texto + "=" * (-len(texto) % 4))
+
+
+def _scrypt(password, sal, n, r, p):
+    return hashlib.scrypt(password.encode(), salt=sal, n=n, r=r, p=p,
+                          maxmem=256 * n * r, dklen=32)
+
+
+_argon2 = None
+
+
+def _hasher_argon2():
+    global _argon2
+    if _argon2 is None:
+        from argon2 import PasswordHasher
+
+        _argon2 = PasswordHasher(time_cost=ARGON2_TIME, memory_cost=ARGON2_MEMORY,
+                                 parallelism=ARGON2_PARALLELISM)
+    return _argon2
+
+
+# ============================================================
+# Operaciones puras (corren dentro del pool)
+# ============================================================
+
+def _hashear(password):
+    if ALGORITMO == "argon2":
+        return _hasher_argon2().hash(password)
+
+    sal = os.urandom(16)
+    clave = _scrypt(password, sal, SCRYPT_N, SCRYPT_R, SCRYPT_P)
+    return f"{PREFIJO_SCRYPT}{SCRYPT_N}${SCRYPT_R}${SCRYPT_P}${_b64(sal)}${_b64(clave)}"
+
+
+def necesita_rehash(guardado):
+    """True si `guardado` no usa el algoritmo y los costos configurados."""
+    if ALGORITMO == "argon2":
+        return not guardado.startswith(PREFIJO_ARGON2) or _hasher_argon2().check_needs_rehash(guardado)
+
+    if not guardado.startswith(PREFIJO_SCRYPT):
+        return True
+    n, r, p = guardado.split("$")[1:4]
+    return (int(n), int(r), int(p)) != (SCRYPT_N, SCRYPT_R, SCRYPT_P)
+
+
+def _verificar(guardado, password):
+    """(ok, hash_nuevo): hash_nuevo viene cuando hay que reemplazar lo guardado."""
+    if guardado.startswith(PREFIJO_SCRYPT):
+        try:
+            n, r, p, sal, clave = guardado.split("$")[1:]
+            ok = hmac.compare_digest(_scrypt(password, _desde_b64(sal), int(n), int(r), int(p)),
+                                     _desde_b64(clave))
+        except ValueError:
+            ok = False
+
+    elif guardado.startswith(PREFIJO_ARGON2):
+        from argon2.exceptions import InvalidHashError, VerificationError
+
+        try:
+            ok = _hasher_argon2().verify(guardado, password)
+        except (VerificationError, InvalidHashError):
+            ok = False
+
+    else:
+        # Fila vieja en texto plano
+        ok = hmac.compare_digest(guardado.encode(), password.encode())
+
+    if ok and necesita_rehash(guardado):
+        return True, _hashear(password)
+    return ok, None
+
+
+# ============================================================
+# Pool acotado
+# ============================================================
+
+_pool = ThreadPoolExecutor(max_workers=WORKERS, thread_name_prefix="hash")
+_cupos = threading.BoundedSemaphore(MAX_PENDIENTES)
+
+
+def _en_pool(funcion, *args):
+    if not _cupos.acquire(timeout=ESPERA_MAX):
+        raise Saturado("Demasiados logins simultáneos, reintentar en unos segundos")
+    try:
+        futuro = _pool.submit(funcion, *args)
+    except BaseException:
+        _cupos.release()
+        raise
+    futuro.add_done_callback(lambda _: _cupos.release())
+    return futuro.result()
+
+
+def hashear(password):
+    return _en_pool(_hashear, password)
+
+
+def verificar(guardado, password):
+    """(ok, hash_nuevo). Si hash_nuevo no es None hay que guardarlo en la fila."""
+    return _en_pool(_verificar, guardado or "", password)
@@ -1,88 +1,332 @@
 # dashboard.py Backend
 from flask import Blueprint, request, jsonify
 from datetime import datetime
-from flask_jwt_extended import jwt_required, get_jwt_identity
+import re
+import tempfile
+from flask_jwt_extended import current_user, jwt_required
 from extensions import db
-from models import Dashboard
+from models import AsistenciaCronica, Dashboard, EstadisticaCronica, Personaje
 from flask import send_file
 from flask import make_response
-
-from io import BytesIO
+from sqlalchemy import func, tuple_
+from paginacion import ParametroInvalido, codificar_cursor, decodificar_cursor, leer_limite, leer_valores
+from exportar import respuesta_exportacion
+from lotes import LoteInvalido, aplicar_lote, leer_operaciones
+from pdfs import VERSION_RENDER, datos_personaje_pdf, datos_sesion_pdf, render_cronica_pdf
+from trabajos_pdf import encolar, obtener_pdf, respuesta_trabajo
+from cache import invalidar, respuesta_cacheada
+from eventos import publicar, publicar_lote
+from metricas import medir_render
+from serializadores import compilar, fecha_iso, lista, serializar_filas
+from condicional import calcular_etag, con_validadores, no_modificado, version_coleccion, version_entidad
 
 dashboard_bp = Blueprint("dashboard_bp", __name__)
 
+# Listado, detalle y exportación comparten serializador; la vista resumen del
+# listado paginado omite `resumen`, que se pide aparte
+serializar_sesion = compilar(Dashboard, transformar={"jugadores": lista, "fecha": fecha_iso})
+serializar_sesion_resumen = compilar(Dashboard, excluir=("resumen",), transformar={"jugadores": lista, "fecha": fecha_iso})
+
+
+def normalizar_jugadores(valor):
+    """Lista de nombres sin vacíos ni repetidos.
+
+    Acepta la lista o el texto libre de antes ("Ana, Luis; Sofía").
+    """
+    if valor is None:
+        return None
+    if isinstance(valor, str):
+        valor = re.split(r"[,;\n]", valor)
+    elif not isinstance(valor, list):
+        raise ValueError("jugadores debe ser una lista o un texto")
+
+    jugadores = []
+    for j in valor:
+        j = str(j).strip()
+        if j and j not in jugadores:
+            jugadores.append(j)
+    return jugadores
+
+
+def filtrar_sesiones(query):
+    """?jugador= (repetible): sesiones donde estuvieron todos (jugadores @> [...])."""
+    jugadores = leer_valores(request.args, "jugador")
+    if jugadores:
+        query = query.filter(Dashboard.jugadores.contains(jugadores))
+    return query
+
+
 # GET /dashboard
+# Sin parámetros devuelve la lista completa (compatibilidad).
+# ?jugador=Ana (repetible) filtra por contención sobre el índice GIN de jugadores.
+# Con ?limit=, ?cursor= o ?vista= pagina por keyset sobre (fecha, idsesion):
+#   vista=resumen  (defecto) -> sin el campo `resumen`, ver GET /dashboard/<idsesion>
+#   vista=completa           -> incluye `resumen`
 @dashboard_bp.route("/", methods=["GET"])
 @jwt_required()
 def get_dashboard():
-    iduser = int(get_jwt_identity())  # ✅ PARCHE IMPORTANTÍSIMO
+    iduser = current_user.iduser
+
+    paginado = any(k in request.args for k in ("limit", "cursor", "vista"))
+
+    if "jugador" in request.args and db.engine.dialect.name != "postgresql":
+        return jsonify({"msg": "El filtro por jugador requiere PostgreSQL"}), 501
 
     try:
-        sesiones = Dashboard.query.filter_by(iduser=iduser).order_by(Dashboard.fecha.desc()).all()
+        # Cada combinación de parámetros es una representación distinta
+        etag = version_coleccion(Dashboard, iduser, request.query_string)
+        respuesta = no_modificado(etag, None)
+        if respuesta:
+            return respuesta
+
+        def construir():
+            if not paginado:
+                query = filtrar_sesiones(Dashboard.query.filter_by(iduser=iduser)).order_by(Dashboard.fecha.desc())
+                return jsonify(serializar_filas(query, serializar_sesion)), 200
+
+            return get_dashboard_paginado(iduser)
+
+        return con_validadores(respuesta_cacheada("dashboard", iduser, etag, construir), etag, None)
+
+    except ParametroInvalido as e:
+        return jsonify({"msg": "Parámetros inválidos", "error": str(e)}), 400
+
+    except Exception as e:
+        return jsonify({"msg": "Error al obtener dashboard", "error": str(e)}), 500
+
+
+def get_dashboard_paginado(iduser):
+    limite = leer_limite(request.args)
+    vista = request.args.get("vista", "resumen")
+    if vista not in ("resumen", "completa"):
+        raise ParametroInvalido("vista debe ser 'resumen' o 'completa'")
+    serializar = serializar_sesion if vista == "completa" else serializar_sesion_resumen
+
+    # Solo las columnas que se devuelven, como Rows (sin instancias del ORM)
+    query = filtrar_sesiones(Dashboard.query.filter_by(iduser=iduser)).with_entities(*serializar.atributos)
+
+    cursor = request.args.get("cursor")
+    if cursor:
+        valores = decodificar_cursor(cursor)
+        try:
+            fecha = datetime.strptime(valores[0], "%Y-%m-%d").date()
+            idsesion = int(valores[1])
+        except (IndexError, TypeError, ValueError):
+            raise ParametroInvalido("Cursor inválido")
+        query = query.filter(tuple_(Dashboard.fecha, Dashboard.idsesion) < (fecha, idsesion))
+
+    # Se pide una fila de más para saber si hay página siguiente
+    sesiones = (
+        query.order_by(Dashboard.fecha.desc(), Dashboard.idsesion.desc())
+        .limit(limite + 1)
+        .all()
+    )
+
+    siguiente = None
+    if len(sesiones) > limite:
+        sesiones = sesiones[:limite]
+        ultima = sesiones[-1]
+        siguiente = codificar_cursor(ultima.fecha.strftime("%Y-%m-%d"), ultima.idsesion)
+
+    return jsonify({
+        "items": [serializar(s) for s in sesiones],
+        "next_cursor": siguiente
+    }), 200
+
+
+# GET /dashboard/export?formato=ndjson|csv
+@dashboard_bp.route("/export", methods=["GET"])
+@jwt_required()
+def export_dashboard():
+    iduser = current_user.iduser
+
+    query = (
+        Dashboard.query.filter_by(iduser=iduser)
+        .with_entities(*serializar_sesion.atributos)
+        .order_by(Dashboard.fecha.desc(), Dashboard.idsesion.desc())
+    )
+
+    try:
+        return respuesta_exportacion(
+            query, serializar_sesion, serializar_sesion.columnas, f"sesiones_{iduser}",
+            request.args.get("formato", "ndjson")
+        )
+
+    except ValueError as e:
+        return jsonify({"msg": "Parámetros inválidos", "error": str(e)}), 400
+
 
-        resultado = [
+# GET /dashboard/stats
+# Agregados por crónica desde las tablas resumen que mantienen los triggers
+# (estadisticas_cronica / asistencia_cronica) + personajes por juego.
+@dashboard_bp.route("/stats", methods=["GET"])
+@jwt_required()
+def get_dashboard_stats():
+    iduser = current_user.iduser
+
+    if db.engine.dialect.name != "postgresql":
+        return jsonify({"msg": "Las estadísticas requieren PostgreSQL"}), 501
+
+    try:
+        etag = calcular_etag("stats", version_coleccion(Dashboard, iduser), version_coleccion(Personaje, iduser))
+
+        respuesta = no_modificado(etag, None)
+        if respuesta:
+            return respuesta
+
+        asistencia = {}
+        for a in AsistenciaCronica.query.filter_by(iduser=iduser).order_by(AsistenciaCronica.sesiones.desc()):
+            asistencia.setdefault(a.cronica, {})[a.jugador] = a.sesiones
+
+        cronicas = [
             {
-                "idsesion": s.idsesion,
-                "cronica": s.cronica,
-                "juego": s.juego,
-                "director": s.director,
-                "jugadores": s.jugadores,
-                "numero_de_sesion": s.numero_de_sesion,
-                "fecha": s.fecha.strftime("%Y-%m-%d"),
-                "resumen": s.resumen
+                "cronica": e.cronica or None,
+                "sesiones": e.sesiones,
+                "primera_fecha": e.primera_fecha.strftime("%Y-%m-%d") if e.primera_fecha else None,
+                "ultima_fecha": e.ultima_fecha.strftime("%Y-%m-%d") if e.ultima_fecha else None,
+                "asistencia": asistencia.get(e.cronica, {}),
             }
-            for s in sesiones
+            for e in EstadisticaCronica.query.filter_by(iduser=iduser)
+            .order_by(EstadisticaCronica.ultima_fecha.desc())
         ]
 
-        return jsonify(resultado), 200
+        por_juego = db.session.query(Personaje.juego, func.count()).filter(
+            Personaje.iduser == iduser
+        ).group_by(Personaje.juego).all()
+
+        return con_validadores((jsonify({
+            "cronicas": cronicas,
+            "personajes_por_juego": [{"juego": juego, "personajes": n} for juego, n in por_juego],
+            "totales": {
+                "cronicas": len(cronicas),
+                "sesiones": sum(c["sesiones"] for c in cronicas),
+                "personajes": sum(n for _, n in por_juego),
+            }
+        }), 200), etag, None)
 
     except Exception as e:
-        return jsonify({"msg": "Error al obtener dashboard", "error": str(e)}), 500
+        return jsonify({"msg": "Error al obtener estadísticas", "error": str(e)}), 500
+
+
+# GET /dashboard/<idsesion>
+@dashboard_bp.route("/<int:idsesion>", methods=["GET"])
+@jwt_required()
+def get_sesion(idsesion):
+    iduser = current_user.iduser
+
+    try:
+        version = version_entidad(Dashboard, iduser, idsesion)
+        if not version:
+            return jsonify({"msg": "Sesión no encontrada o sin permiso"}), 404
+
+        respuesta = no_modificado(*version)
+        if respuesta:
+            return respuesta
+
+        sesion = Dashboard.query.filter_by(idsesion=idsesion, iduser=iduser).first()
+
+        if not sesion:
+            return jsonify({"msg": "Sesión no encontrada o sin permiso"}), 404
+
+        return con_validadores((jsonify(serializar_sesion(sesion)), 200), *version)
+
+    except Exception as e:
+        return jsonify({"msg": "Error al obtener sesión", "error": str(e)}), 500
 
 
 # POST /dashboard
 @dashboard_bp.route("/", methods=["POST"])
 @jwt_required()
 def create_dashboard():
-    iduser = int(get_jwt_identity())  # ✅ convertir a int SIEMPRE
+    iduser = current_user.iduser
     data = request.get_json()
 
-    if not data:
+    if not isinstance(data, dict) or not data:
         return jsonify({"msg": "Debe enviar JSON"}), 400
 
     try:
-        fecha_str = data.get("fecha")
-        fecha = datetime.strptime(fecha_str, "%Y-%m-%d") if fecha_str else datetime.utcnow()
-
-        nueva = Dashboard(
-            iduser=iduser,
-            cronica=data.get("cronica"),
-            juego=data.get("juego"),
-            director=data.get("director"),
-            jugadores=data.get("jugadores"),
-            numero_de_sesion=data.get("numero_de_sesion"),
-            fecha=fecha,
-            resumen=data.get("resumen")
-        )
+        # Misma validación que POST /dashboard/batch
+        nueva = Dashboard(iduser=iduser, **preparar_sesion(data, nueva=True))
 
         db.session.add(nueva)
+        db.session.flush()   # idsesion para el aviso sin releer la fila después del commit
+        idsesion = nueva.idsesion
         db.session.commit()
+        invalidar("dashboard", iduser)
+        publicar(iduser, "sesion", [("create", idsesion)])
 
         return jsonify({"msg": "Sesión creada exitosamente"}), 201
 
+    # Campos con formato inválido (preparar_sesion)
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({"msg": "Datos inválidos", "error": str(e)}), 400
+
     except Exception as e:
         db.session.rollback()
         return jsonify({"msg": "Error al crear sesión", "error": str(e)}), 500
 
 
+# POST /dashboard/batch
+# {"operaciones": [{"op": "create", "datos": {...}},
+#                  {"op": "update", "idsesion": 3, "datos": {...}},
+#                  {"op": "delete", "idsesion": 4}]}
+CAMPOS_SESION = ["cronica", "juego", "director", "jugadores", "numero_de_sesion", "resumen"]
+
+
+def preparar_sesion(datos, nueva):
+    fila = {campo: datos[campo] for campo in CAMPOS_SESION if campo in datos}
+
+    numero = fila.get("numero_de_sesion")
+    if numero is not None and (not isinstance(numero, int) or isinstance(numero, bool)):
+        raise ValueError("numero_de_sesion debe ser un entero")
+
+    if "jugadores" in fila:
+        fila["jugadores"] = normalizar_jugadores(fila["jugadores"])
+
+    if nueva or "fecha" in datos:
+        fecha_str = datos.get("fecha")
+        try:
+            fila["fecha"] = (datetime.strptime(fecha_str, "%Y-%m-%d") if fecha_str else datetime.utcnow()).date()
+        except (TypeError, ValueError):
+            raise ValueError("fecha debe tener formato YYYY-MM-DD")
+
+    return fila
+
+
+@dashboard_bp.route("/batch", methods=["POST"])
+@jwt_required()
+def batch_dashboard():
+    iduser = current_user.iduser
+    data = request.get_json()
+
+    if not data:
+        return jsonify({"msg": "Debe enviar JSON"}), 400
+
+    try:
+        operaciones = leer_operaciones(data)
+        resultados = aplicar_lote(Dashboard, iduser, operaciones, preparar_sesion)
+        invalidar("dashboard", iduser)
+        publicar_lote(iduser, "sesion", resultados, "idsesion")
+
+        return jsonify({"msg": "Lote aplicado exitosamente", "resultados": resultados}), 200
+
+    except LoteInvalido as e:
+        return jsonify({"msg": str(e), "resultados": e.resultados}), 400
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"msg": "Error al aplicar lote", "error": str(e)}), 500
+
+
 # PUT /dashboard/<idsesion>
 @dashboard_bp.route("/<int:idsesion>", methods=["PUT"])
 @jwt_required()
 def update_dashboard(idsesion):
-    iduser = int(get_jwt_identity())  # ✅ PARCHE
+    iduser = current_user.iduser
     data = request.get_json()
 
-    if not data:
+    if not isinstance(data, dict) or not data:
         return jsonify({"msg": "Debe enviar JSON"}), 400
 
     try:
@@ -91,17 +335,20 @@ def update_dashboard(idsesion):
         if not sesion:
             return jsonify({"msg": "Sesión no encontrada o sin permiso"}), 404
 
-        for field in ["cronica","juego","director","jugadores", "numero_de_sesion", "resumen"]:
-            if field in data:
-                setattr(sesion, field, data[field])
-
-        if "fecha" in data:
-            sesion.fecha = datetime.strptime(data["fecha"], "%Y-%m-%d")
+        for campo, valor in preparar_sesion(data, nueva=False).items():
+            setattr(sesion, campo, valor)
 
         db.session.commit()
+        invalidar("dashboard", iduser)
+        publicar(iduser, "sesion", [("update", idsesion)])
 
         return jsonify({"msg": "Sesión actualizada exitosamente"}), 200
 
+    # Campos con formato inválido (preparar_sesion)
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({"msg": "Datos inválidos", "error": str(e)}), 400
+
     except Exception as e:
         db.session.rollback()
         return jsonify({"msg": "Error al actualizar sesión", "error": str(e)}), 500
@@ -111,7 +358,7 @@ def update_dashboard(idsesion):
 @dashboard_bp.route("/<int:idsesion>", methods=["DELETE"])
 @jwt_required()
 def delete_dashboard(idsesion):
-    iduser = int(get_jwt_identity())  # ✅ PARCHE
+    iduser = current_user.iduser
 
     try:
         sesion = Dashboard.query.filter_by(idsesion=idsesion, iduser=iduser).first()
@@ -121,6 +368,8 @@ def delete_dashboard(idsesion):
 
         db.session.delete(sesion)
         db.session.commit()
+        invalidar("dashboard", iduser)
+        publicar(iduser, "sesion", [("delete", idsesion)])
 
         return jsonify({"msg": "Sesión eliminada exitosamente"}), 200
 
@@ -132,97 +381,114 @@ def delete_dashboard(idsesion):
 @dashboard_bp.route("/<int:idsesion>/pdf", methods=["GET"])
 @jwt_required()
 def get_dashboard_pdf(idsesion):
-    from reportlab.lib.pagesizes import A4
-    from reportlab.pdfgen import canvas
-    from reportlab.lib.units import mm
-
-    iduser = int(get_jwt_identity())
+    iduser = current_user.iduser
 
     try:
+        version = version_entidad(Dashboard, iduser, idsesion, "pdf", VERSION_RENDER)
+        if not version:
+            return jsonify({"msg": "Sesión no encontrada o sin permiso"}), 404
+
+        respuesta = no_modificado(*version)
+        if respuesta:
+            return respuesta
+
         # Buscar sesión
         sesion = Dashboard.query.filter_by(idsesion=idsesion, iduser=iduser).first()
         if not sesion:
             return jsonify({"msg": "Sesión no encontrada o sin permiso"}), 404
 
-        # --- CONFIG PDF ---
-        buffer = BytesIO()
-        c = canvas.Canvas(buffer, pagesize=A4)
-
-        width, height = A4
-        margin = 20 * mm
-        y = height - margin
-
-        # --- Encabezado ---
-        c.setFont("Helvetica-Bold", 16)
-        c.drawString(margin, y, "Bitácora de Sesión")
-        y -= 15
-
-        c.setFont("Helvetica", 12)
-        datos = [
-            f"Crónica: {sesion.cronica}",
-            f"Juego: {sesion.juego}",
-            f"Director: {sesion.director}",
-            f"Jugadores: {sesion.jugadores}",
-            f"Número de Sesión: {sesion.numero_de_sesion}",
-            f"Fecha: {sesion.fecha.strftime('%Y-%m-%d')}",
-        ]
+        # Si no cambió desde la última descarga se sirve el archivo cacheado;
+        # si no está, se encola y se responde 202 con el trabajo
+        clave, archivo = obtener_pdf("sesion", iduser, idsesion, datos_sesion_pdf(sesion))
+        if archivo is None:
+            return respuesta_trabajo(clave)
+
+        response = make_response(send_file(
+            archivo,
+            as_attachment=True,
+            download_name=f"sesion_{idsesion}.pdf",
+            mimetype="application/pdf"
+        ))
+        response.headers["Access-Control-Expose-Headers"] = "Content-Disposition"
+        return con_validadores(response, *version)
 
-        for d in datos:
-            y -= 15
-            c.drawString(margin, y, d)
+    except Exception as e:
+        return jsonify({"msg": "Error al generar PDF", "error": str(e)}), 500
 
-        y -= 25
-        c.setFont("Helvetica-Bold", 13)
-        c.drawString(margin, y, "Resumen:")
-        y -= 20
 
-        c.setFont("Helvetica", 11)
+# POST /dashboard/<idsesion>/pdf/job
+# Encola el render y responde enseguida; consultar GET /pdf/<job>
+@dashboard_bp.route("/<int:idsesion>/pdf/job", methods=["POST"])
+@jwt_required()
+def create_dashboard_pdf_job(idsesion):
+    iduser = current_user.iduser
 
-        # --- Word Wrapping automático ---
-        def draw_wrapped(text, x, y, max_width):
-            from reportlab.pdfbase.pdfmetrics import stringWidth
+    try:
+        sesion = Dashboard.query.filter_by(idsesion=idsesion, iduser=iduser).first()
+        if not sesion:
+            return jsonify({"msg": "Sesión no encontrada o sin permiso"}), 404
 
-            lines = []
-            for linea in text.split("\n"):
-                palabras = linea.split()
-                linea_actual = ""
+        clave = encolar("sesion", iduser, idsesion, datos_sesion_pdf(sesion))
+        return respuesta_trabajo(clave)
 
-                for palabra in palabras:
-                    test = linea_actual + " " + palabra if linea_actual else palabra
-                    if stringWidth(test, "Helvetica", 11) < max_width:
-                        linea_actual = test
-                    else:
-                        lines.append(linea_actual)
-                        linea_actual = palabra
+    except Exception as e:
+        return jsonify({"msg": "Error al encolar PDF", "error": str(e)}), 500
 
-                if linea_actual:
-                    lines.append(linea_actual)
 
-            return lines
+# GET /dashboard/cronica/<nombre>/pdf
+# Libro de campaña: todas las sesiones de la crónica + sus personajes
+@dashboard_bp.route("/cronica/<nombre>/pdf", methods=["GET"])
+@jwt_required()
+def get_cronica_pdf(nombre):
+    iduser = current_user.iduser
 
-        max_width = width - (2 * margin)
-        lineas = draw_wrapped(sesion.resumen, margin, y, max_width)
+    try:
+        hay_sesiones = db.session.query(
+            Dashboard.query.filter_by(iduser=iduser, cronica=nombre).exists()
+        ).scalar()
+        if not hay_sesiones:
+            return jsonify({"msg": "Crónica no encontrada o sin permiso"}), 404
+
+        # El libro depende de ambas colecciones del usuario
+        etag = calcular_etag(
+            version_coleccion(Dashboard, iduser), version_coleccion(Personaje, iduser), VERSION_RENDER, nombre
+        )
 
-        for linea in lineas:
-            if y < margin:
-                c.showPage()
-                y = height - margin
-                c.setFont("Helvetica", 11)
+        respuesta = no_modificado(etag, None)
+        if respuesta:
+            return respuesta
 
-            c.drawString(margin, y, linea)
-            y -= 14
+        sesiones = (
+            Dashboard.query.filter_by(iduser=iduser, cronica=nombre)
+            .order_by(Dashboard.fecha, Dashboard.numero_de_sesion, Dashboard.idsesion)
+            .yield_per(200)
+        )
+        personajes = (
+            Personaje.query.filter_by(iduser=iduser, cronica=nombre)
+            .order_by(Personaje.nombre, Personaje.apellido)
+            .yield_per(200)
+        )
 
-        c.save()
-        buffer.seek(0)
+        # El PDF se escribe a un temporal en disco y se manda por chunks.
+        # El render recorre los datos dos veces (índice y libro): cada
+        # iteración de la query vuelve a ejecutarla con yield_per
+        destino = tempfile.TemporaryFile()
+        with medir_render("cronica"):
+            render_cronica_pdf(
+                destino, nombre,
+                lambda: (datos_sesion_pdf(s) for s in sesiones),
+                lambda: (datos_personaje_pdf(p) for p in personajes)
+            )
+        destino.seek(0)
 
         response = make_response(send_file(
-            buffer,
+            destino,
             as_attachment=True,
-            download_name=f"sesion_{idsesion}.pdf",
+            download_name=f"cronica_{nombre}.pdf",
             mimetype="application/pdf"
         ))
         response.headers["Access-Control-Expose-Headers"] = "Content-Disposition"
-        return response
+        return con_validadores(response, etag, None)
 
     except Exception as e:
-        return jsonify({"msg": "Error al generar PDF", "error": str(e)}), 500
\ No newline at end of file
+        return jsonify({"msg": "Error al generar PDF de la crónica", "error": str(e)}), 500
@@ -0,0 +1,293 @@
+# eventos.py
+# GET /eventos: avisos de cambios por Server-Sent Events, para dejar de hacer
+# polling de /dashboard y /personajes.
+#
+#   const es = new EventSource(`${API}/eventos?jwt=${token}`)
+#   es.addEventListener("cambio", e => ...)   // {"recurso": "sesion", "cambios": [{"op": "update", "id": 3}]}
+#   es.addEventListener("resync", e => ...)   // se perdieron avisos: pedir GET /sync
+#
+# Los avisos son por usuario y no se guardan: al recibir "conectado" (también
+# después de cada reconexión) el cliente llama a GET /sync con su último token
+# y a partir de ahí solo escucha.
+#
+#   EVENTS_BACKEND=auto        postgres si la base es PostgreSQL, si no memoria
+#   EVENTS_BACKEND=memoria     broker en el proceso (un solo worker)
+#   EVENTS_BACKEND=postgres    LISTEN/NOTIFY: un aviso de cualquier worker o
+#                              máquina llega a todos los suscriptos
+#   EVENTS_MAX_CLIENTS=16      conexiones abiertas por worker. Con gthread cada
+#                              una ocupa un hilo y gunicorn.conf.py suma esos
+#                              hilos a GUNICORN_THREADS; con gevent el default
+#                              es la mitad de GUNICORN_WORKER_CONNECTIONS
+#   EVENTS_KEEPALIVE=15        segundos entre comentarios de keepalive
+#   EVENTS_DURACION=300        se corta el stream y EventSource reconecta solo:
+#                              así los workers se pueden reciclar
+#   EVENTS_QUEUE=100           avisos pendientes por cliente antes de mandar resync
+import json
+import logging
+import os
+import queue
+import select
+import threading
+import time
+
+from flask import Blueprint, Response, jsonify
+from flask_jwt_extended import current_user, jwt_required
+from sqlalchemy import text
+
+from extensions import db
+
+
+def _max_clientes():
+    if os.getenv("EVENTS_MAX_CLIENTS"):
+        return int(os.getenv("EVENTS_MAX_CLIENTS"))
+    if os.getenv("GUNICORN_WORKER_CLASS") == "gevent":
+        # Un stream es un greenlet: el límite son las conexiones del worker
+        return int(os.getenv("GUNICORN_WORKER_CONNECTIONS", "200")) // 2
+    return 16
+
+
+BACKEND = os.getenv("EVENTS_BACKEND", "auto")
+MAX_CLIENTES = _max_clientes()
+KEEPALIVE = float(os.getenv("EVENTS_KEEPALIVE", "15"))
+DURACION = float(os.getenv("EVENTS_DURACION", "300"))
+COLA = int(os.getenv("EVENTS_QUEUE", "100"))
+
+CANAL = "eventos"
+# NOTIFY admite ~8000 bytes: un lote grande se avisa como un solo "lote"
+MAX_CAMBIOS_POR_AVISO = 50
+
+log = logging.getLogger("nucleobitacora.eventos")
+
+eventos_bp = Blueprint("eventos_bp", __name__)
+
+
+class Suscripcion:
+    def __init__(self, iduser):
+        self.iduser = iduser
+        self.cola = queue.Queue(maxsize=COLA)
+        self.desbordada = False
+
+
+class BrokerMemoria:
+    """Suscripciones del proceso: iduser -> {Suscripcion}."""
+
+    nombre = "memoria"
+
+    def __init__(self):
+        self._suscripciones = {}
+        self._lock = threading.Lock()
+        self.publicados = self.entregados = self.desbordes = 0
+
+    def suscribir(self, iduser):
+        with self._lock:
+            if sum(len(s) for s in self._suscripciones.values()) >= MAX_CLIENTES:
+                return None
+            suscripcion = Suscripcion(iduser)
+            self._suscripciones.setdefault(iduser, set()).add(suscripcion)
+            return suscripcion
+
+    def desuscribir(self, suscripcion):
+        with self._lock:
+            grupo = self._suscripciones.get(suscripcion.iduser)
+            if grupo is not None:
+                grupo.discard(suscripcion)
+                if not grupo:
+                    del self._suscripciones[suscripcion.iduser]
+
+    def publicar(self, iduser, aviso):
+        self._contar_publicado()
+        self._entregar(iduser, aviso)
+
+    def _contar_publicado(self):
+        with self._lock:
+            self.publicados += 1
+
+    def _entregar(self, iduser, aviso):
+        with self._lock:
+            for suscripcion in self._suscripciones.get(iduser, ()):
+                try:
+                    suscripcion.cola.put_nowait(aviso)
+                    self.entregados += 1
+                except queue.Full:
+                    # Cliente que no lee: se le manda resync y se corta su stream
+                    suscripcion.desbordada = True
+                    self.desbordes += 1
+
+    def estadisticas(self):
+        with self._lock:
+            clientes = sum(len(s) for s in self._suscripciones.values())
+        return {"backend": self.nombre, "clientes": clientes, "publicados": self.publicados,
+                "entregados": self.entregados, "desbordes": self.desbordes}
+
+
+class BrokerPostgres(BrokerMemoria):
+    """NOTIFY al publicar; un hilo por worker hace LISTEN y reparte localmente.
+
+    La conexión del LISTEN se saca del pool (detach) para no ocupar un lugar
+    de los requests; si se cae se reconecta y se manda resync a los clientes.
+    """
+
+    nombre = "postgres"
+
+    def __init__(self, engine):
+        super().__init__()
+        self._engine = engine
+        self._hilo = None
+        self._escuchando = threading.Event()
+        self.reconexiones = 0
+
+    def suscribir(self, iduser):
+        with self._lock:
+            if self._hilo is None or not self._hilo.is_alive():
+                self._hilo = threading.Thread(target=self._escuchar, name="eventos-listen", daemon=True)
+                self._hilo.start()
+        # Que el LISTEN esté activo antes de "conectado": lo que el cliente no
+        # vea en su /sync inicial le tiene que llegar como aviso
+        self._escuchando.wait(5)
+        return super().suscribir(iduser)
+
+    def publicar(self, iduser, aviso):
+        self._contar_publicado()
+        payload = json.dumps({"iduser": iduser, "aviso": aviso}, separators=(",", ":"))
+        with self._engine.connect() as conn:
+            conn.execute(text("SELECT pg_notify(:canal, :payload)"), {"canal": CANAL, "payload": payload})
+            conn.commit()
+
+    def _escuchar(self):
+        espera = 1
+        while True:
+            conexion = None
+            try:
+                conexion = self._engine.raw_connection()
+                conexion.detach()
+                dbapi = conexion.driver_connection
+                dbapi.autocommit = True
+                with dbapi.cursor() as cur:
+                    cur.execute(f"LISTEN {CANAL}")
+                self._escuchando.set()
+                espera = 1
+
+                while True:
+                    if select.select([dbapi], [], [], KEEPALIVE) == ([], [], []):
+                        continue
+                    dbapi.poll()
+                    while dbapi.notifies:
+                        notificacion = dbapi.notifies.pop(0)
+                        datos = json.loads(notificacion.payload)
+                        self._entregar(datos["iduser"], datos["aviso"])
+
+            except Exception:
+                log.exception("LISTEN %s interrumpido, reconectando en %s s", CANAL, espera)
+                self._escuchando.clear()
+                if conexion is not None:
+                    try:
+                        conexion.close()
+                    except Exception:
+                        pass
+                self.reconexiones += 1
+                self._resync_todos()
+                time.sleep(espera)
+                espera = min(espera * 2, 30)
+
+    def _resync_todos(self):
+        # Mientras no hubo LISTEN se pudieron perder avisos
+        with self._lock:
+            for grupo in self._suscripciones.values():
+                for suscripcion in grupo:
+                    suscripcion.desbordada = True
+
+    def estadisticas(self):
+        return {**super().estadisticas(), "reconexiones": self.reconexiones}
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def broker():
+    """Se crea en el primer uso, ya dentro del worker (después del fork)."""
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                elegido = BACKEND
+                if elegido == "auto":
+                    elegido = "postgres" if db.engine.dialect.name == "postgresql" else "memoria"
+                _broker = BrokerPostgres(db.engine) if elegido == "postgres" else BrokerMemoria()
+    return _broker
+
+
+def publicar(iduser, recurso, cambios):
+    """Avisa a los clientes del usuario; cambios = [(op, id), ...].
+
+    Se llama después del commit. Un error acá no afecta a la escritura: el
+    cliente se pone al día con /sync la próxima vez que conecte.
+    """
+    if not cambios:
+        return
+    if len(cambios) > MAX_CAMBIOS_POR_AVISO:
+        aviso = {"recurso": recurso, "cambios": [{"op": "lote", "cantidad": len(cambios)}]}
+    else:
+        aviso = {"recurso": recurso, "cambios": [{"op": op, "id": ident} for op, ident in cambios]}
+
+    try:
+        broker().publicar(iduser, aviso)
+    except Exception:
+        log.exception("No se pudo publicar el aviso de %s del usuario %s", recurso, iduser)
+
+
+def publicar_lote(iduser, recurso, resultados, pk):
+    """Avisos de POST /.../batch a partir de los resultados de aplicar_lote."""
+    publicar(iduser, recurso, [(r["op"], r[pk]) for r in resultados if r.get("ok")])
+
+
+def _mensaje(evento, datos):
+    return f"event: {evento}\ndata: {json.dumps(datos, separators=(',', ':'))}\n\n"
+
+
+def _flujo(suscripcion):
+    fin = time.monotonic() + DURACION
+
+    # Reintento de EventSource al cortar por DURACION
+    yield "retry: 3000\n\n"
+    yield _mensaje("conectado", {"keepalive": KEEPALIVE})
+
+    while time.monotonic() < fin:
+        if suscripcion.desbordada:
+            yield _mensaje("resync", {})
+            return
+        try:
+            aviso = suscripcion.cola.get(timeout=min(KEEPALIVE, max(0.0, fin - time.monotonic())))
+        except queue.Empty:
+            # Comentario SSE: mantiene viva la conexión en proxies y detecta clientes idos
+            yield ": keepalive\n\n"
+            continue
+        yield _mensaje("cambio", aviso)
+
+
+def estadisticas():
+    return _broker.estadisticas() if _broker is not None else {}
+
+
+# GET /eventos
+# El token va en ?jwt= porque EventSource no permite mandar headers; el access
+# log de gunicorn (gunicorn.conf.py) se escribe sin la query string.
+@eventos_bp.route("/", methods=["GET"])
+@jwt_required(locations=["headers", "query_string"])
+def eventos():
+    iduser = current_user.iduser
+
+    broker_actual = broker()
+    suscripcion = broker_actual.suscribir(iduser)
+    if suscripcion is None:
+        respuesta = jsonify({"msg": "Demasiadas conexiones de eventos, reintentar más tarde"})
+        respuesta.status_code = 503
+        respuesta.headers["Retry-After"] = "10"
+        return respuesta
+
+    respuesta = Response(_flujo(suscripcion), mimetype="text/event-stream")
+    # El servidor cierra la respuesta al terminar o al irse el cliente
+    respuesta.call_on_close(lambda: broker_actual.desuscribir(suscripcion))
+    respuesta.headers["Cache-Control"] = "no-cache"
+    respuesta.headers["X-Accel-Buffering"] = "no"   # nginx / Render: no acumular el stream
+    return respuesta
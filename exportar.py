@@ -0,0 +1,62 @@
+# exportar.py
+# Exportación en streaming (NDJSON / CSV) con cursores del lado del servidor.
+import csv
+import json
+
+from flask import Response, stream_with_context
+
+# Filas que se traen del cursor por cada viaje a la base
+FILAS_POR_LOTE = 500
+
+FORMATOS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+class _Linea:
+    """Pseudo-archivo para csv.writer: devuelve lo escrito en vez de guardarlo."""
+
+    def write(self, valor):
+        return valor
+
+
+def _valor_csv(valor):
+    if isinstance(valor, (list, dict)):
+        return json.dumps(valor, ensure_ascii=False)
+    return valor
+
+
+def _generar_ndjson(filas, serializar):
+    for fila in filas:
+        yield json.dumps(serializar(fila), ensure_ascii=False) + "\n"
+
+
+def _generar_csv(filas, serializar, columnas):
+    writer = csv.writer(_Linea())
+    yield writer.writerow(columnas)
+    for fila in filas:
+        data = serializar(fila)
+        yield writer.writerow([_valor_csv(data.get(c)) for c in columnas])
+
+
+def respuesta_exportacion(query, serializar, columnas, nombre, formato):
+    """Arma una respuesta que va leyendo `query` por lotes y escribiendo a medida.
+
+    La memoria queda acotada a FILAS_POR_LOTE filas sin importar el total:
+    yield_per activa stream_results (cursor con nombre en psycopg2).
+    """
+    if formato not in FORMATOS:
+        raise ValueError(f"formato debe ser uno de: {', '.join(FORMATOS)}")
+
+    filas = query.yield_per(FILAS_POR_LOTE)
+
+    if formato == "csv":
+        cuerpo = _generar_csv(filas, serializar, columnas)
+    else:
+        cuerpo = _generar_ndjson(filas, serializar)
+
+    response = Response(stream_with_context(cuerpo), mimetype=FORMATOS[formato])
+    response.headers["Content-Disposition"] = f'attachment; filename="{nombre}.{formato}"'
+    response.headers["Access-Control-Expose-Headers"] = "Content-Disposition"
+    return response
@@ -0,0 +1,58 @@
+# gunicorn.conf.py
+# Configuración de producción. gunicorn la lee sola desde el directorio actual:
+#
+#   gunicorn                      # usa wsgi:app
+#
+# Todo se puede ajustar por variables de entorno sin reconstruir la imagen.
+import multiprocessing
+import os
+
+wsgi_app = "wsgi:app"
+bind = f"0.0.0.0:{os.getenv('PORT', '5050')}"
+
+# --- Workers ---
+# gthread: cada proceso atiende varios requests en hilos mientras esperan a
+# Postgres. WEB_CONCURRENCY la define Render; el tope evita lanzar decenas de
+# procesos en hosts que reportan todos los CPUs de la máquina física.
+workers = int(os.getenv("WEB_CONCURRENCY", min(multiprocessing.cpu_count() * 2 + 1, 8)))
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "gthread")   # o "gevent" si está instalado
+# Con gthread cada stream abierto de GET /eventos ocupa un hilo todo el rato:
+# se suman hilos para ellos (EVENTS_MAX_CLIENTS, mismo default que eventos.py)
+# y los GUNICORN_THREADS quedan libres para los requests
+hilos_eventos = int(os.getenv("EVENTS_MAX_CLIENTS", "16")) if worker_class == "gthread" else 0
+threads = int(os.getenv("GUNICORN_THREADS", "4")) + hilos_eventos
+worker_connections = int(os.getenv("GUNICORN_WORKER_CONNECTIONS", "200"))   # solo gevent
+
+# Cargar la app una vez en el master: arranque más rápido y memoria compartida (copy-on-write)
+preload_app = os.getenv("GUNICORN_PRELOAD", "1") not in ("0", "false", "False")
+
+# --- Conexiones ---
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", "5"))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "60"))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+
+# Reciclar workers cada N requests para acotar fugas de memoria (ReportLab)
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "1000"))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", "100"))
+
+# --- Logs ---
+accesslog = os.getenv("GUNICORN_ACCESSLOG", "-")
+# Como el formato por defecto pero con la ruta sin query string (%(U)s en vez
+# de %(r)s): GET /eventos?jwt=... no deja el token en los logs
+access_log_format = '%(h)s %(l)s %(u)s %(t)s "%(m)s %(U)s %(H)s" %(s)s %(b)s "%(f)s" "%(a)s"'
+errorlog = "-"
+loglevel = os.getenv("GUNICORN_LOGLEVEL", "info")
+
+
+def post_fork(server, worker):
+    # Con preload_app el engine se creó en el master: cada worker abre su propio
+    # pool en vez de compartir sockets heredados por fork
+    from extensions import db
+    from pool_db import calentar_pool
+
+    with server.app.wsgi().app_context():
+        db.engine.dispose(close=False)
+
+        # Modo arranque rápido (wsgi.py): conexiones listas antes del primer request
+        if os.getenv("ARRANQUE_RAPIDO", "1") not in ("0", "false", "False"):
+            calentar_pool(db.engine)
@@ -0,0 +1,166 @@
+# limites.py
+# Rate limiting con token buckets para /login y /users (alta de usuarios).
+#
+# Se aplica en before_request de cada blueprint, antes de tocar la base: un
+# ataque de credential stuffing se corta con 429 sin llegar a User.query.
+#
+#   RATE_LIMIT_ENABLED=1
+#   RATE_LIMIT_LOGIN_IP=20/60       20 intentos, se recargan en 60 s
+#   RATE_LIMIT_LOGIN_USER=5/60      por username (aunque vengan de muchas IPs)
+#   RATE_LIMIT_USERS_IP=5/3600      altas de usuario por IP
+#   RATE_LIMIT_URL=redis://...      buckets compartidos entre workers
+#
+# La IP es request.remote_addr: detrás de Render o nginx hay que configurar
+# PROXY_HOPS (ver app.py) para que sea la del cliente y no la del proxy.
+#
+# Sin Redis cada worker tiene sus buckets: el límite efectivo es N * workers.
+import math
+import os
+import threading
+import time
+
+from flask import jsonify, request
+
+HABILITADO = os.getenv("RATE_LIMIT_ENABLED", "1") not in ("0", "false", "False")
+MAX_BUCKETS = 100_000
+
+
+def leer_regla(texto):
+    """"20/60" -> (capacidad 20, recarga 20/60 tokens por segundo)."""
+    cantidad, segundos = texto.split("/")
+    return int(cantidad), int(cantidad) / float(segundos)
+
+
+REGLAS = {
+    "login_ip": leer_regla(os.getenv("RATE_LIMIT_LOGIN_IP", "20/60")),
+    "login_user": leer_regla(os.getenv("RATE_LIMIT_LOGIN_USER", "5/60")),
+    "users_ip": leer_regla(os.getenv("RATE_LIMIT_USERS_IP", "5/3600")),
+}
+
+
+class LimitadorMemoria:
+    """Buckets en un dict del proceso: clave -> [tokens, último_instante]."""
+
+    def __init__(self, max_buckets=MAX_BUCKETS):
+        self.max_buckets = max_buckets
+        self._buckets = {}
+        self._lock = threading.Lock()
+        self.permitidos = self.rechazados = 0
+
+    def tomar(self, clave, capacidad, recarga):
+        """(permitido, segundos hasta el próximo token)."""
+        ahora = time.monotonic()
+        with self._lock:
+            tokens, ultimo = self._buckets.get(clave, (capacidad, ahora))
+            tokens = min(capacidad, tokens + (ahora - ultimo) * recarga)
+
+            if tokens >= 1:
+                self._buckets[clave] = (tokens - 1, ahora)
+                self.permitidos += 1
+                if len(self._buckets) > self.max_buckets:
+                    self._purgar(ahora)
+                return True, 0.0
+
+            self._buckets[clave] = (tokens, ahora)
+            self.rechazados += 1
+            return False, (1 - tokens) / recarga
+
+    def _purgar(self, ahora):
+        # Un bucket que ya se habría llenado es igual a no tenerlo
+        for clave, (tokens, ultimo) in list(self._buckets.items()):
+            capacidad, recarga = REGLAS.get(clave.partition(":")[0], (1, 1))
+            if tokens + (ahora - ultimo) * recarga >= capacidad:
+                del self._buckets[clave]
+
+    def estadisticas(self):
+        with self._lock:
+            return {"backend": "memoria", "permitidos": self.permitidos,
+                    "rechazados": self.rechazados, "buckets": len(self._buckets)}
+
+
+class LimitadorRedis:
+    """Mismo algoritmo en un script Lua: atómico entre workers y máquinas."""
+
+    SCRIPT = """
+    local capacidad, recarga, ahora = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+    local datos = redis.call('HMGET', KEYS[1], 't', 'u')
+    local tokens = tonumber(datos[1]) or capacidad
+    local ultimo = tonumber(datos[2]) or ahora
+    tokens = math.min(capacidad, tokens + math.max(0, ahora - ultimo) * recarga)
+    local permitido = 0
+    if tokens >= 1 then
+        tokens = tokens - 1
+        permitido = 1
+    end
+    redis.call('HSET', KEYS[1], 't', tostring(tokens), 'u', tostring(ahora))
+    redis.call('PEXPIRE', KEYS[1], math.ceil(capacidad / recarga * 1000))
+    return {permitido, tostring(tokens)}
+    """
+
+    def __init__(self, url):
+        import redis
+
+        self._redis = redis.Redis.from_url(url)
+        self._script = self._redis.register_script(self.SCRIPT)
+        self._lock = threading.Lock()
+        self.permitidos = self.rechazados = self.errores = 0
+
+    def _contar(self, campo):
+        with self._lock:
+            setattr(self, campo, getattr(self, campo) + 1)
+
+    def tomar(self, clave, capacidad, recarga):
+        try:
+            permitido, tokens = self._script(keys=[f"limite:{clave}"],
+                                             args=[capacidad, recarga, time.time()])
+        except Exception:
+            # Si Redis no responde se deja pasar: mejor sin límite que sin login
+            self._contar("errores")
+            return True, 0.0
+
+        if permitido:
+            self._contar("permitidos")
+            return True, 0.0
+        self._contar("rechazados")
+        return False, (1 - float(tokens)) / recarga
+
+    def estadisticas(self):
+        return {"backend": "redis", "permitidos": self.permitidos,
+                "rechazados": self.rechazados, "errores": self.errores}
+
+
+def crear_limitador():
+    url = os.getenv("RATE_LIMIT_URL")
+    if url:
+        return LimitadorRedis(url)
+    return LimitadorMemoria()
+
+
+limitador = crear_limitador()
+
+
+def ip_cliente():
+    # Ya corregida por ProxyFix; nunca leer X-Forwarded-For a mano (el cliente
+    # puede mandar lo que quiera a la izquierda)
+    return request.remote_addr or "desconocida"
+
+
+def aplicar_limites(*pares):
+    """pares = (regla, valor). Devuelve la respuesta 429 o None si pasa.
+
+    Se consumen en orden y se corta en el primero sin tokens.
+    """
+    if not HABILITADO:
+        return None
+
+    for regla, valor in pares:
+        if valor is None:
+            continue
+        capacidad, recarga = REGLAS[regla]
+        permitido, espera = limitador.tomar(f"{regla}:{valor}", capacidad, recarga)
+        if not permitido:
+            respuesta = jsonify({"success": False, "error": "Demasiados intentos, reintentar más tarde"})
+            respuesta.status_code = 429
+            respuesta.headers["Retry-After"] = str(max(1, math.ceil(espera)))
+            return respuesta
+    return None
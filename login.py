@@ -4,9 +4,26 @@ from flask_jwt_extended import create_access_token
 from datetime import timedelta
 from extensions import db
 from models import User
+from contrasenas import Saturado, verificar
+from limites import aplicar_limites, ip_cliente
 
 login_bp = Blueprint("login_bp", __name__)
 
+
+# Antes de cualquier consulta: por IP y por username
+@login_bp.before_request
+def limitar_login():
+    if request.method != "POST":
+        return None
+
+    data = request.get_json(silent=True)
+    username = data.get("username") if isinstance(data, dict) else None
+    return aplicar_limites(
+        ("login_ip", ip_cliente()),
+        ("login_user", str(username).strip().lower() if username else None),
+    )
+
+
 @login_bp.route("/", methods=["POST"])
 def login():
     data = request.get_json()
@@ -20,14 +37,27 @@ def login():
     if not username or not password:
         return jsonify({"success": False, "error": "Faltan campos username y password"}), 400
 
+    if not isinstance(username, str) or not isinstance(password, str):
+        return jsonify({"success": False, "error": "username y password deben ser texto"}), 400
+
     user = User.query.filter_by(username=username).first()
 
     if not user:
         return jsonify({"success": False, "error": "Usuario no encontrado"}), 404
 
-    if user.password != password:  
+    try:
+        ok, hash_nuevo = verificar(user.password, password)
+    except Saturado as e:
+        return jsonify({"success": False, "error": str(e)}), 503, {"Retry-After": "2"}
+
+    if not ok:
         return jsonify({"success": False, "error": "Contraseña incorrecta"}), 401
 
+    # Texto plano o costo viejo: se reemplaza por el hash actual
+    if hash_nuevo:
+        user.password = hash_nuevo
+        db.session.commit()
+
     claims = {
         "username": user.username,
         "nombre": user.nombre,
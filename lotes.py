@@ -0,0 +1,128 @@
+# lotes.py
+# Operaciones en lote (create/update/delete) aplicadas en una sola transacción.
+from sqlalchemy import delete, insert, select, update
+
+from extensions import db
+
+MAX_OPERACIONES = 1000
+OPERACIONES = ("create", "update", "delete")
+
+
+class LoteInvalido(ValueError):
+    """El lote no se aplicó; `resultados` trae el error de cada operación."""
+
+    def __init__(self, msg, resultados=None):
+        super().__init__(msg)
+        self.resultados = resultados or []
+
+
+def leer_operaciones(data):
+    """Acepta {"operaciones": [...]} o directamente la lista."""
+    operaciones = data.get("operaciones") if isinstance(data, dict) else data
+
+    if not isinstance(operaciones, list) or not operaciones:
+        raise LoteInvalido("Debe enviar una lista 'operaciones' no vacía")
+    if len(operaciones) > MAX_OPERACIONES:
+        raise LoteInvalido(f"Máximo {MAX_OPERACIONES} operaciones por lote")
+    return operaciones
+
+
+def aplicar_lote(modelo, iduser, operaciones, preparar):
+    """Valida todo el lote y recién entonces lo aplica, todo o nada.
+
+    Cada operación es {"op": "create"|"update"|"delete", "<pk>": id, "datos": {...}}.
+    `preparar(datos, nuevo)` devuelve el dict de columnas o lanza ValueError.
+    Devuelve un resultado por operación, en el mismo orden.
+    """
+    pk = modelo.__mapper__.primary_key[0]
+    resultados = [None] * len(operaciones)
+    errores = {}
+
+    creates, updates, deletes = [], [], []
+    vistos = set()
+
+    # --- 1) Validación completa, sin tocar la base ---
+    for i, operacion in enumerate(operaciones):
+        try:
+            if not isinstance(operacion, dict):
+                raise ValueError("La operación debe ser un objeto")
+
+            op = operacion.get("op")
+            if op not in OPERACIONES:
+                raise ValueError(f"op debe ser una de: {', '.join(OPERACIONES)}")
+
+            datos = operacion.get("datos") or {}
+            if not isinstance(datos, dict):
+                raise ValueError("datos debe ser un objeto")
+
+            if op == "create":
+                fila = preparar(datos, True)
+                fila["iduser"] = iduser
+                creates.append((i, fila))
+                continue
+
+            ident = operacion.get(pk.key)
+            if not isinstance(ident, int) or isinstance(ident, bool):
+                raise ValueError(f"Falta el campo {pk.key}")
+            if ident in vistos:
+                raise ValueError(f"{pk.key} {ident} repetido en el lote")
+            vistos.add(ident)
+
+            if op == "update":
+                fila = preparar(datos, False)
+                fila[pk.key] = ident
+                updates.append((i, fila))
+            else:
+                deletes.append((i, ident))
+
+        except ValueError as e:
+            errores[i] = str(e)
+
+    # Todas las filas a modificar deben existir y ser del usuario.
+    # FOR UPDATE las bloquea hasta el commit para que nadie las borre en el medio.
+    if vistos:
+        propias = set(db.session.execute(
+            select(pk).where(pk.in_(vistos), modelo.iduser == iduser).with_for_update()
+        ).scalars())
+
+        for i, ident in [(i, f[pk.key]) for i, f in updates] + deletes:
+            if ident not in propias and i not in errores:
+                errores[i] = "No encontrado o sin permiso"
+
+    if errores:
+        db.session.rollback()
+        raise LoteInvalido("El lote tiene operaciones inválidas; no se aplicó ninguna", [
+            {"indice": i, "op": _op(o), "ok": False, "error": errores[i]} if i in errores
+            else {"indice": i, "op": _op(o), "ok": True}
+            for i, o in enumerate(operaciones)
+        ])
+
+    # --- 2) Aplicación: una sentencia por tipo de operación, un solo commit ---
+    if creates:
+        ids = db.session.execute(
+            insert(modelo).returning(pk, sort_by_parameter_order=True),
+            [fila for _, fila in creates]
+        ).scalars().all()
+        for (i, _), ident in zip(creates, ids):
+            resultados[i] = {"indice": i, "op": "create", "ok": True, pk.key: ident}
+
+    # Bulk UPDATE por clave primaria (equivalente 2.0 de bulk_update_mappings)
+    con_cambios = [fila for _, fila in updates if len(fila) > 1]
+    if con_cambios:
+        db.session.execute(update(modelo), con_cambios)
+    for i, fila in updates:
+        resultados[i] = {"indice": i, "op": "update", "ok": True, pk.key: fila[pk.key]}
+
+    if deletes:
+        db.session.execute(
+            delete(modelo).where(pk.in_([ident for _, ident in deletes]), modelo.iduser == iduser)
+        )
+    for i, ident in deletes:
+        resultados[i] = {"indice": i, "op": "delete", "ok": True, pk.key: ident}
+
+    db.session.commit()
+    return resultados
+
+
+def _op(operacion):
+    return operacion.get("op") if isinstance(operacion, dict) else None
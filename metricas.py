@@ -0,0 +1,219 @@
+# metricas.py
+# Instrumentación: latencia por endpoint, sentencias SQL por request, tiempo de
+# render de PDFs, y exposición en formato Prometheus (GET /metrics).
+#
+#   SLOW_REQUEST_MS=500        requests más lentos que esto se loguean con su SQL
+#   SLOW_REQUEST_SQL=5         cuántas sentencias (las más lentas) incluir
+#   METRICS_TOKEN=...          si está, /metrics exige "Authorization: Bearer <token>"
+#
+# Las métricas son por proceso: con varios workers de gunicorn cada scrape ve
+# solo al worker que atendió (sumar por `pid` en Prometheus o usar 1 worker).
+import hmac
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+
+LENTO_MS = float(os.getenv("SLOW_REQUEST_MS", "500"))
+SQL_EN_LOG = int(os.getenv("SLOW_REQUEST_SQL", "5"))
+TOKEN = os.getenv("METRICS_TOKEN")
+
+BUCKETS_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+BUCKETS_CONSULTAS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+log_lento = logging.getLogger("nucleobitacora.lento")
+
+
+class Histograma:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.cuentas = [0] * len(buckets)
+        self.suma = 0.0
+        self.total = 0
+
+    def observar(self, valor):
+        self.suma += valor
+        self.total += 1
+        for i, limite in enumerate(self.buckets):
+            if valor <= limite:
+                self.cuentas[i] += 1
+
+
+class Registro:
+    """Contadores e histogramas con etiquetas, protegidos por un lock."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.contadores = {}     # nombre -> {etiquetas: valor}
+        self.histogramas = {}    # nombre -> (buckets, {etiquetas: Histograma})
+        self.ayuda = {}
+
+    def sumar(self, nombre, etiquetas=(), valor=1, ayuda=""):
+        with self._lock:
+            serie = self.contadores.setdefault(nombre, {})
+            serie[etiquetas] = serie.get(etiquetas, 0) + valor
+            self.ayuda.setdefault(nombre, ayuda)
+
+    def observar(self, nombre, valor, etiquetas=(), buckets=BUCKETS_SEGUNDOS, ayuda=""):
+        with self._lock:
+            _, serie = self.histogramas.setdefault(nombre, (buckets, {}))
+            histograma = serie.get(etiquetas)
+            if histograma is None:
+                histograma = serie[etiquetas] = Histograma(buckets)
+            histograma.observar(valor)
+            self.ayuda.setdefault(nombre, ayuda)
+
+    def exponer(self):
+        lineas = []
+        with self._lock:
+            for nombre, serie in sorted(self.contadores.items()):
+                lineas += [f"# HELP {nombre} {self.ayuda[nombre]}", f"# TYPE {nombre} counter"]
+                for etiquetas, valor in serie.items():
+                    lineas.append(f"{nombre}{_etiquetas(etiquetas)} {valor}")
+
+            for nombre, (buckets, serie) in sorted(self.histogramas.items()):
+                lineas += [f"# HELP {nombre} {self.ayuda[nombre]}", f"# TYPE {nombre} histogram"]
+                for etiquetas, h in serie.items():
+                    for limite, cuenta in zip(buckets, h.cuentas):
+                        lineas.append(f"{nombre}_bucket{_etiquetas(etiquetas + (('le', limite),))} {cuenta}")
+                    lineas.append(f"{nombre}_bucket{_etiquetas(etiquetas + (('le', '+Inf'),))} {h.total}")
+                    lineas.append(f"{nombre}_sum{_etiquetas(etiquetas)} {h.suma}")
+                    lineas.append(f"{nombre}_count{_etiquetas(etiquetas)} {h.total}")
+        return lineas
+
+
+def _escapar(valor):
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _etiquetas(pares):
+    if not pares:
+        return ""
+    return "{" + ",".join(f'{k}="{_escapar(v)}"' for k, v in pares) + "}"
+
+
+registro = Registro()
+
+
+# ============================================================
+# PDFs
+# ============================================================
+
+def registrar_render(tipo, segundos):
+    registro.observar("pdf_render_seconds", segundos, (("tipo", tipo),),
+                      ayuda="Tiempo de render de ReportLab por tipo de PDF")
+
+
+@contextmanager
+def medir_render(tipo):
+    """with medir_render("cronica"): render_cronica_pdf(...)"""
+    inicio = time.perf_counter()
+    yield
+    registrar_render(tipo, time.perf_counter() - inicio)
+
+
+# ============================================================
+# SQL
+# ============================================================
+
+def _antes_sql(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("inicios_sql", []).append(time.perf_counter())
+
+
+def _despues_sql(conn, cursor, statement, parameters, context, executemany):
+    duracion = time.perf_counter() - conn.info["inicios_sql"].pop()
+    registro.observar("db_query_seconds", duracion, ayuda="Duración de cada sentencia SQL")
+
+    if has_request_context() and "metricas_sql" in g:
+        g.metricas_sql.append((duracion, statement))
+
+
+def _error_sql(contexto):
+    # La sentencia falló: after_cursor_execute no llega, descartar su inicio
+    inicios = contexto.connection.info.get("inicios_sql") if contexto.connection is not None else None
+    if inicios:
+        inicios.pop()
+
+
+# ============================================================
+# Requests
+# ============================================================
+
+def _inicio_request():
+    g.metricas_inicio = time.perf_counter()
+    g.metricas_sql = []
+
+
+def _fin_request(respuesta):
+    inicio = g.pop("metricas_inicio", None)
+    if inicio is None:
+        return respuesta
+
+    duracion = time.perf_counter() - inicio
+    sentencias = g.pop("metricas_sql", [])
+    endpoint = request.endpoint or "sin_ruta"
+    segundos_sql = sum(d for d, _ in sentencias)
+
+    registro.sumar("http_requests_total",
+                   (("endpoint", endpoint), ("method", request.method), ("status", respuesta.status_code)),
+                   ayuda="Requests atendidos")
+    registro.observar("http_request_duration_seconds", duracion,
+                      (("endpoint", endpoint), ("method", request.method)),
+                      ayuda="Latencia por endpoint (hasta el primer byte en respuestas streaming)")
+    registro.observar("http_request_db_queries", len(sentencias), (("endpoint", endpoint),),
+                      buckets=BUCKETS_CONSULTAS, ayuda="Sentencias SQL por request")
+    registro.sumar("http_request_db_seconds_total", (("endpoint", endpoint),), segundos_sql,
+                   ayuda="Tiempo total en SQL por endpoint")
+
+    if duracion * 1000 >= LENTO_MS:
+        peores = sorted(sentencias, key=lambda s: s[0], reverse=True)[:SQL_EN_LOG]
+        log_lento.warning(
+            "Request lento: %s %s -> %s en %.0f ms (%d sentencias SQL, %.0f ms en SQL)%s",
+            request.method, request.path, respuesta.status_code, duracion * 1000,
+            len(sentencias), segundos_sql * 1000,
+            "".join(f"\n  [{d * 1000:.1f} ms] {' '.join(s.split())[:500]}" for d, s in peores),
+        )
+
+    return respuesta
+
+
+def instalar(app, engine):
+    app.before_request(_inicio_request)
+    app.after_request(_fin_request)
+    event.listen(engine, "before_cursor_execute", _antes_sql)
+    event.listen(engine, "after_cursor_execute", _despues_sql)
+    event.listen(engine, "handle_error", _error_sql)
+
+
+# ============================================================
+# Exposición
+# ============================================================
+
+def _gauges(nombre, ayuda, valores, etiqueta=None):
+    lineas = [f"# HELP {nombre} {ayuda}", f"# TYPE {nombre} gauge"]
+    for clave, valor in valores.items():
+        if isinstance(valor, (int, float)) and not isinstance(valor, bool):
+            pares = ((etiqueta, clave),) if etiqueta else ()
+            lineas.append(f"{nombre}{_etiquetas(pares)} {valor}")
+    return lineas
+
+
+def autorizado():
+    if not TOKEN:
+        return True
+    enviado = request.headers.get("Authorization", "").removeprefix("Bearer ").strip()
+    return hmac.compare_digest(enviado.encode(), TOKEN.encode())
+
+
+def exponer(extras):
+    """Texto Prometheus; `extras` = {nombre: (ayuda, dict de snapshot)} como gauges."""
+    lineas = registro.exponer()
+    for nombre, (ayuda, valores) in extras.items():
+        lineas += _gauges(nombre, ayuda, valores, etiqueta="campo")
+    lineas += ["# HELP process_id PID del worker que respondió", "# TYPE process_id gauge",
+               f"process_id {os.getpid()}"]
+    return "\n".join(lineas) + "\n"
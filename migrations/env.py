@@ -5,6 +5,8 @@ from flask import current_app
 
 from alembic import context
 
+from pool_db import sin_timeouts
+
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
 config = context.config
@@ -97,6 +99,9 @@ def run_migrations_online():
     connectable = get_engine()
 
     with connectable.connect() as connection:
+        # El engine de la app trae los timeouts de los requests (pool_db)
+        sin_timeouts(connection)
+
         context.configure(
             connection=connection,
             target_metadata=get_metadata(),
@@ -106,6 +111,9 @@ def run_migrations_online():
         with context.begin_transaction():
             context.run_migrations()
 
+        # Que la conexión sin límites no vuelva al pool
+        connection.invalidate()
+
 
 if context.is_offline_mode():
     run_migrations_offline()
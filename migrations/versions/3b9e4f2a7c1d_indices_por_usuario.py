@@ -0,0 +1,39 @@
+"""Indices por usuario en dashboard y personajes
+
+Revision ID: 3b9e4f2a7c1d
+Revises: 67a2188fc5f9
+Create Date: 2026-10-18 10:12:03.418220
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3b9e4f2a7c1d'
+down_revision = '67a2188fc5f9'
+branch_labels = None
+depends_on = None
+
+
+INDICES = [
+    ('ix_dashboard_iduser_fecha', 'dashboard',
+     ['iduser', sa.text('fecha DESC'), sa.text('idsesion DESC')]),
+    ('ix_dashboard_iduser_cronica', 'dashboard', ['iduser', 'cronica']),
+    ('ix_personajes_iduser_cronica', 'personajes', ['iduser', 'cronica']),
+]
+
+
+def upgrade():
+    # CONCURRENTLY no bloquea escrituras, pero no puede correr dentro de una transacción
+    with op.get_context().autocommit_block():
+        for nombre, tabla, columnas in INDICES:
+            op.create_index(nombre, tabla, columnas, unique=False,
+                            postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for nombre, tabla, _ in reversed(INDICES):
+            op.drop_index(nombre, table_name=tabla,
+                          postgresql_concurrently=True, if_exists=True)
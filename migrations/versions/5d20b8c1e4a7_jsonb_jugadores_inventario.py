@@ -0,0 +1,154 @@
+"""jugadores e inventario como JSONB con indices GIN
+
+Revision ID: 5d20b8c1e4a7
+Revises: e7d3b5a90c18
+Create Date: 2026-10-18 15:02:37.418305
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '5d20b8c1e4a7'
+down_revision = 'e7d3b5a90c18'
+branch_labels = None
+depends_on = None
+
+
+# Texto libre "Ana, Luis; Sofía" -> ["Ana", "Luis", "Sofía"] (sin vacíos ni
+# repetidos, en el orden original). ALTER ... USING no admite subconsultas, por
+# eso la conversión va en funciones auxiliares que se borran al terminar.
+A_JSONB = r"""
+CREATE FUNCTION _jugadores_a_jsonb(texto text) RETURNS jsonb
+LANGUAGE sql IMMUTABLE AS $$
+    SELECT CASE WHEN texto IS NULL THEN NULL ELSE coalesce((
+        SELECT jsonb_agg(jugador ORDER BY orden)
+        FROM (
+            SELECT btrim(x) AS jugador, min(orden) AS orden
+            FROM regexp_split_to_table(texto, '[,;\n]') WITH ORDINALITY AS t(x, orden)
+            WHERE btrim(x) <> ''
+            GROUP BY btrim(x)
+        ) j
+    ), '[]'::jsonb) END
+$$;
+"""
+
+A_TEXTO = """
+CREATE FUNCTION _jugadores_a_texto(lista jsonb) RETURNS text
+LANGUAGE sql IMMUTABLE AS $$
+    SELECT CASE WHEN lista IS NULL THEN NULL ELSE (
+        SELECT string_agg(x, ', ' ORDER BY orden)
+        FROM jsonb_array_elements_text(lista) WITH ORDINALITY AS t(x, orden)
+    ) END
+$$;
+"""
+
+
+def busqueda_dashboard(jugadores):
+    return f"""
+CREATE OR REPLACE FUNCTION dashboard_busqueda_trigger() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    NEW.busqueda :=
+        setweight(to_tsvector('spanish', coalesce(NEW.cronica, '')), 'A') ||
+        setweight(to_tsvector('spanish', {jugadores}), 'B') ||
+        setweight(to_tsvector('spanish', coalesce(NEW.resumen, '')), 'C');
+    RETURN NEW;
+END
+$$;
+"""
+
+
+# Lo que usan recalcular_estadisticas_cronica y los triggers de estadísticas
+# (e7d3b5a90c18): con la columna en jsonb resuelven a esta versión
+JUGADORES_DE_JSONB = """
+CREATE OR REPLACE FUNCTION jugadores_de(valor jsonb) RETURNS SETOF text
+LANGUAGE sql IMMUTABLE AS $$
+    SELECT DISTINCT btrim(x)
+    FROM jsonb_array_elements_text(coalesce(valor, '[]'::jsonb)) AS x
+    WHERE btrim(x) <> ''
+$$;
+"""
+
+
+JUGADORES_JSONB_TS = (
+    "coalesce(array_to_string(ARRAY(SELECT jsonb_array_elements_text(NEW.jugadores)), ' '), '')"
+)
+JUGADORES_TEXTO_TS = "coalesce(NEW.jugadores, '')"
+
+TRIGGER_BUSQUEDA = """
+CREATE TRIGGER dashboard_busqueda_tg
+BEFORE INSERT OR UPDATE OF cronica, jugadores, resumen ON dashboard
+FOR EACH ROW EXECUTE FUNCTION dashboard_busqueda_trigger();
+"""
+
+
+def upgrade():
+    # Postgres no deja cambiar el tipo de una columna nombrada en UPDATE OF
+    op.execute("DROP TRIGGER IF EXISTS dashboard_busqueda_tg ON dashboard")
+
+    op.execute(A_JSONB)
+    with op.batch_alter_table('dashboard', schema=None) as batch_op:
+        batch_op.alter_column('jugadores',
+               existing_type=sa.Text(),
+               type_=postgresql.JSONB(astext_type=sa.Text()),
+               existing_nullable=True,
+               postgresql_using='_jugadores_a_jsonb(jugadores)')
+    op.execute("DROP FUNCTION _jugadores_a_jsonb(text)")
+
+    with op.batch_alter_table('personajes', schema=None) as batch_op:
+        batch_op.alter_column('inventario',
+               existing_type=postgresql.JSON(astext_type=sa.Text()),
+               type_=postgresql.JSONB(astext_type=sa.Text()),
+               existing_nullable=True,
+               postgresql_using='inventario::jsonb')
+    # La API ya mostraba como [] todo inventario que no fuera lista
+    op.execute("""
+        UPDATE personajes SET inventario = '[]'::jsonb
+        WHERE inventario IS NOT NULL AND jsonb_typeof(inventario) <> 'array'
+    """)
+
+    op.execute(busqueda_dashboard(JUGADORES_JSONB_TS))
+    op.execute(TRIGGER_BUSQUEDA)
+    op.execute(JUGADORES_DE_JSONB)
+
+    # jsonb_path_ops: índice más chico, solo sirve para @> (lo que usan los filtros)
+    with op.get_context().autocommit_block():
+        op.create_index('ix_dashboard_jugadores', 'dashboard', ['jugadores'], unique=False,
+                        postgresql_using='gin', postgresql_ops={'jugadores': 'jsonb_path_ops'},
+                        postgresql_concurrently=True, if_not_exists=True)
+        op.create_index('ix_personajes_inventario', 'personajes', ['inventario'], unique=False,
+                        postgresql_using='gin', postgresql_ops={'inventario': 'jsonb_path_ops'},
+                        postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_personajes_inventario', table_name='personajes',
+                      postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_dashboard_jugadores', table_name='dashboard',
+                      postgresql_concurrently=True, if_exists=True)
+
+    op.execute("DROP TRIGGER IF EXISTS dashboard_busqueda_tg ON dashboard")
+
+    with op.batch_alter_table('personajes', schema=None) as batch_op:
+        batch_op.alter_column('inventario',
+               existing_type=postgresql.JSONB(astext_type=sa.Text()),
+               type_=postgresql.JSON(astext_type=sa.Text()),
+               existing_nullable=True,
+               postgresql_using='inventario::json')
+
+    op.execute(A_TEXTO)
+    with op.batch_alter_table('dashboard', schema=None) as batch_op:
+        batch_op.alter_column('jugadores',
+               existing_type=postgresql.JSONB(astext_type=sa.Text()),
+               type_=sa.Text(),
+               existing_nullable=True,
+               postgresql_using='_jugadores_a_texto(jugadores)')
+    op.execute("DROP FUNCTION _jugadores_a_texto(jsonb)")
+
+    op.execute(busqueda_dashboard(JUGADORES_TEXTO_TS))
+    op.execute(TRIGGER_BUSQUEDA)
+    op.execute("DROP FUNCTION IF EXISTS jugadores_de(jsonb)")
@@ -0,0 +1,131 @@
+"""version_inventario y funcion inventario_aplicar para PATCH de inventario
+
+Revision ID: 9b41e6f0d2c3
+Revises: 5d20b8c1e4a7
+Create Date: 2026-10-18 15:40:12.906114
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9b41e6f0d2c3'
+down_revision = '5d20b8c1e4a7'
+branch_labels = None
+depends_on = None
+
+
+# Aplica una lista de operaciones estilo JSON Patch (add / remove / move) a un
+# inventario. Los índices fuera de rango abortan todo con invalid_parameter_value
+# (22023), que la API devuelve como 400.
+APLICAR = """
+CREATE OR REPLACE FUNCTION inventario_aplicar(inv jsonb, ops jsonb) RETURNS jsonb
+LANGUAGE plpgsql IMMUTABLE AS $$
+DECLARE
+    o jsonb;
+    k integer := 0;
+    n integer;
+    desde integer;
+    hasta integer;
+    item jsonb;
+BEGIN
+    inv := coalesce(inv, '[]'::jsonb);
+
+    FOR o IN SELECT value FROM jsonb_array_elements(ops) LOOP
+        n := jsonb_array_length(inv);
+
+        IF o->>'op' = 'add' THEN
+            IF coalesce(o->>'path', '/-') = '/-' THEN
+                hasta := n;
+            ELSE
+                hasta := substr(o->>'path', 2)::integer;
+            END IF;
+            IF hasta > n THEN
+                RAISE EXCEPTION USING ERRCODE = '22023',
+                    MESSAGE = 'operación ' || k || ': posición ' || hasta || ' fuera de rango';
+            END IF;
+            IF hasta = n THEN
+                inv := inv || jsonb_build_array(o->'value');
+            ELSE
+                inv := jsonb_insert(inv, ARRAY[hasta::text], o->'value');
+            END IF;
+
+        ELSIF o->>'op' = 'remove' THEN
+            IF o->>'path' IS NOT NULL THEN
+                desde := substr(o->>'path', 2)::integer;
+            ELSE
+                SELECT e.orden - 1 INTO desde
+                FROM jsonb_array_elements(inv) WITH ORDINALITY AS e(valor, orden)
+                WHERE e.valor = o->'value'
+                ORDER BY e.orden
+                LIMIT 1;
+            END IF;
+            IF desde IS NULL OR desde >= n THEN
+                RAISE EXCEPTION USING ERRCODE = '22023',
+                    MESSAGE = 'operación ' || k || ': el item no existe';
+            END IF;
+            inv := inv - desde;
+
+        ELSIF o->>'op' = 'move' THEN
+            desde := substr(o->>'from', 2)::integer;
+            hasta := substr(o->>'path', 2)::integer;
+            IF desde >= n OR hasta >= n THEN
+                RAISE EXCEPTION USING ERRCODE = '22023',
+                    MESSAGE = 'operación ' || k || ': posición fuera de rango';
+            END IF;
+            item := inv -> desde;
+            inv := inv - desde;
+            IF hasta = n - 1 THEN
+                inv := inv || jsonb_build_array(item);
+            ELSE
+                inv := jsonb_insert(inv, ARRAY[hasta::text], item);
+            END IF;
+
+        ELSE
+            RAISE EXCEPTION USING ERRCODE = '22023',
+                MESSAGE = 'operación ' || k || ': op desconocida';
+        END IF;
+
+        k := k + 1;
+    END LOOP;
+
+    RETURN inv;
+END
+$$;
+"""
+
+# Cualquier escritura que cambie el inventario (PUT, lote, PATCH) sube la versión
+VERSION = """
+CREATE OR REPLACE FUNCTION personajes_version_inventario() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF NEW.inventario IS DISTINCT FROM OLD.inventario THEN
+        NEW.version_inventario := OLD.version_inventario + 1;
+    END IF;
+    RETURN NEW;
+END
+$$;
+
+CREATE TRIGGER personajes_version_inventario_tg
+BEFORE UPDATE OF inventario ON personajes
+FOR EACH ROW EXECUTE FUNCTION personajes_version_inventario();
+"""
+
+
+def upgrade():
+    with op.batch_alter_table('personajes', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('version_inventario', sa.Integer(), nullable=False,
+                                      server_default='0'))
+
+    op.execute(APLICAR)
+    op.execute(VERSION)
+
+
+def downgrade():
+    op.execute("DROP TRIGGER IF EXISTS personajes_version_inventario_tg ON personajes")
+    op.execute("DROP FUNCTION IF EXISTS personajes_version_inventario()")
+    op.execute("DROP FUNCTION IF EXISTS inventario_aplicar(jsonb, jsonb)")
+
+    with op.batch_alter_table('personajes', schema=None) as batch_op:
+        batch_op.drop_column('version_inventario')
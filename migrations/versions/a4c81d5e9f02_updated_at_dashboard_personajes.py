@@ -0,0 +1,43 @@
+"""updated_at en dashboard y personajes
+
+Revision ID: a4c81d5e9f02
+Revises: 3b9e4f2a7c1d
+Create Date: 2026-10-18 11:40:27.905113
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a4c81d5e9f02'
+down_revision = '3b9e4f2a7c1d'
+branch_labels = None
+depends_on = None
+
+
+TABLAS = ['dashboard', 'personajes']
+
+
+def upgrade():
+    for tabla in TABLAS:
+        with op.batch_alter_table(tabla, schema=None) as batch_op:
+            batch_op.add_column(sa.Column('updated_at', sa.DateTime(), nullable=False,
+                                          server_default=sa.text("(now() AT TIME ZONE 'utc')")))
+
+    # (iduser, updated_at) resuelve max(updated_at) por usuario para los ETag
+    with op.get_context().autocommit_block():
+        for tabla in TABLAS:
+            op.create_index(f'ix_{tabla}_iduser_updated_at', tabla, ['iduser', 'updated_at'],
+                            unique=False, postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for tabla in reversed(TABLAS):
+            op.drop_index(f'ix_{tabla}_iduser_updated_at', table_name=tabla,
+                          postgresql_concurrently=True, if_exists=True)
+
+    for tabla in reversed(TABLAS):
+        with op.batch_alter_table(tabla, schema=None) as batch_op:
+            batch_op.drop_column('updated_at')
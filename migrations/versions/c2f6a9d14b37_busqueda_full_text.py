@@ -0,0 +1,85 @@
+"""Busqueda full-text (tsvector + GIN) en dashboard y personajes
+
+Revision ID: c2f6a9d14b37
+Revises: a4c81d5e9f02
+Create Date: 2026-10-18 13:05:51.230641
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'c2f6a9d14b37'
+down_revision = 'a4c81d5e9f02'
+branch_labels = None
+depends_on = None
+
+
+# Pesos: A = títulos/nombres, B = contexto, C = texto largo
+FUNCIONES = {
+    'dashboard': (
+        ['cronica', 'jugadores', 'resumen'],
+        """
+        NEW.busqueda :=
+            setweight(to_tsvector('spanish', coalesce(NEW.cronica, '')), 'A') ||
+            setweight(to_tsvector('spanish', coalesce(NEW.jugadores, '')), 'B') ||
+            setweight(to_tsvector('spanish', coalesce(NEW.resumen, '')), 'C');
+        """,
+    ),
+    'personajes': (
+        ['nombre', 'apellido', 'descripcion', 'historia', 'notas'],
+        """
+        NEW.busqueda :=
+            setweight(to_tsvector('spanish', coalesce(NEW.nombre, '') || ' ' || coalesce(NEW.apellido, '')), 'A') ||
+            setweight(to_tsvector('spanish', coalesce(NEW.descripcion, '')), 'B') ||
+            setweight(to_tsvector('spanish', coalesce(NEW.historia, '')), 'C') ||
+            setweight(to_tsvector('spanish', coalesce(NEW.notas, '')), 'C');
+        """,
+    ),
+}
+
+
+def upgrade():
+    for tabla, (columnas, cuerpo) in FUNCIONES.items():
+        with op.batch_alter_table(tabla, schema=None) as batch_op:
+            batch_op.add_column(sa.Column('busqueda', postgresql.TSVECTOR(), nullable=True))
+
+        op.execute(f"""
+            CREATE OR REPLACE FUNCTION {tabla}_busqueda_trigger() RETURNS trigger
+            LANGUAGE plpgsql AS $$
+            BEGIN
+                {cuerpo}
+                RETURN NEW;
+            END
+            $$;
+        """)
+        # UPDATE OF: solo se recalcula si cambió alguna columna indexada
+        op.execute(f"""
+            CREATE TRIGGER {tabla}_busqueda_tg
+            BEFORE INSERT OR UPDATE OF {', '.join(columnas)} ON {tabla}
+            FOR EACH ROW EXECUTE FUNCTION {tabla}_busqueda_trigger();
+        """)
+
+        # Backfill: reasignar una columna indexada dispara el trigger
+        op.execute(f"UPDATE {tabla} SET {columnas[0]} = {columnas[0]}")
+
+    with op.get_context().autocommit_block():
+        for tabla in FUNCIONES:
+            op.create_index(f'ix_{tabla}_busqueda', tabla, ['busqueda'], unique=False,
+                            postgresql_using='gin', postgresql_concurrently=True,
+                            if_not_exists=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for tabla in FUNCIONES:
+            op.drop_index(f'ix_{tabla}_busqueda', table_name=tabla,
+                          postgresql_concurrently=True, if_exists=True)
+
+    for tabla in FUNCIONES:
+        op.execute(f"DROP TRIGGER IF EXISTS {tabla}_busqueda_tg ON {tabla}")
+        op.execute(f"DROP FUNCTION IF EXISTS {tabla}_busqueda_trigger()")
+        with op.batch_alter_table(tabla, schema=None) as batch_op:
+            batch_op.drop_column('busqueda')
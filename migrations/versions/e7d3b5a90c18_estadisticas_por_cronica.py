@@ -0,0 +1,202 @@
+"""Tablas resumen de estadisticas por cronica
+
+Revision ID: e7d3b5a90c18
+Revises: c2f6a9d14b37
+Create Date: 2026-10-18 14:21:09.774512
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e7d3b5a90c18'
+down_revision = 'c2f6a9d14b37'
+branch_labels = None
+depends_on = None
+
+
+# Jugadores de una sesión, sin vacíos ni repetidos. 5d20b8c1e4a7 agrega la
+# versión para jsonb: las funciones de abajo no cambian con el tipo de la columna.
+JUGADORES = r"""
+CREATE OR REPLACE FUNCTION jugadores_de(valor text) RETURNS SETOF text
+LANGUAGE sql IMMUTABLE AS $$
+    SELECT DISTINCT btrim(x)
+    FROM regexp_split_to_table(coalesce(valor, ''), '[,;\n]') AS x
+    WHERE btrim(x) <> ''
+$$;
+"""
+
+# Recalcula solo el grupo (iduser, cronica): para la carga inicial y para
+# reconstruir un grupo a mano. Se apoya en ix_dashboard_iduser_cronica.
+RECALCULAR = """
+CREATE OR REPLACE FUNCTION recalcular_estadisticas_cronica(p_iduser integer, p_cronica text)
+RETURNS void LANGUAGE plpgsql AS $$
+BEGIN
+    -- Serializa con los triggers del mismo grupo
+    PERFORM pg_advisory_xact_lock(p_iduser, hashtext(p_cronica));
+
+    DELETE FROM estadisticas_cronica WHERE iduser = p_iduser AND cronica = p_cronica;
+    DELETE FROM asistencia_cronica WHERE iduser = p_iduser AND cronica = p_cronica;
+
+    INSERT INTO estadisticas_cronica (iduser, cronica, sesiones, primera_fecha, ultima_fecha)
+    SELECT p_iduser, p_cronica, count(*), min(fecha), max(fecha)
+    FROM dashboard
+    WHERE iduser = p_iduser
+      AND (cronica = p_cronica OR (p_cronica = '' AND cronica IS NULL))
+    HAVING count(*) > 0;
+
+    INSERT INTO asistencia_cronica (iduser, cronica, jugador, sesiones)
+    SELECT p_iduser, p_cronica, j.jugador, count(*)
+    FROM dashboard d
+    CROSS JOIN LATERAL jugadores_de(d.jugadores) AS j(jugador)
+    WHERE d.iduser = p_iduser
+      AND (d.cronica = p_cronica OR (p_cronica = '' AND d.cronica IS NULL))
+    GROUP BY j.jugador;
+END
+$$;
+"""
+
+# Los triggers no recalculan: cada sentencia sobre dashboard se traduce en
+# movimientos, +1 por fila que entra a un grupo (iduser, crónica) y -1 por fila
+# que sale. Un UPDATE que toca crónica, fecha o jugadores es una salida de la
+# fila vieja y una entrada de la nueva. Los contadores se ajustan con upserts,
+# sin leer el resto del grupo.
+#
+# primera/ultima_fecha se extienden con least/greatest; solo cuando sale una
+# fila con la fecha del borde se buscan de nuevo en dashboard.
+#
+# Triggers por sentencia (no por fila): un lote de 500 sesiones es un upsert
+# por grupo. Las tablas de transición no admiten UPDATE OF columnas, así que el
+# filtro de cambios relevantes va en los movimientos.
+MOVIMIENTOS = {
+    "ins": "SELECT iduser, coalesce(cronica, '') AS cronica, fecha, jugadores, 1 AS signo FROM nuevas",
+    "del": "SELECT iduser, coalesce(cronica, '') AS cronica, fecha, jugadores, -1 AS signo FROM viejas",
+    "upd": """
+        SELECT n.iduser, coalesce(n.cronica, '') AS cronica, n.fecha, n.jugadores, 1 AS signo
+        FROM nuevas n JOIN viejas v USING (idsesion)
+        WHERE (n.iduser, n.cronica, n.fecha, n.jugadores) IS DISTINCT FROM (v.iduser, v.cronica, v.fecha, v.jugadores)
+        UNION ALL
+        SELECT v.iduser, coalesce(v.cronica, ''), v.fecha, v.jugadores, -1
+        FROM nuevas n JOIN viejas v USING (idsesion)
+        WHERE (n.iduser, n.cronica, n.fecha, n.jugadores) IS DISTINCT FROM (v.iduser, v.cronica, v.fecha, v.jugadores)
+    """,
+}
+
+TRANSICION = {
+    "ins": "AFTER INSERT ON dashboard REFERENCING NEW TABLE AS nuevas",
+    "del": "AFTER DELETE ON dashboard REFERENCING OLD TABLE AS viejas",
+    "upd": "AFTER UPDATE ON dashboard REFERENCING OLD TABLE AS viejas NEW TABLE AS nuevas",
+}
+
+
+def funcion_deltas(op_, movimientos):
+    # Las tablas de transición solo existen dentro de cada trigger: una función
+    # por operación, con la misma lógica sobre sus movimientos
+    return f"""
+CREATE OR REPLACE FUNCTION estadisticas_cronica_{op_}_tg() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    -- Mismo lock que recalcular_estadisticas_cronica, en orden para no
+    -- trabarse: las sentencias siguientes ya ven lo que otra transacción del
+    -- grupo haya confirmado (importa al buscar de nuevo un borde)
+    PERFORM pg_advisory_xact_lock(g.iduser, hashtext(g.cronica))
+    FROM (SELECT DISTINCT iduser, cronica FROM ({movimientos}) m ORDER BY iduser, cronica) g;
+
+    INSERT INTO estadisticas_cronica AS e (iduser, cronica, sesiones, primera_fecha, ultima_fecha)
+    SELECT iduser, cronica, sum(signo),
+           min(fecha) FILTER (WHERE signo > 0), max(fecha) FILTER (WHERE signo > 0)
+    FROM ({movimientos}) m
+    GROUP BY iduser, cronica
+    ON CONFLICT (iduser, cronica) DO UPDATE SET
+        sesiones = e.sesiones + EXCLUDED.sesiones,
+        primera_fecha = least(e.primera_fecha, EXCLUDED.primera_fecha),
+        ultima_fecha = greatest(e.ultima_fecha, EXCLUDED.ultima_fecha);
+
+    -- Salió una fila con la fecha del borde: solo ahí se recorre el grupo
+    UPDATE estadisticas_cronica e
+    SET primera_fecha = b.primera, ultima_fecha = b.ultima
+    FROM (
+        SELECT g.iduser, g.cronica, min(d.fecha) AS primera, max(d.fecha) AS ultima
+        FROM (
+            SELECT DISTINCT m.iduser, m.cronica
+            FROM ({movimientos}) m
+            JOIN estadisticas_cronica x ON x.iduser = m.iduser AND x.cronica = m.cronica
+            WHERE m.signo < 0 AND m.fecha IN (x.primera_fecha, x.ultima_fecha)
+        ) g
+        LEFT JOIN dashboard d
+          ON d.iduser = g.iduser
+         AND (d.cronica = g.cronica OR (g.cronica = '' AND d.cronica IS NULL))
+        GROUP BY g.iduser, g.cronica
+    ) b
+    WHERE e.iduser = b.iduser AND e.cronica = b.cronica;
+
+    INSERT INTO asistencia_cronica AS a (iduser, cronica, jugador, sesiones)
+    SELECT m.iduser, m.cronica, j.jugador, sum(m.signo)
+    FROM ({movimientos}) m
+    CROSS JOIN LATERAL jugadores_de(m.jugadores) AS j(jugador)
+    GROUP BY m.iduser, m.cronica, j.jugador
+    HAVING sum(m.signo) <> 0
+    ON CONFLICT (iduser, cronica, jugador) DO UPDATE SET
+        sesiones = a.sesiones + EXCLUDED.sesiones;
+
+    -- Grupos y jugadores que quedaron en cero
+    DELETE FROM estadisticas_cronica e
+    USING (SELECT DISTINCT iduser, cronica FROM ({movimientos}) m WHERE signo < 0) g
+    WHERE e.iduser = g.iduser AND e.cronica = g.cronica AND e.sesiones <= 0;
+
+    DELETE FROM asistencia_cronica a
+    USING (SELECT DISTINCT iduser, cronica FROM ({movimientos}) m WHERE signo < 0) g
+    WHERE a.iduser = g.iduser AND a.cronica = g.cronica AND a.sesiones <= 0;
+
+    RETURN NULL;
+END
+$$;
+"""
+
+
+def upgrade():
+    op.create_table(
+        'estadisticas_cronica',
+        sa.Column('iduser', sa.Integer(), sa.ForeignKey('users.iduser'), nullable=False),
+        sa.Column('cronica', sa.Text(), nullable=False),
+        sa.Column('sesiones', sa.Integer(), nullable=False),
+        sa.Column('primera_fecha', sa.Date(), nullable=True),
+        sa.Column('ultima_fecha', sa.Date(), nullable=True),
+        sa.PrimaryKeyConstraint('iduser', 'cronica'),
+    )
+    op.create_table(
+        'asistencia_cronica',
+        sa.Column('iduser', sa.Integer(), sa.ForeignKey('users.iduser'), nullable=False),
+        sa.Column('cronica', sa.Text(), nullable=False),
+        sa.Column('jugador', sa.Text(), nullable=False),
+        sa.Column('sesiones', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('iduser', 'cronica', 'jugador'),
+    )
+
+    op.execute(JUGADORES)
+    op.execute(RECALCULAR)
+
+    # Carga inicial, antes de los triggers
+    op.execute("""
+        SELECT recalcular_estadisticas_cronica(iduser, cronica)
+        FROM (SELECT DISTINCT iduser, coalesce(cronica, '') AS cronica FROM dashboard) g
+    """)
+
+    for op_, movimientos in MOVIMIENTOS.items():
+        op.execute(funcion_deltas(op_, movimientos))
+        op.execute(f"""
+            CREATE TRIGGER estadisticas_cronica_{op_} {TRANSICION[op_]}
+            FOR EACH STATEMENT EXECUTE FUNCTION estadisticas_cronica_{op_}_tg()
+        """)
+
+
+def downgrade():
+    for op_ in MOVIMIENTOS:
+        op.execute(f"DROP TRIGGER IF EXISTS estadisticas_cronica_{op_} ON dashboard")
+        op.execute(f"DROP FUNCTION IF EXISTS estadisticas_cronica_{op_}_tg()")
+    op.execute("DROP FUNCTION IF EXISTS recalcular_estadisticas_cronica(integer, text)")
+    op.execute("DROP FUNCTION IF EXISTS jugadores_de(text)")
+
+    op.drop_table('asistencia_cronica')
+    op.drop_table('estadisticas_cronica')
@@ -0,0 +1,118 @@
+"""Registro de cambios por usuario (con tombstones) para GET /sync
+
+Revision ID: f3a8c61d07b5
+Revises: 9b41e6f0d2c3
+Create Date: 2026-10-18 17:05:48.213960
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3a8c61d07b5'
+down_revision = '9b41e6f0d2c3'
+branch_labels = None
+depends_on = None
+
+
+# Cada escritura sobre dashboard/personajes toma la siguiente versión del
+# usuario (users.version_cambios) y la deja en `cambios`, una fila por registro
+# con su último cambio; un DELETE la deja como tombstone (borrado = true).
+#
+# El UPDATE sobre users bloquea la fila del usuario hasta el commit: dos
+# transacciones del mismo usuario se ordenan, y una versión nunca se hace
+# visible después de otra mayor (con una secuencia global sí podría pasar, y
+# un cliente que ya sincronizó hasta la mayor perdería el cambio).
+REGISTRAR = """
+CREATE OR REPLACE FUNCTION registrar_cambio() RETURNS trigger
+LANGUAGE plpgsql AS $$
+DECLARE
+    fila record;
+    ident integer;
+    v bigint;
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        fila := OLD;
+    ELSE
+        fila := NEW;
+    END IF;
+
+    IF TG_TABLE_NAME = 'dashboard' THEN
+        ident := fila.idsesion;
+    ELSE
+        ident := fila.idpersonaje;
+    END IF;
+
+    UPDATE users SET version_cambios = version_cambios + 1
+    WHERE iduser = fila.iduser
+    RETURNING version_cambios INTO v;
+
+    INSERT INTO cambios (iduser, recurso, idregistro, version, borrado)
+    VALUES (fila.iduser, TG_ARGV[0], ident, v, TG_OP = 'DELETE')
+    ON CONFLICT (iduser, recurso, idregistro)
+    DO UPDATE SET version = EXCLUDED.version, borrado = EXCLUDED.borrado;
+
+    RETURN NULL;
+END
+$$;
+
+CREATE TRIGGER dashboard_cambios_tg
+AFTER INSERT OR UPDATE OR DELETE ON dashboard
+FOR EACH ROW EXECUTE FUNCTION registrar_cambio('sesion');
+
+CREATE TRIGGER personajes_cambios_tg
+AFTER INSERT OR UPDATE OR DELETE ON personajes
+FOR EACH ROW EXECUTE FUNCTION registrar_cambio('personaje');
+"""
+
+# Carga inicial: lo que ya existe entra como cambios 1..N de cada usuario, así
+# un cliente sin token recibe todo por el mismo camino
+CARGA_INICIAL = """
+INSERT INTO cambios (iduser, recurso, idregistro, version, borrado)
+SELECT iduser, recurso, idregistro,
+       row_number() OVER (PARTITION BY iduser ORDER BY updated_at, recurso, idregistro),
+       false
+FROM (
+    SELECT iduser, 'sesion' AS recurso, idsesion AS idregistro, updated_at FROM dashboard
+    UNION ALL
+    SELECT iduser, 'personaje', idpersonaje, updated_at FROM personajes
+) t;
+
+UPDATE users u SET version_cambios = c.ultima
+FROM (SELECT iduser, max(version) AS ultima FROM cambios GROUP BY iduser) c
+WHERE u.iduser = c.iduser;
+"""
+
+
+def upgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('version_cambios', sa.BigInteger(), nullable=False,
+                                      server_default='0'))
+
+    op.create_table(
+        'cambios',
+        sa.Column('iduser', sa.Integer(), sa.ForeignKey('users.iduser', ondelete='CASCADE'), nullable=False),
+        sa.Column('recurso', sa.String(20), nullable=False),
+        sa.Column('idregistro', sa.Integer(), nullable=False),
+        sa.Column('version', sa.BigInteger(), nullable=False),
+        sa.Column('borrado', sa.Boolean(), nullable=False, server_default=sa.false()),
+        sa.PrimaryKeyConstraint('iduser', 'recurso', 'idregistro'),
+    )
+    # GET /sync lee (iduser, version > token) en orden: costo proporcional a los cambios
+    op.create_index('ix_cambios_iduser_version', 'cambios', ['iduser', 'version'], unique=True)
+
+    op.execute(CARGA_INICIAL)
+    op.execute(REGISTRAR)
+
+
+def downgrade():
+    op.execute("DROP TRIGGER IF EXISTS dashboard_cambios_tg ON dashboard")
+    op.execute("DROP TRIGGER IF EXISTS personajes_cambios_tg ON personajes")
+    op.execute("DROP FUNCTION IF EXISTS registrar_cambio()")
+
+    op.drop_index('ix_cambios_iduser_version', table_name='cambios')
+    op.drop_table('cambios')
+
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_column('version_cambios')
@@ -1,8 +1,16 @@
 # models.py
-from flask_migrate import Migrate
 from datetime import datetime
 from extensions import db
-from sqlalchemy.dialects.postgresql import JSON   # 👈 IMPORTANTE
+from sqlalchemy.dialects.postgresql import JSONB, TSVECTOR   # 👈 IMPORTANTE
+from sqlalchemy.orm import deferred
+
+# Columna de búsqueda full-text; la mantiene un trigger (ver migración c2f6a9d14b37).
+# En SQLite (pruebas locales) no existe tsvector.
+TipoBusqueda = TSVECTOR().with_variant(db.Text(), "sqlite")
+
+# Listas (jugadores, inventario) en JSONB para poder filtrar por contención (@>)
+# con índices GIN (ver migración 5d20b8c1e4a7). En SQLite queda como JSON.
+TipoLista = JSONB().with_variant(db.JSON(), "sqlite")
 
 class User(db.Model):
     __tablename__ = "users"
@@ -12,6 +20,8 @@ class User(db.Model):
     apellido = db.Column(db.String(100), nullable=False)
     username = db.Column(db.String(80), unique=True, nullable=False)
     password = db.Column(db.String(200), nullable=False)
+    # Última versión de cambios del usuario; la suben los triggers de `cambios`
+    version_cambios = db.Column(db.BigInteger, nullable=False, default=0)
 
     dashboards = db.relationship("Dashboard", backref="usuario", lazy=True)
 
@@ -24,10 +34,22 @@ class Dashboard(db.Model):
     cronica = db.Column(db.Text, nullable=True)
     juego = db.Column(db.Text, nullable=True)
     director = db.Column(db.String(100), nullable=True)
-    jugadores = db.Column(db.Text, nullable=True)
+    jugadores = db.Column(TipoLista, nullable=True)   # ["Ana", "Luis", ...]
     numero_de_sesion = db.Column(db.Integer, nullable=True)
     fecha = db.Column(db.Date, nullable=False, default=datetime.utcnow)
     resumen = db.Column(db.Text, nullable=True)
+    busqueda = deferred(db.Column(TipoBusqueda, nullable=True))
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+# Índices de las consultas por usuario (ver migración 3b9e4f2a7c1d).
+# El prefijo `iduser` de los compuestos cubre también los filtros simples.
+db.Index("ix_dashboard_iduser_fecha", Dashboard.iduser, Dashboard.fecha.desc(), Dashboard.idsesion.desc())
+db.Index("ix_dashboard_iduser_cronica", Dashboard.iduser, Dashboard.cronica)
+db.Index("ix_dashboard_iduser_updated_at", Dashboard.iduser, Dashboard.updated_at)
+db.Index("ix_dashboard_busqueda", Dashboard.busqueda, postgresql_using="gin")
+db.Index("ix_dashboard_jugadores", Dashboard.jugadores, postgresql_using="gin",
+         postgresql_ops={"jugadores": "jsonb_path_ops"})
 
 
 class Personaje(db.Model):
@@ -47,6 +69,63 @@ class Personaje(db.Model):
     historia = db.Column(db.Text, nullable=True)
 
     # ⬇⬇⬇ NUEVA COLUMNA JSON PARA LISTA DE ITEMS
-    inventario = db.Column(JSON, nullable=True)
+    inventario = db.Column(TipoLista, nullable=True)
+    # La sube un trigger en cada cambio de inventario (ver migración 9b41e6f0d2c3);
+    # PATCH /personajes/<id>/inventario la usa para concurrencia optimista
+    version_inventario = db.Column(db.Integer, nullable=False, default=0)
 
     notas = db.Column(db.Text, nullable=True)
+    busqueda = deferred(db.Column(TipoBusqueda, nullable=True))
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+db.Index("ix_personajes_iduser_cronica", Personaje.iduser, Personaje.cronica)
+db.Index("ix_personajes_iduser_updated_at", Personaje.iduser, Personaje.updated_at)
+db.Index("ix_personajes_busqueda", Personaje.busqueda, postgresql_using="gin")
+db.Index("ix_personajes_inventario", Personaje.inventario, postgresql_using="gin",
+         postgresql_ops={"inventario": "jsonb_path_ops"})
+
+
+# ============================================================
+# Resúmenes por crónica (solo lectura desde la app).
+# Los mantienen triggers sobre `dashboard` (ver migración e7d3b5a90c18);
+# una crónica NULL se guarda como ''.
+# ============================================================
+
+class EstadisticaCronica(db.Model):
+    __tablename__ = "estadisticas_cronica"
+
+    iduser = db.Column(db.Integer, db.ForeignKey("users.iduser"), primary_key=True)
+    cronica = db.Column(db.Text, primary_key=True)
+    sesiones = db.Column(db.Integer, nullable=False)
+    primera_fecha = db.Column(db.Date, nullable=True)
+    ultima_fecha = db.Column(db.Date, nullable=True)
+
+
+class AsistenciaCronica(db.Model):
+    __tablename__ = "asistencia_cronica"
+
+    iduser = db.Column(db.Integer, db.ForeignKey("users.iduser"), primary_key=True)
+    cronica = db.Column(db.Text, primary_key=True)
+    jugador = db.Column(db.Text, primary_key=True)
+    sesiones = db.Column(db.Integer, nullable=False)
+
+
+# ============================================================
+# Registro de cambios para GET /sync (solo lectura desde la app).
+# Una fila por sesión/personaje con la versión de su último cambio; los
+# borrados quedan como tombstones. Lo mantienen triggers sobre `dashboard` y
+# `personajes` (ver migración f3a8c61d07b5).
+# ============================================================
+
+class Cambio(db.Model):
+    __tablename__ = "cambios"
+
+    iduser = db.Column(db.Integer, db.ForeignKey("users.iduser", ondelete="CASCADE"), primary_key=True)
+    recurso = db.Column(db.String(20), primary_key=True)    # 'sesion' | 'personaje'
+    idregistro = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.BigInteger, nullable=False)
+    borrado = db.Column(db.Boolean, nullable=False, default=False)
+
+
+db.Index("ix_cambios_iduser_version", Cambio.iduser, Cambio.version, unique=True)
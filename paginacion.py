@@ -0,0 +1,48 @@
+# paginacion.py
+# Cursores opacos para paginación por keyset (seek) en lugar de OFFSET,
+# y lectura de los parámetros de los listados.
+import base64
+import json
+
+LIMITE_POR_DEFECTO = 50
+LIMITE_MAXIMO = 200
+
+
+class ParametroInvalido(ValueError):
+    pass
+
+
+def codificar_cursor(*valores):
+    """Empaqueta los valores de la última fila entregada en un token urlsafe."""
+    crudo = json.dumps(valores, separators=(",", ":"), default=str)
+    return base64.urlsafe_b64encode(crudo.encode()).decode().rstrip("=")
+
+
+def decodificar_cursor(token):
+    """Devuelve la lista de valores guardados en el cursor."""
+    try:
+        relleno = "=" * (-len(token) % 4)
+        valores = json.loads(base64.urlsafe_b64decode(token + relleno))
+    except (ValueError, TypeError) as e:
+        raise ParametroInvalido("Cursor inválido") from e
+
+    if not isinstance(valores, list):
+        raise ParametroInvalido("Cursor inválido")
+    return valores
+
+
+def leer_limite(args, defecto=LIMITE_POR_DEFECTO, maximo=LIMITE_MAXIMO):
+    """Lee ?limit= de la query string, acotado a [1, maximo]."""
+    try:
+        limite = int(args.get("limit", defecto))
+    except (TypeError, ValueError):
+        raise ParametroInvalido("limit debe ser un entero")
+    return max(1, min(limite, maximo))
+
+
+def leer_valores(args, nombre, maximo=10):
+    """Valores no vacíos de un parámetro repetible (?jugador=Ana&jugador=Luis)."""
+    valores = [v.strip() for v in args.getlist(nombre) if v.strip()]
+    if len(valores) > maximo:
+        raise ParametroInvalido(f"Demasiados valores para {nombre} (máximo {maximo})")
+    return valores
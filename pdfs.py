@@ -0,0 +1,344 @@
+# pdfs.py
+# Render de PDFs con ReportLab a partir de datos planos (dicts de strings),
+# para que se pueda ejecutar tanto en el request como en un proceso aparte.
+#
+# ReportLab se importa dentro de cada render: cuesta bastante y no hace falta
+# para arrancar ni para /health; se paga en el primer PDF (o en el hijo del pool).
+#
+# pageCompression=1 explícito en cada documento: es el defecto de ReportLab,
+# pero RL_pageCompression=0 (o un reportlab_settings.py) lo apagaría y los PDFs
+# de crónicas largas saldrían varias veces más grandes.
+import itertools
+from io import BytesIO
+
+from texto_pdf import envolver
+
+# Subir cuando cambie el diseño de algún PDF: invalida los artefactos cacheados
+VERSION_RENDER = 4
+
+
+# ============================================================
+# Sesión (dashboard)
+# ============================================================
+
+def datos_sesion_pdf(sesion):
+    return {
+        "idsesion": sesion.idsesion,
+        "cronica": sesion.cronica,
+        "juego": sesion.juego,
+        "director": sesion.director,
+        "jugadores": ", ".join(sesion.jugadores or []),
+        "numero_de_sesion": sesion.numero_de_sesion,
+        "fecha": sesion.fecha.strftime("%Y-%m-%d"),
+        "resumen": sesion.resumen or "",
+    }
+
+
+def render_sesion_pdf(datos):
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.units import mm
+    from reportlab.pdfgen import canvas
+
+    buffer = BytesIO()
+    c = canvas.Canvas(buffer, pagesize=A4, pageCompression=1)
+
+    width, height = A4
+    margin = 20 * mm
+    y = height - margin
+
+    # --- Encabezado ---
+    c.setFont("Helvetica-Bold", 16)
+    c.drawString(margin, y, "Bitácora de Sesión")
+    y -= 15
+
+    c.setFont("Helvetica", 12)
+    lineas_datos = [
+        f"Crónica: {datos['cronica']}",
+        f"Juego: {datos['juego']}",
+        f"Director: {datos['director']}",
+        f"Jugadores: {datos['jugadores']}",
+        f"Número de Sesión: {datos['numero_de_sesion']}",
+        f"Fecha: {datos['fecha']}",
+    ]
+
+    for d in lineas_datos:
+        y -= 15
+        c.drawString(margin, y, d)
+
+    y -= 25
+    c.setFont("Helvetica-Bold", 13)
+    c.drawString(margin, y, "Resumen:")
+    y -= 20
+
+    c.setFont("Helvetica", 11)
+
+    # --- Word Wrapping automático ---
+    max_width = width - (2 * margin)
+    lineas = envolver(datos["resumen"], max_width, "Helvetica", 11)
+
+    for linea in lineas:
+        if y < margin:
+            c.showPage()
+            y = height - margin
+            c.setFont("Helvetica", 11)
+
+        c.drawString(margin, y, linea)
+        y -= 14
+
+    c.save()
+    return buffer.getvalue()
+
+
+# ============================================================
+# Personaje
+# ============================================================
+
+def datos_personaje_pdf(personaje):
+    inventario = personaje.inventario if isinstance(personaje.inventario, list) else []
+    return {
+        "idpersonaje": personaje.idpersonaje,
+        "nombre": personaje.nombre,
+        "apellido": personaje.apellido,
+        "cronica": personaje.cronica,
+        "juego": personaje.juego,
+        "genero": personaje.genero,
+        "edad": personaje.edad,
+        "ocupacion": personaje.ocupacion,
+        "etnia": personaje.etnia,
+        "descripcion": personaje.descripcion,
+        "historia": personaje.historia,
+        "inventario": [str(item) for item in inventario],
+        "notas": personaje.notas,
+    }
+
+
+def render_personaje_pdf(datos):
+    from reportlab.lib.pagesizes import letter
+    from reportlab.pdfgen import canvas
+
+    buffer = BytesIO()
+    pdf = canvas.Canvas(buffer, pagesize=letter, pageCompression=1)
+
+    width = letter[0]
+    x = 100
+    max_width = width - 2 * x
+    fuente = ("Helvetica", 11)
+    y = 750
+
+    def write(text, offset=20):
+        nonlocal y
+        if y < 50:
+            pdf.showPage()
+            pdf.setFont(*fuente)
+            y = 750
+        pdf.drawString(x, y, str(text))
+        y -= offset
+
+    def write_wrapped(text, offset=15):
+        for line in envolver(text, max_width, *fuente):
+            write(line, offset)
+
+    pdf.setFont("Helvetica-Bold", 14)
+    write(f"{datos['nombre']} {datos['apellido']}", 30)
+
+    pdf.setFont(*fuente)
+    write(f"Cronica: {datos['cronica'] or 'N/A'}")
+    write(f"Juego: {datos['juego'] or 'N/A'}")
+    write(f"Género: {datos['genero'] or 'N/A'}")
+    write(f"Edad: {datos['edad'] or 'N/A'}")
+    write(f"Ocupación: {datos['ocupacion'] or 'N/A'}")
+    write(f"Etnia: {datos['etnia'] or 'N/A'}")
+
+    write("Descripción:", 25)
+    write_wrapped(datos["descripcion"] or "N/A")
+
+    write("Historia:", 25)
+    write_wrapped(datos["historia"] or "N/A")
+
+    write("Inventario:", 25)
+    for item in datos["inventario"]:
+        write_wrapped(f"- {item}")
+
+    write("Notas:", 25)
+    write_wrapped(datos["notas"] or "N/A")
+
+    pdf.save()
+    return buffer.getvalue()
+
+
+# ============================================================
+# Libro de crónica (todas las sesiones + personajes)
+# ============================================================
+
+def _parrafos(texto, estilo):
+    from reportlab.platypus import Paragraph
+    from xml.sax.saxutils import escape
+
+    for parrafo in (texto or "").split("\n"):
+        if parrafo.strip():
+            yield Paragraph(escape(parrafo), estilo)
+
+
+def _bloques_cronica(cronica, sesiones, personajes, estilos):
+    """Flowables del cuerpo del libro, de a un bloque por sesión/personaje."""
+    from reportlab.platypus import PageBreak, Paragraph, Spacer
+    from xml.sax.saxutils import escape
+
+    h1, h2, cuerpo = estilos
+
+    for s in sesiones:
+        numero = s["numero_de_sesion"] if s["numero_de_sesion"] is not None else s["idsesion"]
+        bloque = [Paragraph(escape(f"Sesión {numero} — {s['fecha']}"), h1)]
+        for etiqueta, campo in (("Juego", "juego"), ("Director", "director"), ("Jugadores", "jugadores")):
+            if s[campo]:
+                bloque.append(Paragraph(f"<b>{etiqueta}:</b> {escape(str(s[campo]))}", cuerpo))
+        bloque.append(Spacer(1, 8))
+        bloque.extend(_parrafos(s["resumen"], cuerpo))
+        bloque.append(Spacer(1, 16))
+        yield bloque
+
+    encabezado = [PageBreak(), Paragraph("Personajes", h1)]
+    for p in personajes:
+        bloque, encabezado = encabezado + [Paragraph(escape(f"{p['nombre']} {p['apellido']}"), h2)], []
+        for etiqueta, campo in (
+            ("Juego", "juego"), ("Género", "genero"), ("Edad", "edad"),
+            ("Ocupación", "ocupacion"), ("Etnia", "etnia"),
+        ):
+            if p[campo]:
+                bloque.append(Paragraph(f"<b>{etiqueta}:</b> {escape(str(p[campo]))}", cuerpo))
+        for etiqueta, campo in (("Descripción", "descripcion"), ("Historia", "historia"), ("Notas", "notas")):
+            if p[campo]:
+                bloque.append(Paragraph(f"<b>{etiqueta}</b>", cuerpo))
+                bloque.extend(_parrafos(p[campo], cuerpo))
+        if p["inventario"]:
+            bloque.append(Paragraph("<b>Inventario</b>", cuerpo))
+            bloque.extend(Paragraph(f"- {escape(item)}", cuerpo) for item in p["inventario"])
+        bloque.append(Spacer(1, 12))
+        yield bloque
+
+
+def render_cronica_pdf(destino, cronica, sesiones, personajes):
+    """Escribe en `destino` (archivo binario) el libro de la crónica.
+
+    `sesiones` y `personajes` son funciones sin argumentos que devuelven un
+    iterable nuevo de los dicts de datos_*_pdf (p. ej. una consulta con
+    yield_per): el libro se arma en dos pasadas y cada una los recorre.
+
+    No se arma la historia entera: los flowables se generan y se ubican de a
+    una sesión o personaje por vez.
+      1. Pasada de medición sobre un lienzo que descarta las páginas: solo
+         junta (nivel, título, página) de cada encabezado.
+      2. Con eso se sabe cuántas páginas ocupan portada + índice, y se escribe
+         el PDF de una vez, con el índice ya resuelto.
+    El canvas de ReportLab igual retiene las páginas ya comprimidas hasta el
+    save(); lo que deja de crecer con la crónica es el layout.
+    """
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+    from reportlab.lib.units import mm
+    from reportlab.pdfgen.canvas import Canvas
+    from reportlab.platypus import Frame, PageBreak, PageTemplate, Paragraph, Spacer
+    from reportlab.platypus.doctemplate import BaseDocTemplate
+    from reportlab.platypus.tableofcontents import TableOfContents
+    from xml.sax.saxutils import escape
+
+    estilos = getSampleStyleSheet()
+    titulo = estilos["Title"]
+    h1 = ParagraphStyle("CronicaH1", parent=estilos["Heading1"])
+    h2 = ParagraphStyle("CronicaH2", parent=estilos["Heading2"])
+    cuerpo = estilos["BodyText"]
+    margin = 20 * mm
+
+    class LienzoDescartable(Canvas):
+        # Pasadas de medición: se necesita el layout, no las páginas
+        def showPage(self):
+            if self._onPage:
+                self._onPage(self._pageNumber)
+            self._startPage()
+
+    class LibroCronica(BaseDocTemplate):
+        def __init__(self, *args, entradas=None, **kwargs):
+            self.entradas = entradas
+            super().__init__(*args, **kwargs)
+
+        def afterFlowable(self, flowable):
+            # Los títulos de sesión/personaje alimentan el índice
+            if self.entradas is not None and isinstance(flowable, Paragraph) \
+                    and flowable.style.name in ("CronicaH1", "CronicaH2"):
+                nivel = 0 if flowable.style.name == "CronicaH1" else 1
+                self.entradas.append((nivel, flowable.getPlainText(), self.page))
+
+        def construir_por_bloques(self, bloques, canvasmaker=Canvas):
+            """Como build(), pero pide los flowables de a un bloque. Devuelve
+            la cantidad de páginas."""
+            self._doSave = canvasmaker is not LienzoDescartable
+            self._startBuild(canvasmaker=canvasmaker)
+            self.canv._doctemplate = self
+            try:
+                for bloque in bloques:
+                    flowables = list(bloque)
+                    while flowables:
+                        self.clean_hanging()
+                        self.handle_flowable(flowables)
+                paginas = self.page
+            finally:
+                del self.canv._doctemplate
+            self._endBuild()
+            return paginas
+
+    def pie(canv, doc):
+        canv.saveState()
+        canv.setFont("Helvetica", 9)
+        canv.drawRightString(A4[0] - margin, margin / 2, f"{cronica} — {doc.page}")
+        canv.restoreState()
+
+    def documento(salida, entradas=None):
+        doc = LibroCronica(salida, pagesize=A4, title=f"Crónica: {cronica}", pageCompression=1,
+                           entradas=entradas)
+        frame = Frame(margin, margin, A4[0] - 2 * margin, A4[1] - 2 * margin, id="cuerpo")
+        doc.addPageTemplates([PageTemplate(id="pagina", frames=[frame], onPage=pie)])
+        return doc
+
+    def portada(entradas, desplazamiento):
+        indice = TableOfContents()
+        indice.levelStyles = [
+            ParagraphStyle("Indice0", fontSize=11, leftIndent=10, firstLineIndent=-10, spaceBefore=4),
+            ParagraphStyle("Indice1", fontSize=10, leftIndent=25, firstLineIndent=-10),
+        ]
+        indice.addEntry(1, "Índice", 1)   # el propio título del índice, como siempre
+        indice.addEntries((nivel, texto, pagina + desplazamiento) for nivel, texto, pagina in entradas)
+        indice.beforeBuild()   # las entradas pasan a ser las que se dibujan
+        return [
+            Paragraph(escape(f"Crónica: {cronica}"), titulo),
+            Spacer(1, 12),
+            Paragraph("Índice", h2),
+            indice,
+            PageBreak(),
+        ]
+
+    def cuerpo_libro():
+        return _bloques_cronica(cronica, sesiones(), personajes(), (h1, h2, cuerpo))
+
+    # 1. Títulos y páginas del cuerpo, contando desde su primera página
+    entradas = []
+    documento(None, entradas).construir_por_bloques(cuerpo_libro(), LienzoDescartable)
+
+    # Páginas de portada + índice; los números de página pueden cambiar el
+    # largo del índice, por eso se repite hasta que se estabiliza
+    paginas_portada = 1
+    for _ in range(3):
+        medidas = documento(None).construir_por_bloques([portada(entradas, paginas_portada)], LienzoDescartable)
+        if medidas == paginas_portada:
+            break
+        paginas_portada = medidas
+
+    # 2. El PDF, de una sola pasada
+    documento(destino).construir_por_bloques(
+        itertools.chain([portada(entradas, paginas_portada)], cuerpo_libro())
+    )
+
+
+RENDERERS = {
+    "sesion": render_sesion_pdf,
+    "personaje": render_personaje_pdf,
+}
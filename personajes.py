@@ -1,12 +1,23 @@
 # personajes.py (BACKEND)
 
+import re
+
 from flask import Blueprint, request, jsonify, send_file
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_jwt_extended import current_user, jwt_required
+from sqlalchemy import bindparam, func, update
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.exc import DBAPIError
 from extensions import db
 from models import Personaje
-from io import BytesIO
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import letter
+from exportar import respuesta_exportacion
+from lotes import LoteInvalido, aplicar_lote, leer_operaciones
+from paginacion import ParametroInvalido, leer_valores
+from pdfs import VERSION_RENDER, datos_personaje_pdf
+from trabajos_pdf import encolar, obtener_pdf, respuesta_trabajo
+from cache import invalidar, respuesta_cacheada
+from eventos import publicar, publicar_lote
+from serializadores import compilar, serializar_filas
+from condicional import con_validadores, no_modificado, version_coleccion, version_entidad
 
 personajes_bp = Blueprint("personajes_bp", __name__)
 
@@ -31,47 +42,76 @@ def safe_inventario(value):
     return value if isinstance(value, list) else []
 
 
+# Mismas claves en el listado, el detalle y la exportación
+serializar_personaje = compilar(Personaje, transformar={"inventario": safe_inventario})
+
+
 # ============================================================
 # GET /personajes
+# ?item=Linterna (repetible): personajes que llevan todos esos items
+# (inventario @> [...], índice GIN)
 # ============================================================
 @personajes_bp.route("/", methods=["GET"])
 @jwt_required()
 def get_personajes():
-    iduser = int(get_jwt_identity())
+    iduser = current_user.iduser
+
+    if "item" in request.args and db.engine.dialect.name != "postgresql":
+        return json_error("El filtro por item requiere PostgreSQL", code=501)
 
     try:
-        personajes = Personaje.query.filter_by(iduser=iduser).all()
-
-        data = []
-        for p in personajes:
-            data.append({
-                "idpersonaje": p.idpersonaje,
-                "cronica": p.cronica,
-                "juego": p.juego,
-                "nombre": p.nombre,
-                "apellido": p.apellido,
-                "genero": p.genero,
-                "edad": p.edad,
-                "ocupacion": p.ocupacion,
-                "etnia": p.etnia,
-                "descripcion": p.descripcion,
-                "historia": p.historia,
-                "inventario": safe_inventario(p.inventario),
-                "notas": p.notas
-            })
-
-        return jsonify(data)  # <-- enviar directamente la lista
+        items = leer_valores(request.args, "item")
+
+        etag = version_coleccion(Personaje, iduser, request.query_string)
+        respuesta = no_modificado(etag, None)
+        if respuesta:
+            return respuesta
+
+        def construir():
+            query = Personaje.query.filter_by(iduser=iduser)
+            if items:
+                query = query.filter(Personaje.inventario.contains(items))
+            return jsonify(serializar_filas(query, serializar_personaje))  # <-- enviar directamente la lista
+
+        return con_validadores(respuesta_cacheada("personajes", iduser, etag, construir), etag, None)
+
+    except ParametroInvalido as e:
+        return json_error("Parámetros inválidos", e, 400)
 
     except Exception as e:
         return jsonify({"error": f"Error al obtener personajes: {str(e)}"}), 500
 
+# ============================================================
+# GET /personajes/export?formato=ndjson|csv
+# ============================================================
+@personajes_bp.route("/export", methods=["GET"])
+@jwt_required()
+def export_personajes():
+    iduser = current_user.iduser
+
+    query = (
+        Personaje.query.filter_by(iduser=iduser)
+        .with_entities(*serializar_personaje.atributos)
+        .order_by(Personaje.idpersonaje)
+    )
+
+    try:
+        return respuesta_exportacion(
+            query, serializar_personaje, serializar_personaje.columnas, f"personajes_{iduser}",
+            request.args.get("formato", "ndjson")
+        )
+
+    except ValueError as e:
+        return json_error("Parámetros inválidos", e, 400)
+
+
 # ============================================================
 # POST /personajes
 # ============================================================
 @personajes_bp.route("/", methods=["POST"])
 @jwt_required()
 def create_personaje():
-    iduser = int(get_jwt_identity())
+    iduser = current_user.iduser
     data = request.get_json()
 
     if not data:
@@ -96,6 +136,8 @@ def create_personaje():
 
         db.session.add(nuevo)
         db.session.commit()
+        invalidar("personajes", iduser)
+        publicar(iduser, "personaje", [("create", nuevo.idpersonaje)])
 
         return json_ok("Personaje creado", {"idpersonaje": nuevo.idpersonaje}, 201)
 
@@ -110,7 +152,7 @@ def create_personaje():
 @personajes_bp.route("/<int:idpersonaje>", methods=["PUT"])
 @jwt_required()
 def update_personaje(idpersonaje):
-    iduser = int(get_jwt_identity())
+    iduser = current_user.iduser
     data = request.get_json()
 
     if not data:
@@ -135,6 +177,8 @@ def update_personaje(idpersonaje):
             personaje.inventario = safe_inventario(data["inventario"])
 
         db.session.commit()
+        invalidar("personajes", iduser)
+        publicar(iduser, "personaje", [("update", idpersonaje)])
 
         return json_ok("Personaje actualizado")
 
@@ -143,37 +187,205 @@ def update_personaje(idpersonaje):
         return json_error("Error al actualizar personaje", e, 500)
 
 
+# ============================================================
+# POST /personajes/batch
+# ============================================================
+CAMPOS_PERSONAJE = [
+    "cronica", "juego", "nombre", "apellido", "genero", "edad",
+    "ocupacion", "etnia", "descripcion", "historia", "notas"
+]
+
+
+def preparar_personaje(datos, nuevo):
+    fila = {campo: datos[campo] for campo in CAMPOS_PERSONAJE if campo in datos}
+
+    for campo in ["nombre", "apellido"]:
+        if (nuevo or campo in fila) and not fila.get(campo):
+            raise ValueError(f"Falta el campo {campo}")
+
+    edad = fila.get("edad")
+    if edad is not None and (not isinstance(edad, int) or isinstance(edad, bool)):
+        raise ValueError("edad debe ser un entero")
+
+    if nuevo or "inventario" in datos:
+        fila["inventario"] = safe_inventario(datos.get("inventario"))
+
+    return fila
+
+
+@personajes_bp.route("/batch", methods=["POST"])
+@jwt_required()
+def batch_personajes():
+    iduser = current_user.iduser
+    data = request.get_json()
+
+    if not data:
+        return json_error("Debe enviar JSON", code=400)
+
+    try:
+        operaciones = leer_operaciones(data)
+        resultados = aplicar_lote(Personaje, iduser, operaciones, preparar_personaje)
+        invalidar("personajes", iduser)
+        publicar_lote(iduser, "personaje", resultados, "idpersonaje")
+
+        return json_ok("Lote aplicado", resultados)
+
+    except LoteInvalido as e:
+        return jsonify({"msg": str(e), "data": e.resultados}), 400
+
+    except Exception as e:
+        db.session.rollback()
+        return json_error("Error al aplicar lote", e, 500)
+
+
+# ============================================================
+# PATCH /personajes/<id>/inventario
+# Cambios puntuales al estilo JSON Patch, aplicados en SQL sobre el JSONB
+# (función inventario_aplicar, migración 9b41e6f0d2c3):
+#
+#   {"version": 4, "operaciones": [
+#       {"op": "add", "value": "Linterna"},               # al final ("path": "/-")
+#       {"op": "add", "path": "/0", "value": "Mapa"},     # en una posición
+#       {"op": "remove", "path": "/3"},                   # por posición
+#       {"op": "remove", "value": "Soga"},                # primera aparición
+#       {"op": "move", "from": "/1", "path": "/0"}
+#   ]}
+#
+# Con "version" solo se aplica si el inventario no cambió desde esa versión
+# (409 si cambió). Sin ella se aplica sobre el inventario actual: seguro para
+# agregar al final o quitar por valor, no para operaciones por posición.
+# ============================================================
+MAX_OPERACIONES_INVENTARIO = 100
+RUTA_INDICE = re.compile(r"^/(0|[1-9][0-9]*)$")
+
+
+def leer_operaciones_inventario(data):
+    operaciones = data.get("operaciones")
+    if not isinstance(operaciones, list) or not operaciones:
+        raise ValueError("Debe enviar una lista 'operaciones' no vacía")
+    if len(operaciones) > MAX_OPERACIONES_INVENTARIO:
+        raise ValueError(f"Máximo {MAX_OPERACIONES_INVENTARIO} operaciones")
+
+    for i, o in enumerate(operaciones):
+        if not isinstance(o, dict):
+            raise ValueError(f"Operación {i}: debe ser un objeto")
+
+        op, ruta = o.get("op"), o.get("path")
+        if op == "add":
+            if "value" not in o:
+                raise ValueError(f"Operación {i}: falta value")
+            if ruta is not None and ruta != "/-" and not RUTA_INDICE.match(str(ruta)):
+                raise ValueError(f"Operación {i}: path inválido")
+        elif op == "remove":
+            if ruta is None and "value" not in o:
+                raise ValueError(f"Operación {i}: falta path o value")
+            if ruta is not None and not RUTA_INDICE.match(str(ruta)):
+                raise ValueError(f"Operación {i}: path inválido")
+        elif op == "move":
+            if not (RUTA_INDICE.match(str(o.get("from"))) and RUTA_INDICE.match(str(ruta))):
+                raise ValueError(f"Operación {i}: from y path deben ser /<índice>")
+        else:
+            raise ValueError(f"Operación {i}: op debe ser add, remove o move")
+
+    version = data.get("version")
+    if version is not None and (not isinstance(version, int) or isinstance(version, bool)):
+        raise ValueError("version debe ser un entero")
+
+    return operaciones, version
+
+
+@personajes_bp.route("/<int:idpersonaje>/inventario", methods=["PATCH"])
+@jwt_required()
+def patch_inventario(idpersonaje):
+    iduser = current_user.iduser
+    data = request.get_json(silent=True)
+
+    if not isinstance(data, dict):
+        return json_error("Debe enviar JSON", code=400)
+
+    if db.engine.dialect.name != "postgresql":
+        return json_error("PATCH de inventario requiere PostgreSQL", code=501)
+
+    try:
+        operaciones, version = leer_operaciones_inventario(data)
+    except ValueError as e:
+        return json_error("Operaciones inválidas", e, 400)
+
+    try:
+        # Un solo UPDATE: el trigger sube version_inventario y la fila queda
+        # bloqueada solo lo que dura la sentencia
+        condiciones = [Personaje.idpersonaje == idpersonaje, Personaje.iduser == iduser]
+        if version is not None:
+            condiciones.append(Personaje.version_inventario == version)
+
+        fila = db.session.execute(
+            update(Personaje)
+            .where(*condiciones)
+            .values(inventario=func.inventario_aplicar(
+                Personaje.inventario, bindparam("operaciones", operaciones, type_=JSONB)
+            ))
+            .returning(Personaje.inventario, Personaje.version_inventario)
+        ).first()
+
+        if fila is None:
+            actual = db.session.query(Personaje.version_inventario).filter_by(
+                idpersonaje=idpersonaje, iduser=iduser
+            ).scalar()
+            db.session.rollback()
+
+            if actual is None:
+                return json_error("Personaje no encontrado", code=404)
+            return jsonify({
+                "msg": "El inventario cambió desde esa versión",
+                "version_inventario": actual
+            }), 409
+
+        db.session.commit()
+        invalidar("personajes", iduser)
+        publicar(iduser, "personaje", [("update", idpersonaje)])
+
+        return json_ok("Inventario actualizado", {
+            "inventario": fila.inventario,
+            "version_inventario": fila.version_inventario
+        })
+
+    except DBAPIError as e:
+        db.session.rollback()
+        # inventario_aplicar avisa índices fuera de rango con invalid_parameter_value
+        if getattr(e.orig, "pgcode", None) == "22023":
+            return json_error("Operaciones inválidas", e.orig.diag.message_primary, 400)
+        return json_error("Error al actualizar inventario", e, 500)
+
+    except Exception as e:
+        db.session.rollback()
+        return json_error("Error al actualizar inventario", e, 500)
+
+
 # ============================================================
 # GET /personajes/<id>
 # ============================================================
 @personajes_bp.route("/<int:idpersonaje>", methods=["GET"])
 @jwt_required()
 def get_personaje(idpersonaje):
-    iduser = int(get_jwt_identity())
+    iduser = current_user.iduser
 
     try:
+        version = version_entidad(Personaje, iduser, idpersonaje)
+        if not version:
+            return json_error("Personaje no encontrado", code=404)
+
+        respuesta = no_modificado(*version)
+        if respuesta:
+            return respuesta
+
         p = Personaje.query.filter_by(idpersonaje=idpersonaje, iduser=iduser).first()
 
         if not p:
             return json_error("Personaje no encontrado", code=404)
 
-        data = {
-            "idpersonaje": p.idpersonaje,
-            "cronica": p.cronica,
-            "juego": p.juego,
-            "nombre": p.nombre,
-            "apellido": p.apellido,
-            "genero": p.genero,
-            "edad": p.edad,
-            "ocupacion": p.ocupacion,
-            "etnia": p.etnia,
-            "descripcion": p.descripcion,
-            "historia": p.historia,
-            "inventario": safe_inventario(p.inventario),
-            "notas": p.notas
-        }
-
-        return json_ok(data=data)
+        data = serializar_personaje(p)
+
+        return con_validadores(json_ok(data=data), *version)
 
     except Exception as e:
         return json_error("Error al obtener personaje", e, 500)
@@ -185,7 +397,7 @@ def get_personaje(idpersonaje):
 @personajes_bp.route("/<int:idpersonaje>", methods=["DELETE"])
 @jwt_required()
 def delete_personaje(idpersonaje):
-    iduser = int(get_jwt_identity())
+    iduser = current_user.iduser
 
     try:
         personaje = Personaje.query.filter_by(idpersonaje=idpersonaje, iduser=iduser).first()
@@ -195,6 +407,8 @@ def delete_personaje(idpersonaje):
 
         db.session.delete(personaje)
         db.session.commit()
+        invalidar("personajes", iduser)
+        publicar(iduser, "personaje", [("delete", idpersonaje)])
 
         return json_ok("Personaje eliminado")
 
@@ -208,61 +422,55 @@ def delete_personaje(idpersonaje):
 @personajes_bp.route("/<int:idpersonaje>/pdf", methods=["GET"])
 @jwt_required()
 def get_personaje_pdf(idpersonaje):
-    iduser = int(get_jwt_identity())
+    iduser = current_user.iduser
 
     try:
-        personaje = Personaje.query.filter_by(idpersonaje=idpersonaje, iduser=iduser).first()
-
-        if not personaje:
+        version = version_entidad(Personaje, iduser, idpersonaje, "pdf", VERSION_RENDER)
+        if not version:
             return json_error("Personaje no encontrado", code=404)
 
-        buffer = BytesIO()
-        pdf = canvas.Canvas(buffer, pagesize=letter)
+        respuesta = no_modificado(*version)
+        if respuesta:
+            return respuesta
 
-        y = 750
+        personaje = Personaje.query.filter_by(idpersonaje=idpersonaje, iduser=iduser).first()
 
-        def write(text, offset=20):
-            nonlocal y
-            pdf.drawString(100, y, str(text))
-            y -= offset
+        if not personaje:
+            return json_error("Personaje no encontrado", code=404)
 
-        pdf.setFont("Helvetica-Bold", 14)
-        write(f"{personaje.nombre} {personaje.apellido}", 30)
+        # Si no cambió desde la última descarga se sirve el archivo cacheado;
+        # si no está, se encola y se responde 202 con el trabajo
+        clave, archivo = obtener_pdf("personaje", iduser, idpersonaje, datos_personaje_pdf(personaje))
+        if archivo is None:
+            return respuesta_trabajo(clave)
 
-        pdf.setFont("Helvetica", 11)
-        write(f"Cronica: {personaje.cronica or 'N/A'}")
-        write(f"Juego: {personaje.juego or 'N/A'}")
-        write(f"Género: {personaje.genero or 'N/A'}")
-        write(f"Edad: {personaje.edad or 'N/A'}")
-        write(f"Ocupación: {personaje.ocupacion or 'N/A'}")
-        write(f"Etnia: {personaje.etnia or 'N/A'}")
+        return con_validadores(send_file(
+            archivo,
+            as_attachment=True,
+            download_name=f"{personaje.nombre}_{personaje.apellido}.pdf",
+            mimetype="application/pdf"
+        ), *version)
 
-        write("Descripción:", 25)
-        for line in (personaje.descripcion or "N/A").split("\n"):
-            write(line, 15)
+    except Exception as e:
+        return json_error("Error generando PDF", e, 500)
 
-        write("Historia:", 25)
-        for line in (personaje.historia or "N/A").split("\n"):
-            write(line, 15)
 
-        write("Inventario:", 25)
-        for item in safe_inventario(personaje.inventario):
-            write(f"- {item}", 15)
+# ============================================================
+# POST /personajes/<id>/pdf/job  (render en segundo plano)
+# ============================================================
+@personajes_bp.route("/<int:idpersonaje>/pdf/job", methods=["POST"])
+@jwt_required()
+def create_personaje_pdf_job(idpersonaje):
+    iduser = current_user.iduser
 
-        write("Notas:", 25)
-        for line in (personaje.notas or "N/A").split("\n"):
-            write(line, 15)
+    try:
+        personaje = Personaje.query.filter_by(idpersonaje=idpersonaje, iduser=iduser).first()
 
-        pdf.save()
-        buffer.seek(0)
+        if not personaje:
+            return json_error("Personaje no encontrado", code=404)
 
-        return send_file(
-            buffer,
-            as_attachment=True,
-            download_name=f"{personaje.nombre}_{personaje.apellido}.pdf",
-            mimetype="application/pdf"
-        )
+        clave = encolar("personaje", iduser, idpersonaje, datos_personaje_pdf(personaje))
+        return respuesta_trabajo(clave)
 
     except Exception as e:
-        return json_error("Error generando PDF", e, 500)
-
+        return json_error("Error al encolar PDF", e, 500)
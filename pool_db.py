@@ -0,0 +1,199 @@
+# pool_db.py
+# Opciones del engine de SQLAlchemy (pool, timeouts, modo PgBouncer) y
+# métricas de espera del pool, todo configurable por variables de entorno.
+#
+#   DB_POOL_SIZE=5              conexiones fijas por proceso
+#   DB_MAX_OVERFLOW=10          conexiones extra en picos
+#   DB_POOL_TIMEOUT=10          segundos esperando una conexión libre
+#   DB_POOL_RECYCLE=1800        reabrir conexiones más viejas que esto
+#   DB_POOL_PRE_PING=1          validar la conexión antes de usarla
+#   DB_STATEMENT_TIMEOUT_MS=15000
+#   DB_IDLE_TX_TIMEOUT_MS=60000 (las migraciones corren sin estos dos timeouts)
+#   DB_PGBOUNCER=0              1 = detrás de PgBouncer en modo transaction
+#   DB_POOL_WARM=2              conexiones a abrir en segundo plano al arrancar un worker
+import os
+import threading
+import time
+
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeout
+from sqlalchemy.pool import NullPool, QueuePool
+
+# Límites superiores (segundos) del histograma de espera
+BUCKETS_ESPERA = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5)
+
+
+def _env_int(nombre, defecto):
+    return int(os.getenv(nombre, defecto))
+
+
+def _env_bool(nombre, defecto):
+    return os.getenv(nombre, defecto) not in ("0", "false", "False", "")
+
+
+class EstadisticasPool:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.espera_total = 0.0
+        self.espera_max = 0.0
+        self.buckets = [0] * (len(BUCKETS_ESPERA) + 1)
+
+    def registrar(self, espera, timeout=False):
+        with self._lock:
+            self.checkouts += 1
+            self.timeouts += timeout
+            self.espera_total += espera
+            self.espera_max = max(self.espera_max, espera)
+            for i, limite in enumerate(BUCKETS_ESPERA):
+                if espera <= limite:
+                    self.buckets[i] += 1
+                    break
+            else:
+                self.buckets[-1] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "espera_total_s": round(self.espera_total, 6),
+                "espera_promedio_ms": round(self.espera_total / self.checkouts * 1000, 3) if self.checkouts else 0,
+                "espera_max_ms": round(self.espera_max * 1000, 3),
+                "histograma": dict(zip([f"<={b}s" for b in BUCKETS_ESPERA] + ["+Inf"], self.buckets)),
+            }
+
+
+estadisticas_pool = EstadisticasPool()
+
+
+class PoolMedido(QueuePool):
+    """QueuePool que mide cuánto espera cada checkout.
+
+    Espera alta con consultas rápidas = pool chico (starvation);
+    espera baja con requests lentos = el problema está en las consultas.
+    """
+
+    def _do_get(self):
+        inicio = time.perf_counter()
+        try:
+            conexion = super()._do_get()
+        except PoolTimeout:
+            estadisticas_pool.registrar(time.perf_counter() - inicio, timeout=True)
+            raise
+        estadisticas_pool.registrar(time.perf_counter() - inicio)
+        return conexion
+
+
+def opciones_engine(url):
+    """SQLALCHEMY_ENGINE_OPTIONS según la URL y el entorno."""
+    if not url.startswith(("postgresql", "postgres")):
+        return {}
+
+    statement_timeout = _env_int("DB_STATEMENT_TIMEOUT_MS", 15000)
+    idle_tx_timeout = _env_int("DB_IDLE_TX_TIMEOUT_MS", 60000)
+
+    connect_args = {
+        "connect_timeout": _env_int("DB_CONNECT_TIMEOUT", 5),
+        # keepalives TCP: detectar antes las conexiones que el proveedor corta
+        "keepalives": 1,
+        "keepalives_idle": 30,
+        "keepalives_interval": 10,
+        "keepalives_count": 3,
+    }
+
+    if _env_bool("DB_PGBOUNCER", "0"):
+        # PgBouncer ya hace el pooling y no acepta parámetros de arranque
+        # (-c ...); los timeouts se aplican con SET LOCAL en cada transacción
+        return {"poolclass": NullPool, "connect_args": connect_args}
+
+    connect_args["options"] = (
+        f"-c statement_timeout={statement_timeout} "
+        f"-c idle_in_transaction_session_timeout={idle_tx_timeout}"
+    )
+    return {
+        "poolclass": PoolMedido,
+        "pool_size": _env_int("DB_POOL_SIZE", 5),
+        "max_overflow": _env_int("DB_MAX_OVERFLOW", 10),
+        "pool_timeout": _env_int("DB_POOL_TIMEOUT", 10),
+        "pool_recycle": _env_int("DB_POOL_RECYCLE", 1800),
+        "pool_pre_ping": _env_bool("DB_POOL_PRE_PING", "1"),
+        "pool_use_lifo": True,   # reusar las conexiones calientes; las sobrantes quedan ociosas y se reciclan
+        "connect_args": connect_args,
+    }
+
+
+def configurar_engine(engine):
+    """Listeners que dependen del modo; llamar una vez creado el engine."""
+    if engine.dialect.name != "postgresql" or not _env_bool("DB_PGBOUNCER", "0"):
+        return
+
+    statement_timeout = _env_int("DB_STATEMENT_TIMEOUT_MS", 15000)
+    idle_tx_timeout = _env_int("DB_IDLE_TX_TIMEOUT_MS", 60000)
+
+    @event.listens_for(engine, "begin")
+    def timeouts_por_transaccion(conn):
+        if conn.info.get("sin_timeouts"):
+            return
+        conn.exec_driver_sql(
+            f"SET LOCAL statement_timeout = {statement_timeout}; "
+            f"SET LOCAL idle_in_transaction_session_timeout = {idle_tx_timeout}"
+        )
+
+
+def sin_timeouts(conexion):
+    """Quita statement_timeout / idle_in_transaction a una conexión de migraciones.
+
+    Los límites son para los requests; un backfill, un ALTER TYPE o un CREATE
+    INDEX CONCURRENTLY sobre una tabla grande tardan más y se abortarían.
+    """
+    if conexion.dialect.name != "postgresql":
+        return
+    # Que timeouts_por_transaccion (modo PgBouncer) no los vuelva a poner
+    conexion.info["sin_timeouts"] = True
+    if not _env_bool("DB_PGBOUNCER", "0"):
+        conexion.exec_driver_sql("SET statement_timeout = 0")
+        conexion.exec_driver_sql("SET idle_in_transaction_session_timeout = 0")
+        conexion.commit()
+
+
+def estado_pool(engine):
+    pool = engine.pool
+    datos = {"clase": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        datos.update({
+            "size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            "overflow": pool.overflow(),
+        })
+    datos.update(estadisticas_pool.snapshot())
+    return datos
+
+
+def calentar_pool(engine, conexiones=None):
+    """Abre conexiones en un hilo aparte para que el primer request no pague
+    el connect (TCP + TLS + auth). No bloquea el arranque; si falla, no pasa nada."""
+    if conexiones is None:
+        conexiones = _env_int("DB_POOL_WARM", 2)
+    if conexiones <= 0 or isinstance(engine.pool, NullPool):
+        return None
+
+    def calentar():
+        abiertas = []
+        try:
+            # Todas a la vez: así quedan `conexiones` distintas en el pool
+            for _ in range(conexiones):
+                conexion = engine.connect()
+                conexion.exec_driver_sql("SELECT 1")
+                abiertas.append(conexion)
+        except Exception:
+            pass
+        finally:
+            for conexion in abiertas:
+                conexion.close()
+
+    hilo = threading.Thread(target=calentar, name="calentar-pool", daemon=True)
+    hilo.start()
+    return hilo
@@ -0,0 +1,119 @@
+# scripts/explain_consultas.py
+# Corre EXPLAIN ANALYZE sobre las consultas que usa cada blueprint, para
+# detectar regresiones de plan (Seq Scan / Sort donde debería haber índice).
+#
+#   python -m scripts.explain_consultas               # usuario con más sesiones
+#   python -m scripts.explain_consultas --usuario 42
+#
+# Solo ejecuta SELECT; es seguro contra la base de producción.
+import argparse
+import sys
+
+from sqlalchemy import func, select, text, tuple_
+
+from app import create_app
+from extensions import db
+from models import Dashboard, Personaje, User
+
+# Nodos que en estas tablas indican que no se está usando un índice
+NODOS_SOSPECHOSOS = ("Seq Scan on dashboard", "Seq Scan on personajes", "Sort")
+
+
+def consultas(iduser):
+    sesion = db.session.execute(
+        select(Dashboard.idsesion, Dashboard.fecha)
+        .where(Dashboard.iduser == iduser)
+        .order_by(Dashboard.fecha.desc(), Dashboard.idsesion.desc())
+        .limit(1)
+    ).first()
+    idpersonaje = db.session.execute(
+        select(Personaje.idpersonaje).where(Personaje.iduser == iduser).limit(1)
+    ).scalar()
+    cronica = db.session.execute(
+        select(Dashboard.cronica).where(Dashboard.iduser == iduser).limit(1)
+    ).scalar()
+
+    yield "login: usuario por username", select(User).where(
+        User.username == select(User.username).where(User.iduser == iduser).scalar_subquery()
+    )
+
+    yield "dashboard: listado completo", select(Dashboard).where(
+        Dashboard.iduser == iduser
+    ).order_by(Dashboard.fecha.desc())
+
+    yield "dashboard: primera página", select(
+        Dashboard.idsesion, Dashboard.fecha, Dashboard.cronica
+    ).where(Dashboard.iduser == iduser).order_by(
+        Dashboard.fecha.desc(), Dashboard.idsesion.desc()
+    ).limit(51)
+
+    if sesion:
+        yield "dashboard: página siguiente (keyset)", select(
+            Dashboard.idsesion, Dashboard.fecha, Dashboard.cronica
+        ).where(
+            Dashboard.iduser == iduser,
+            tuple_(Dashboard.fecha, Dashboard.idsesion) < (sesion.fecha, sesion.idsesion),
+        ).order_by(Dashboard.fecha.desc(), Dashboard.idsesion.desc()).limit(51)
+
+        yield "dashboard: detalle", select(Dashboard).where(
+            Dashboard.idsesion == sesion.idsesion, Dashboard.iduser == iduser
+        )
+
+    if cronica is not None:
+        yield "dashboard: sesiones de una crónica", select(Dashboard).where(
+            Dashboard.iduser == iduser, Dashboard.cronica == cronica
+        )
+        yield "personajes: personajes de una crónica", select(Personaje).where(
+            Personaje.iduser == iduser, Personaje.cronica == cronica
+        )
+
+    yield "personajes: listado", select(Personaje).where(Personaje.iduser == iduser)
+
+    if idpersonaje:
+        yield "personajes: detalle", select(Personaje).where(
+            Personaje.idpersonaje == idpersonaje, Personaje.iduser == iduser
+        )
+
+
+def explain(stmt):
+    sql = stmt.compile(dialect=db.engine.dialect, compile_kwargs={"literal_binds": True})
+    filas = db.session.execute(text(f"EXPLAIN (ANALYZE, BUFFERS) {sql}"))
+    return [f[0] for f in filas]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="EXPLAIN ANALYZE de las consultas de cada blueprint")
+    parser.add_argument("--usuario", type=int, help="iduser a analizar")
+    args = parser.parse_args(argv)
+
+    with create_app().app_context():
+        if db.engine.dialect.name != "postgresql":
+            print("EXPLAIN ANALYZE solo está soportado contra PostgreSQL", file=sys.stderr)
+            return 1
+
+        iduser = args.usuario or db.session.execute(
+            select(Dashboard.iduser).group_by(Dashboard.iduser)
+            .order_by(func.count().desc()).limit(1)
+        ).scalar()
+        if iduser is None:
+            print("No hay sesiones cargadas", file=sys.stderr)
+            return 1
+
+        print(f"# iduser={iduser}\n")
+        alertas = 0
+        for nombre, stmt in consultas(iduser):
+            plan = explain(stmt)
+            sospechosos = [l for l in plan if any(n in l for n in NODOS_SOSPECHOSOS)]
+            alertas += bool(sospechosos)
+
+            print(f"== {nombre} {'⚠️' if sospechosos else '✅'}")
+            print("\n".join(plan))
+            print()
+
+        db.session.rollback()
+
+    return 1 if alertas else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
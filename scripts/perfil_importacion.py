@@ -0,0 +1,98 @@
+# scripts/perfil_importacion.py
+# Cuánto cuesta arrancar: corre `python -X importtime` en un intérprete limpio,
+# agrupa por paquete y mide el tiempo hasta que /health responde.
+#
+#   python -m scripts.perfil_importacion                 # wsgi (como gunicorn)
+#   python -m scripts.perfil_importacion --modulo app --top 40
+#   ARRANQUE_RAPIDO=0 python -m scripts.perfil_importacion   # comparar sin el modo rápido
+#
+# No abre conexiones a la base: create_app no conecta hasta el primer request.
+import argparse
+import os
+import subprocess
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MEDIR_HEALTH = """
+import time
+inicio = time.perf_counter()
+import wsgi
+importado = time.perf_counter()
+respuesta = wsgi.app.test_client().get("/health")
+fin = time.perf_counter()
+assert respuesta.status_code == 200, respuesta.status_code
+print(f"{(importado - inicio) * 1000:.1f} {(fin - inicio) * 1000:.1f}")
+"""
+
+
+def importtime(modulo):
+    """[(modulo, propio_us, acumulado_us, profundidad)] en orden de importación."""
+    salida = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {modulo}"],
+        cwd=RAIZ, capture_output=True, text=True,
+    )
+    if salida.returncode != 0:
+        raise SystemExit(salida.stderr[-2000:])
+
+    filas = []
+    for linea in salida.stderr.splitlines():
+        if not linea.startswith("import time:") or "self [us]" in linea:
+            continue
+        propio, acumulado, nombre = linea.split(":", 1)[1].split("|")
+        profundidad = (len(nombre) - len(nombre.lstrip())) // 2
+        filas.append((nombre.strip(), int(propio), int(acumulado), profundidad))
+    return filas
+
+
+def tiempo_health(repeticiones):
+    mejores = None
+    for _ in range(repeticiones):
+        salida = subprocess.run([sys.executable, "-c", MEDIR_HEALTH], cwd=RAIZ,
+                                capture_output=True, text=True)
+        if salida.returncode != 0:
+            raise SystemExit(salida.stderr[-2000:])
+        importado, total = map(float, salida.stdout.split())
+        if mejores is None or total < mejores[1]:
+            mejores = (importado, total)
+    return mejores
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Perfil de tiempos de importación y arranque")
+    parser.add_argument("--modulo", default="wsgi")
+    parser.add_argument("--top", type=int, default=25)
+    parser.add_argument("--repeticiones", type=int, default=3, help="corridas para medir /health")
+    args = parser.parse_args(argv)
+
+    filas = importtime(args.modulo)
+    total = max(acumulado for _, _, acumulado, _ in filas)
+
+    # Costo propio agrupado por paquete de primer nivel
+    por_paquete = {}
+    for nombre, propio, _, _ in filas:
+        paquete = nombre.split(".")[0]
+        por_paquete[paquete] = por_paquete.get(paquete, 0) + propio
+
+    print(f"import {args.modulo}: {total / 1000:.1f} ms ({len(filas)} módulos)\n")
+    print("Por paquete (tiempo propio):")
+    for paquete, us in sorted(por_paquete.items(), key=lambda p: p[1], reverse=True)[:args.top]:
+        print(f"  {paquete:<32} {us / 1000:8.1f} ms  {us / total * 100:5.1f}%")
+
+    print("\nMódulos del proyecto (acumulado, incluye lo que importan):")
+    propios = {os.path.splitext(n)[0] for n in os.listdir(RAIZ) if n.endswith(".py")}
+    for nombre, _, acumulado, _ in sorted(filas, key=lambda f: f[2], reverse=True):
+        if nombre.split(".")[0] in propios:
+            print(f"  {nombre:<32} {acumulado / 1000:8.1f} ms")
+
+    pesados = [p for p in ("reportlab", "alembic") if p in por_paquete]
+    if pesados:
+        print(f"\nAviso: se importan al arrancar: {', '.join(pesados)}")
+
+    importado, health = tiempo_health(args.repeticiones)
+    print(f"\nArranque hasta /health 200: {health:.1f} ms (import {importado:.1f} ms), "
+          f"mejor de {args.repeticiones}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+# serializadores.py
+# Serialización de filas a dict y proveedor JSON rápido.
+#
+# Los serializadores se arman una sola vez a partir de las columnas del modelo:
+# se genera una función con un literal de dict ({"idsesion": o.idsesion, ...})
+# que sirve igual para instancias del ORM y para Rows de un select de columnas.
+#
+#   JSON_PROVIDER=auto     orjson si está instalado, si no el de Flask (stdlib)
+#   JSON_PROVIDER=stdlib   siempre el de Flask
+import os
+
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import inspect
+
+# Columnas que nunca salen en la API: dueño, índice full-text y marca interna
+EXCLUIDAS = ("iduser", "busqueda", "updated_at")
+
+
+# ============================================================
+# Serializadores por modelo
+# ============================================================
+
+def compilar(modelo, excluir=(), transformar=None):
+    """Función fila -> dict con las columnas de `modelo` en orden de declaración.
+
+    `transformar` = {columna: función} para los valores que no salen tal cual
+    (fechas a texto, listas NULL a []). La función lleva en `.atributos` las
+    columnas que lee, para consultarlas sin cargar instancias (ver `serializar_filas`).
+    """
+    transformar = transformar or {}
+    excluir = EXCLUIDAS + tuple(excluir)
+    atributos = [a for a in inspect(modelo).column_attrs if a.key not in excluir]
+    columnas = [a.key for a in atributos]
+
+    desconocidas = set(transformar) - set(columnas)
+    if desconocidas:
+        raise ValueError(f"{modelo.__name__}: columnas desconocidas {sorted(desconocidas)}")
+
+    entorno = {f"_t_{c}": f for c, f in transformar.items()}
+    campos = ", ".join(
+        f"{c!r}: _t_{c}(o.{c})" if c in transformar else f"{c!r}: o.{c}"
+        for c in columnas
+    )
+    nombre = f"serializar_{modelo.__tablename__}"
+    exec(f"def {nombre}(o):\n    return {{{campos}}}\n", entorno)
+
+    funcion = entorno[nombre]
+    funcion.columnas = columnas
+    funcion.atributos = tuple(a.class_attribute for a in atributos)
+    return funcion
+
+
+def serializar_filas(query, serializar):
+    """Lista de dicts leyendo solo las columnas del serializador.
+
+    Las Rows de un select de columnas cuestan mucho menos que instancias del
+    ORM (sin identity map ni estado); para listados grandes es la mayor parte
+    del tiempo del endpoint.
+    """
+    return [serializar(fila) for fila in query.with_entities(*serializar.atributos)]
+
+
+def lista(valor):
+    """Listas JSON: NULL o un valor viejo que no es lista salen como []."""
+    return valor if isinstance(valor, list) else []
+
+
+def fecha_iso(valor):
+    return valor.isoformat()
+
+
+# ============================================================
+# Proveedor JSON
+# ============================================================
+
+class ProveedorOrjson(DefaultJSONProvider):
+    """Mismo contrato que el proveedor por defecto de Flask, serializando con orjson.
+
+    Mantiene sort_keys, el formato de fechas y la línea final de jsonify: el
+    JSON es el mismo, cambian solo espacios y que los acentos van en UTF-8 en
+    vez de escapes \\uXXXX.
+    """
+
+    def __init__(self, app):
+        super().__init__(app)
+        import orjson
+
+        self._orjson = orjson
+
+    def _opciones(self, indentar=False):
+        # Fechas por `default`: Flask las escribe como fecha HTTP, orjson como ISO
+        opciones = self._orjson.OPT_NON_STR_KEYS | self._orjson.OPT_PASSTHROUGH_DATETIME
+        if self.sort_keys:
+            opciones |= self._orjson.OPT_SORT_KEYS
+        if indentar:
+            opciones |= self._orjson.OPT_INDENT_2
+        return opciones
+
+    def _bytes(self, obj, indentar=False):
+        # `default` cubre lo que orjson no conoce (Decimal, __html__, fechas):
+        # lo resuelve la implementación de Flask
+        return self._orjson.dumps(obj, default=self.default, option=self._opciones(indentar))
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            # Argumentos propios de json.dumps (cls, separators...): stdlib
+            return super().dumps(obj, **kwargs)
+        return self._bytes(obj).decode()
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return self._orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indentar = self.compact is False or (self.compact is None and self._app.debug)
+        return self._app.response_class(self._bytes(obj, indentar) + b"\n", mimetype=self.mimetype)
+
+
+def instalar_json(app):
+    """Registra el proveedor en app.json; devuelve el nombre del elegido."""
+    if os.getenv("JSON_PROVIDER", "auto") == "stdlib":
+        return "stdlib"
+    try:
+        app.json = ProveedorOrjson(app)
+    except ImportError:
+        return "stdlib"
+    return "orjson"
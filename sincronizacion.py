@@ -0,0 +1,97 @@
+# sincronizacion.py
+# GET /sync: sincronización incremental para clientes offline.
+#
+#   /sync                          primera vez: todo lo del usuario
+#   /sync?since=<token>&limit=500  solo lo creado, modificado o borrado después
+#
+#   {"sesiones": [...], "personajes": [...],
+#    "borrados": {"sesiones": [ids], "personajes": [ids]},
+#    "since": "<token para la próxima>", "has_more": false}
+#
+# Con has_more=true se vuelve a pedir enseguida con el nuevo `since`.
+#
+# Se apoya en la tabla `cambios` (migración f3a8c61d07b5): una fila por registro
+# con la versión de su último cambio, indexada por (iduser, version). Una
+# sincronización lee solo las filas posteriores al token, no la biblioteca entera.
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import current_user, jwt_required
+from sqlalchemy import select
+
+from extensions import db
+from dashboard import serializar_sesion
+from models import Cambio, Dashboard, Personaje, User
+from paginacion import ParametroInvalido, codificar_cursor, decodificar_cursor, leer_limite
+from personajes import serializar_personaje
+from serializadores import serializar_filas
+
+sync_bp = Blueprint("sync_bp", __name__)
+
+RECURSOS = {
+    "sesion": ("sesiones", Dashboard, Dashboard.idsesion, serializar_sesion),
+    "personaje": ("personajes", Personaje, Personaje.idpersonaje, serializar_personaje),
+}
+
+
+def leer_token(token):
+    if not token:
+        return 0
+    valores = decodificar_cursor(token)
+    try:
+        version = int(valores[0])
+    except (IndexError, TypeError, ValueError):
+        raise ParametroInvalido("Token de sincronización inválido")
+    if version < 0:
+        raise ParametroInvalido("Token de sincronización inválido")
+    return version
+
+
+@sync_bp.route("/", methods=["GET"])
+@jwt_required()
+def sync():
+    iduser = current_user.iduser
+
+    if db.engine.dialect.name != "postgresql":
+        return jsonify({"msg": "La sincronización requiere PostgreSQL"}), 501
+
+    try:
+        desde = leer_token(request.args.get("since"))
+        limite = leer_limite(request.args, defecto=500, maximo=1000)
+
+        # Se pide una fila de más para saber si quedan cambios
+        cambios = db.session.execute(
+            select(Cambio.recurso, Cambio.idregistro, Cambio.version, Cambio.borrado)
+            .where(Cambio.iduser == iduser, Cambio.version > desde)
+            .order_by(Cambio.version)
+            .limit(limite + 1)
+        ).all()
+
+        hay_mas = len(cambios) > limite
+        cambios = cambios[:limite]
+
+        if not cambios and desde:
+            # Un token más nuevo que la base (restauración, otra instancia):
+            # el cliente tiene que volver a bajar todo
+            actual = db.session.query(User.version_cambios).filter_by(iduser=iduser).scalar()
+            if desde > (actual or 0):
+                return jsonify({"msg": "Token de sincronización vencido, sincronizar sin since"}), 410
+
+        respuesta = {"borrados": {}}
+        for recurso, (clave, modelo, pk, serializar) in RECURSOS.items():
+            vivos = [c.idregistro for c in cambios if c.recurso == recurso and not c.borrado]
+            respuesta["borrados"][clave] = [c.idregistro for c in cambios if c.recurso == recurso and c.borrado]
+            respuesta[clave] = serializar_filas(
+                modelo.query.filter(modelo.iduser == iduser, pk.in_(vivos)).order_by(pk), serializar
+            ) if vivos else []
+
+        respuesta["since"] = codificar_cursor(cambios[-1].version if cambios else desde)
+        respuesta["has_more"] = hay_mas
+
+        response = jsonify(respuesta)
+        response.headers["Cache-Control"] = "private, no-store"
+        return response, 200
+
+    except ParametroInvalido as e:
+        return jsonify({"msg": "Parámetros inválidos", "error": str(e)}), 400
+
+    except Exception as e:
+        return jsonify({"msg": "Error al sincronizar", "error": str(e)}), 500
@@ -0,0 +1,31 @@
+# tests/conftest.py
+# App con SQLite temporal. Las variables se fijan antes de importar la app
+# porque varios módulos leen su configuración al importarse.
+import os
+import sys
+import tempfile
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/tests.db"
+os.environ["PASSWORD_SCRYPT_N"] = "1024"   # el costo del hash no es lo que se prueba
+os.environ.pop("RATE_LIMIT_URL", None)
+os.environ.pop("PROXY_HOPS", None)
+
+
+@pytest.fixture(scope="session")
+def app():
+    from app import create_app
+    from extensions import db
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+    return app
+
+
+@pytest.fixture
+def cliente(app):
+    return app.test_client()
@@ -0,0 +1,162 @@
+# tests/test_limites.py
+# Ráfagas contra /login y /users: el rate limiting tiene que cortar con 429 +
+# Retry-After sin llegar a la base (se cuentan las sentencias SQL).
+import pytest
+from sqlalchemy import event
+
+from extensions import db
+from limites import REGLAS, LimitadorMemoria, limitador
+
+N = 200
+
+
+@pytest.fixture
+def consultas(app):
+    contador = [0]
+
+    def contar(*args):
+        contador[0] += 1
+
+    with app.app_context():
+        motor = db.engine
+    event.listen(motor, "before_cursor_execute", contar)
+    yield contador
+    event.remove(motor, "before_cursor_execute", contar)
+
+
+@pytest.fixture(autouse=True)
+def buckets_vacios():
+    limitador._buckets.clear()
+
+
+@pytest.fixture(scope="module")
+def usuario_ana(app):
+    cliente = app.test_client()
+    r = cliente.post("/users/", json={"nombre": "Ana", "apellido": "Paz", "username": "ana",
+                                      "password": "secreta"},
+                     environ_base={"REMOTE_ADDR": "10.0.0.1"})
+    assert r.status_code in (201, 409)
+
+
+def rafaga(cliente, consultas, pedidos):
+    """(cuántos pasaron, SQL ejecutado en los rechazados, Retry-After vistos)."""
+    pasaron, sql_rechazados, retry_after = 0, 0, set()
+    for ruta, cuerpo, ip in pedidos:
+        antes = consultas[0]
+        r = cliente.post(ruta, json=cuerpo, environ_base={"REMOTE_ADDR": ip})
+        if r.status_code == 429:
+            sql_rechazados += consultas[0] - antes
+            retry_after.add(r.headers.get("Retry-After"))
+        else:
+            pasaron += 1
+    return pasaron, sql_rechazados, retry_after
+
+
+# ============================================================
+# Ráfagas
+# ============================================================
+
+def test_login_una_ip_usernames_distintos(cliente, consultas, usuario_ana):
+    # Stuffing desde una IP: corta el bucket de IP
+    pedidos = [("/login/", {"username": f"u{i}", "password": "x"}, "10.1.0.1") for i in range(N)]
+    pasaron, sql, retry_after = rafaga(cliente, consultas, pedidos)
+
+    assert pasaron == REGLAS["login_ip"][0]
+    assert sql == 0
+    assert None not in retry_after
+
+
+def test_login_muchas_ips_un_username(cliente, consultas, usuario_ana):
+    # Botnet contra una cuenta: corta el bucket del username
+    pedidos = [("/login/", {"username": "ana", "password": f"p{i}"}, f"10.2.{i // 250}.{i % 250}")
+               for i in range(N)]
+    pasaron, sql, retry_after = rafaga(cliente, consultas, pedidos)
+
+    assert pasaron == REGLAS["login_user"][0]
+    assert sql == 0
+    assert None not in retry_after
+
+
+def test_login_variantes_del_mismo_username(cliente, consultas, usuario_ana):
+    # Mayúsculas / espacios no abren buckets nuevos
+    pedidos = [("/login/", {"username": " ANA " if i % 2 else "Ana", "password": "x"}, f"10.3.0.{i % 250}")
+               for i in range(N)]
+    pasaron, sql, _ = rafaga(cliente, consultas, pedidos)
+
+    assert pasaron == REGLAS["login_user"][0]
+    assert sql == 0
+
+
+def test_users_altas_desde_una_ip(cliente, consultas):
+    pedidos = [("/users/", {"nombre": "B", "apellido": "C", "username": f"bot{i}", "password": "x"}, "10.4.0.1")
+               for i in range(N)]
+    pasaron, sql, retry_after = rafaga(cliente, consultas, pedidos)
+
+    assert pasaron == REGLAS["users_ip"][0]
+    assert sql == 0
+    assert None not in retry_after
+
+
+# ============================================================
+# IP detrás de proxies
+# ============================================================
+
+@pytest.fixture
+def cliente_detras_de_proxy(app, monkeypatch):
+    from app import create_app
+
+    monkeypatch.setenv("PROXY_HOPS", "1")
+    return create_app().test_client()
+
+
+def _login_desde(cliente, ip_real, pedidos, falsa=None):
+    # El proxy (10.9.9.9) agrega la IP real a la derecha; el cliente puede
+    # haber mandado cualquier cosa a la izquierda
+    reenviado = f"{falsa}, {ip_real}" if falsa else ip_real
+    pasaron = 0
+    for i in range(pedidos):
+        r = cliente.post("/login/", json={"username": f"{reenviado}-{i}", "password": "x"},
+                         headers={"X-Forwarded-For": reenviado},
+                         environ_base={"REMOTE_ADDR": "10.9.9.9"})
+        pasaron += r.status_code != 429
+    return pasaron
+
+
+def test_proxy_cada_cliente_tiene_su_bucket(cliente_detras_de_proxy):
+    capacidad = REGLAS["login_ip"][0]
+
+    assert _login_desde(cliente_detras_de_proxy, "203.0.113.1", capacidad + 5) == capacidad
+    # Mismo proxy, otro cliente: no comparte el bucket
+    assert _login_desde(cliente_detras_de_proxy, "203.0.113.2", capacidad + 5) == capacidad
+
+
+def test_proxy_ignora_x_forwarded_for_falsificado(cliente_detras_de_proxy):
+    capacidad = REGLAS["login_ip"][0]
+    pasaron = sum(
+        _login_desde(cliente_detras_de_proxy, "203.0.113.3", 1, falsa=f"198.51.100.{i}")
+        for i in range(capacidad + 5)
+    )
+    assert pasaron == capacidad
+
+
+def test_sin_proxy_configurado_no_se_lee_x_forwarded_for(cliente):
+    capacidad = REGLAS["login_ip"][0]
+    pasaron = sum(_login_desde(cliente, f"203.0.113.{i}", 1) for i in range(capacidad + 5))
+    assert pasaron == capacidad
+
+
+# ============================================================
+# Token bucket
+# ============================================================
+
+def test_bucket_se_recarga_con_el_tiempo(monkeypatch):
+    ahora = [1000.0]
+    monkeypatch.setattr("limites.time.monotonic", lambda: ahora[0])
+    bucket = LimitadorMemoria()
+
+    assert [bucket.tomar("login_ip:x", 2, 1.0)[0] for _ in range(3)] == [True, True, False]
+    assert bucket.tomar("login_ip:x", 2, 1.0) == (False, pytest.approx(1.0))
+
+    ahora[0] += 1.0
+    assert bucket.tomar("login_ip:x", 2, 1.0)[0]
+    assert not bucket.tomar("login_ip:x", 2, 1.0)[0]
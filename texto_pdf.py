@@ -0,0 +1,70 @@
+# texto_pdf.py
+# Partido de texto en líneas para los canvas de ReportLab.
+#
+# Las fuentes estándar no tienen kerning, así que el ancho de una línea es la
+# suma de los anchos de sus palabras más los espacios: se mide cada palabra una
+# sola vez (cacheada) y se acumula, en lugar de medir la línea entera por palabra.
+from functools import lru_cache
+
+
+@lru_cache(maxsize=16384)
+def ancho(texto, fuente, tamano):
+    # Import diferido (ver pdfs.py); con la caché se ejecuta una vez por palabra
+    from reportlab.pdfbase.pdfmetrics import stringWidth
+
+    return stringWidth(texto, fuente, tamano)
+
+
+def _partir_palabra(palabra, ancho_max, fuente, tamano):
+    """Corta una palabra más ancha que la línea en trozos que entren."""
+    trozos = []
+    actual, ancho_actual = "", 0.0
+
+    for letra in palabra:
+        w = ancho(letra, fuente, tamano)
+        if actual and ancho_actual + w >= ancho_max:
+            trozos.append(actual)
+            actual, ancho_actual = "", 0.0
+        actual += letra
+        ancho_actual += w
+
+    trozos.append(actual)
+    return trozos
+
+
+def envolver(texto, ancho_max, fuente="Helvetica", tamano=11):
+    """Devuelve las líneas de `texto` que entran en `ancho_max` puntos.
+
+    Respeta los saltos de línea del texto y no emite líneas vacías, igual que
+    el wrapping original del PDF de sesión.
+    """
+    espacio = ancho(" ", fuente, tamano)
+    lineas = []
+
+    for parrafo in (texto or "").split("\n"):
+        palabras = []
+        ancho_linea = 0.0
+
+        for palabra in parrafo.split():
+            w = ancho(palabra, fuente, tamano)
+
+            if w >= ancho_max:
+                if palabras:
+                    lineas.append(" ".join(palabras))
+                *completos, resto = _partir_palabra(palabra, ancho_max, fuente, tamano)
+                lineas.extend(completos)
+                palabras, ancho_linea = [resto], ancho(resto, fuente, tamano)
+                continue
+
+            nuevo = ancho_linea + espacio + w if palabras else w
+            if nuevo < ancho_max:
+                palabras.append(palabra)
+                ancho_linea = nuevo
+            else:
+                lineas.append(" ".join(palabras))
+                palabras, ancho_linea = [palabra], w
+
+        if palabras:
+            lineas.append(" ".join(palabras))
+
+    return lineas
@@ -0,0 +1,307 @@
+# trabajos_pdf.py
+# Render de PDFs en segundo plano (pool de procesos) con caché en disco.
+#
+# Cada artefacto se guarda como <tipo>_<iduser>_<id>_<hash>.pdf, donde el hash
+# cubre los datos que se imprimen. Mientras la sesión/personaje no cambie, la
+# misma clave apunta al mismo archivo y se sirve como estático. Las versiones
+# reemplazadas no se borran enseguida (otro worker puede estar por servirlas):
+# se barren RETENCION segundos después de que las reemplazó una nueva.
+#
+# El estado de los trabajos también vive en el directorio, al lado del PDF
+# (<clave>.pendiente / <clave>.error): con varios workers de gunicorn el poll de
+# GET /pdf/<clave> puede caer en un proceso distinto del que encoló.
+import hashlib
+import json
+import multiprocessing
+import os
+import re
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from flask import Blueprint, jsonify, send_file, url_for
+from flask_jwt_extended import current_user, jwt_required
+
+from metricas import registrar_render
+from pdfs import RENDERERS, VERSION_RENDER
+
+DIRECTORIO = os.getenv(
+    "PDF_CACHE_DIR", os.path.join(tempfile.gettempdir(), "nucleobitacora_pdf")
+)
+PROCESOS = int(os.getenv("PDF_WORKERS", "2"))
+# Un .pendiente más viejo que esto es de un worker que murió: se informa error
+# y el próximo POST lo vuelve a encolar
+VENCIMIENTO = int(os.getenv("PDF_JOB_TIMEOUT", "300"))
+RETENCION = int(os.getenv("PDF_SUPERSEDED_TTL", "3600"))
+
+CLAVE_RE = re.compile(r"^(sesion|personaje)_(\d+)_(\d+)_[0-9a-f]{16}$")
+
+_pool = None
+_trabajos = {}
+_lock = threading.Lock()
+
+trabajos_pdf_bp = Blueprint("trabajos_pdf_bp", __name__)
+
+
+# ============================================================
+# Caché en disco
+# ============================================================
+
+def clave_artefacto(tipo, iduser, ident, datos):
+    contenido = json.dumps([VERSION_RENDER, datos], sort_keys=True, default=str)
+    digest = hashlib.sha256(contenido.encode()).hexdigest()[:16]
+    return f"{tipo}_{iduser}_{ident}_{digest}"
+
+
+def ruta_artefacto(clave):
+    return os.path.join(DIRECTORIO, f"{clave}.pdf")
+
+
+def en_cache(clave):
+    return os.path.exists(ruta_artefacto(clave))
+
+
+def abrir_artefacto(clave):
+    """Archivo abierto del PDF, o None si no está en caché.
+
+    Se abre antes de responder: si después se barre la versión, el handle
+    sigue siendo válido y send_file no falla a mitad del request.
+    """
+    try:
+        return open(ruta_artefacto(clave), "rb")
+    except FileNotFoundError:
+        return None
+
+
+def guardar_artefacto(clave, contenido):
+    """Escribe atómicamente y barre las versiones reemplazadas de la entidad."""
+    os.makedirs(DIRECTORIO, exist_ok=True)
+
+    fd, temporal = tempfile.mkstemp(dir=DIRECTORIO, suffix=".tmp")
+    with os.fdopen(fd, "wb") as f:
+        f.write(contenido)
+    os.replace(temporal, ruta_artefacto(clave))
+
+    desmarcar(clave, "pendiente")
+    desmarcar(clave, "error")
+    barrer_versiones(clave)
+
+
+def barrer_versiones(clave):
+    """Borra los PDFs de la entidad reemplazados hace más de RETENCION segundos.
+
+    Una versión queda reemplazada cuando se escribe la siguiente, así que su
+    antigüedad se cuenta desde el mtime del PDF que la sigue. Las marcas de
+    otra versión que se esté renderizando quedan.
+    """
+    prefijo = clave.rsplit("_", 1)[0] + "_"
+    versiones = []
+    for nombre in os.listdir(DIRECTORIO):
+        if nombre.startswith(prefijo) and nombre.endswith(".pdf"):
+            try:
+                versiones.append((os.path.getmtime(os.path.join(DIRECTORIO, nombre)), nombre))
+            except FileNotFoundError:
+                pass
+    versiones.sort()
+
+    limite = time.time() - RETENCION
+    for (_, nombre), (reemplazada, _) in zip(versiones, versiones[1:]):
+        if reemplazada < limite and nombre != f"{clave}.pdf":
+            try:
+                os.remove(os.path.join(DIRECTORIO, nombre))
+            except FileNotFoundError:
+                pass
+
+
+def ruta_marca(clave, estado):
+    return os.path.join(DIRECTORIO, f"{clave}.{estado}")
+
+
+def marcar(clave, estado, texto=""):
+    """Deja <clave>.pendiente o <clave>.error (con el mensaje) y borra la otra."""
+    os.makedirs(DIRECTORIO, exist_ok=True)
+    fd, temporal = tempfile.mkstemp(dir=DIRECTORIO, suffix=".tmp")
+    with os.fdopen(fd, "w") as f:
+        f.write(texto)
+    os.replace(temporal, ruta_marca(clave, estado))
+    desmarcar(clave, "error" if estado == "pendiente" else "pendiente")
+
+
+def desmarcar(clave, estado):
+    try:
+        os.remove(ruta_marca(clave, estado))
+    except FileNotFoundError:
+        pass
+
+
+def leer_marca(clave):
+    """("pendiente" | "error" | None, detalle) según las marcas en disco."""
+    try:
+        with open(ruta_marca(clave, "error")) as f:
+            return "error", f.read()
+    except FileNotFoundError:
+        pass
+
+    try:
+        creada = os.path.getmtime(ruta_marca(clave, "pendiente"))
+    except FileNotFoundError:
+        return None, None
+    if time.time() - creada > VENCIMIENTO:
+        return "error", "El render no terminó a tiempo; volver a pedirlo"
+    return "pendiente", None
+
+
+def _renderizar(tipo, datos, clave):
+    # Corre en el proceso hijo; devuelve el tiempo de render para las métricas del padre
+    try:
+        inicio = time.perf_counter()
+        contenido = RENDERERS[tipo](datos)
+        segundos = time.perf_counter() - inicio
+        guardar_artefacto(clave, contenido)   # borra también las marcas de la clave
+    except Exception as e:
+        marcar(clave, "error", str(e))
+        raise
+    return segundos
+
+
+def _registrar_trabajo(tipo):
+    def callback(futuro):
+        if not futuro.cancelled() and futuro.exception() is None:
+            registrar_render(tipo, futuro.result())
+    return callback
+
+
+# ============================================================
+# Pool de procesos
+# ============================================================
+
+def _get_pool():
+    global _pool
+    if _pool is None:
+        # spawn: no heredar hilos ni conexiones abiertas del worker web
+        _pool = ProcessPoolExecutor(
+            max_workers=PROCESOS, mp_context=multiprocessing.get_context("spawn")
+        )
+    return _pool
+
+
+def _enviar(tipo, datos, clave):
+    global _pool
+    try:
+        futuro = _get_pool().submit(_renderizar, tipo, datos, clave)
+    except BrokenProcessPool:
+        # Un hijo murió (OOM, kill): se descarta el pool y se arma otro
+        _pool = None
+        futuro = _get_pool().submit(_renderizar, tipo, datos, clave)
+    futuro.add_done_callback(_registrar_trabajo(tipo))
+    return futuro
+
+
+def encolar(tipo, iduser, ident, datos):
+    """Encola el render si hace falta y devuelve la clave del artefacto."""
+    clave = clave_artefacto(tipo, iduser, ident, datos)
+
+    with _lock:
+        if en_cache(clave):
+            _trabajos.pop(clave, None)
+            return clave
+
+        futuro = _trabajos.get(clave)
+        if futuro is not None and not futuro.done():
+            return clave
+
+        # Otro worker ya lo está renderizando
+        if futuro is None and leer_marca(clave)[0] == "pendiente":
+            return clave
+
+        marcar(clave, "pendiente")
+        _trabajos[clave] = _enviar(tipo, datos, clave)
+
+    return clave
+
+
+def obtener_pdf(tipo, iduser, ident, datos):
+    """(clave, archivo abierto) del PDF cacheado.
+
+    Si no está, encola el render y el archivo es None: el request responde
+    202 con respuesta_trabajo(clave) en vez de renderizar en el worker web.
+    """
+    clave = clave_artefacto(tipo, iduser, ident, datos)
+    archivo = abrir_artefacto(clave)
+    if archivo is None:
+        encolar(tipo, iduser, ident, datos)
+    return clave, archivo
+
+
+def estado(clave):
+    """Estado desde el disco, compartido entre workers."""
+    if en_cache(clave):
+        return "listo", None
+
+    marca, detalle = leer_marca(clave)
+    if marca is None:
+        return "desconocido", None
+    return marca, detalle
+
+
+def respuesta_trabajo(clave):
+    est, error = estado(clave)
+    payload = {
+        "job": clave,
+        "estado": est,
+        "estado_url": url_for("trabajos_pdf_bp.get_trabajo", clave=clave),
+    }
+    if est == "listo":
+        payload["descarga_url"] = url_for("trabajos_pdf_bp.descargar_trabajo", clave=clave)
+    if error:
+        payload["error"] = error
+
+    return jsonify(payload), 200 if est == "listo" else 202
+
+
+def _validar_clave(clave):
+    """Devuelve (tipo, ident) si la clave es válida y del usuario logueado."""
+    m = CLAVE_RE.match(clave)
+    if not m or int(m.group(2)) != current_user.iduser:
+        return None
+    return m.group(1), m.group(3)
+
+
+# ============================================================
+# Rutas
+# ============================================================
+
+# GET /pdf/<clave>
+@trabajos_pdf_bp.route("/<clave>", methods=["GET"])
+@jwt_required()
+def get_trabajo(clave):
+    if not _validar_clave(clave):
+        return jsonify({"msg": "Trabajo no encontrado"}), 404
+
+    if estado(clave)[0] == "desconocido":
+        return jsonify({"msg": "Trabajo no encontrado"}), 404
+
+    return respuesta_trabajo(clave)
+
+
+# GET /pdf/<clave>/descarga
+@trabajos_pdf_bp.route("/<clave>/descarga", methods=["GET"])
+@jwt_required()
+def descargar_trabajo(clave):
+    validada = _validar_clave(clave)
+    archivo = abrir_artefacto(clave) if validada else None
+    if archivo is None:
+        return jsonify({"msg": "PDF no disponible"}), 404
+
+    tipo, ident = validada
+    response = send_file(
+        archivo,
+        as_attachment=True,
+        download_name=f"{tipo}_{ident}.pdf",
+        mimetype="application/pdf",
+        max_age=3600
+    )
+    response.headers["Access-Control-Expose-Headers"] = "Content-Disposition"
+    return response
@@ -2,10 +2,19 @@
 from flask import Blueprint, request, jsonify
 from extensions import db
 from models import User
+from contrasenas import Saturado, hashear
+from limites import aplicar_limites, ip_cliente
 
 # ❌ QUITAR strict_slashes, rompe en Render
 users_bp = Blueprint("users_bp", __name__)
 
+
+@users_bp.before_request
+def limitar_altas():
+    if request.method != "POST":
+        return None
+    return aplicar_limites(("users_ip", ip_cliente()))
+
 # POST /users
 @users_bp.route("/", methods=["POST"])
 def create_user():
@@ -19,6 +28,9 @@ def create_user():
         if field not in data:
             return jsonify({"error": f"Falta el campo {field}"}), 400
 
+    if not isinstance(data["password"], str):
+        return jsonify({"error": "El campo password debe ser texto"}), 400
+
     if User.query.filter_by(username=data["username"]).first():
         return jsonify({"error": "El username ya está en uso"}), 409
 
@@ -27,7 +39,7 @@ def create_user():
             nombre=data["nombre"],
             apellido=data["apellido"],
             username=data["username"],
-            password=data["password"]
+            password=hashear(data["password"])
         )
 
         db.session.add(user)
@@ -43,5 +55,8 @@ def create_user():
             }
         }), 201
 
+    except Saturado as e:
+        return jsonify({"error": str(e)}), 503, {"Retry-After": "2"}
+
     except Exception as e:
         return jsonify({"error": "Error al crear el usuario", "details": str(e)}), 500
\ No newline at end of file
@@ -0,0 +1,98 @@
+# usuario_actual.py
+# Usuario del request a partir del JWT (user_lookup_loader de flask_jwt_extended).
+#
+# En las rutas protegidas:
+#   from flask_jwt_extended import current_user
+#   iduser = current_user.iduser
+#
+# La fila de `users` se cachea por proceso con TTL, así que resolver el usuario
+# no cuesta una consulta por request. Un token de un usuario borrado deja de
+# valer a más tardar cuando vence su entrada (401). Hoy ninguna ruta modifica
+# ni borra usuarios; la que lo haga tiene que llamar a
+# cache_usuarios.invalidar(iduser) después del commit.
+#
+#   USER_CACHE_TTL=60          segundos
+#   USER_CACHE_MAX=10000       entradas
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from extensions import db, jwt
+from models import User
+
+TTL = float(os.getenv("USER_CACHE_TTL", "60"))
+MAX_ENTRADAS = int(os.getenv("USER_CACHE_MAX", "10000"))
+
+
+@dataclass(frozen=True)
+class UsuarioActual:
+    """Lo que las rutas necesitan del usuario, sin la contraseña."""
+    iduser: int
+    username: str
+    nombre: str
+    apellido: str
+
+
+class CacheUsuarios:
+    """LRU chico con TTL: iduser -> UsuarioActual."""
+
+    def __init__(self, ttl=TTL, max_entradas=MAX_ENTRADAS):
+        self.ttl = ttl
+        self.max_entradas = max_entradas
+        self._entradas = OrderedDict()   # iduser -> (vence, UsuarioActual)
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def obtener(self, iduser):
+        with self._lock:
+            entrada = self._entradas.get(iduser)
+            if entrada is None or entrada[0] < time.monotonic():
+                self.misses += 1
+                return None
+            self._entradas.move_to_end(iduser)
+            self.hits += 1
+            return entrada[1]
+
+    def guardar(self, usuario):
+        with self._lock:
+            self._entradas[usuario.iduser] = (time.monotonic() + self.ttl, usuario)
+            self._entradas.move_to_end(usuario.iduser)
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+
+    def invalidar(self, iduser):
+        with self._lock:
+            self._entradas.pop(iduser, None)
+
+    def estadisticas(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses,
+                    "entradas": len(self._entradas), "ttl": self.ttl}
+
+
+cache_usuarios = CacheUsuarios()
+
+
+def buscar_usuario(iduser):
+    fila = db.session.query(
+        User.iduser, User.username, User.nombre, User.apellido
+    ).filter(User.iduser == iduser).first()
+    return UsuarioActual(*fila) if fila else None
+
+
+@jwt.user_lookup_loader
+def cargar_usuario(_jwt_header, jwt_data):
+    # identity se emite como string (ver login.py)
+    try:
+        iduser = int(jwt_data["sub"])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+    usuario = cache_usuarios.obtener(iduser)
+    if usuario is None:
+        usuario = buscar_usuario(iduser)
+        if usuario is not None:
+            cache_usuarios.guardar(usuario)
+    return usuario   # None -> 401 "Error loading the user"
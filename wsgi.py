@@ -0,0 +1,13 @@
+# wsgi.py
+# Punto de entrada WSGI para gunicorn (ver gunicorn.conf.py)
+#
+# ARRANQUE_RAPIDO=1 (defecto): sin Flask-Migrate/Alembic al servir y con el pool
+# de conexiones calentándose en segundo plano en cada worker. Pensado para hosts
+# que duermen la instancia y la levantan con el primer request.
+import os
+
+from app import create_app
+
+ARRANQUE_RAPIDO = os.getenv("ARRANQUE_RAPIDO", "1") not in ("0", "false", "False")
+
+app = create_app(arranque_rapido=ARRANQUE_RAPIDO)